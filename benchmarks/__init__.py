@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for the AI Agent framework.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.agent_load --concurrency 1 8 32
+"""
@@ -0,0 +1,186 @@
+"""
+End-to-end load benchmark of Agent.process_input against a fake streaming server.
+
+The benchmark starts a FakeOpenAIServer in a background thread, then drives
+``Agent.process_input`` at fixed concurrency levels with a mix of inputs that
+route to a command (two model calls plus a handler) and inputs answered in
+prose (one model call). For every level it reports:
+- throughput in requests per second
+- p50/p95/p99 time to the first chunk yielded by process_input
+- p50/p95/p99 total latency
+- CPU time of the agent's thread per request, which excludes the fake server
+
+Since the model is simulated, the numbers measure the agent's own overhead
+on top of the configured first-token delay and token rate.
+
+Usage:
+    python -m benchmarks.agent_load --concurrency 1 8 32 128 --requests 500
+    python -m benchmarks.agent_load --first-token-delay 0 --token-rate 0 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+from src.ai_agent.agent import Agent
+from src.commands.base import CommandRegistry, VariableMetadata, command
+from .fake_server import FakeOpenAIServer, FakeServerConfig
+from .stats import format_table, percentile
+
+ROUTING_PROMPT_PREFIX = "You are an AI assistant"
+_ORDER_ID_RE = re.compile(r"\d+")
+
+def build_registry() -> CommandRegistry:
+    """Create the command registry used by the benchmark."""
+    registry = CommandRegistry()
+
+    @command(
+        registry=registry,
+        name="lookup_order",
+        description="Looks up the shipping status of an order",
+        explanation="Finds the order by its number and reports where it is.",
+        pattern="[[LOOKUP_ORDER_{order_id}]]",
+        variables=[VariableMetadata(name="order_id", description="Order number", example="1042")],
+        example_inputs=["Where is my order 1042?", "Track order 77"],
+        example_success_responses=[{"result": "Order 1042: shipped", "response": "Your order 1042 has shipped."}],
+        example_failed_responses=[{"result": "Unknown order", "response": "I couldn't find that order."}],
+        result_prompt="Tell the user the status of their order.\n\nExamples:\n{examples}",
+        unsuccessful_prompt="Explain that the order lookup failed.\n\nExamples:\n{examples}"
+    )
+    async def lookup_order(order_id: str) -> str:
+        return f"Order {order_id}: shipped"
+
+    return registry
+
+def make_responder(prose_tokens: int) -> Any:
+    """
+    Build the fake model's behaviour.
+
+    Routing requests for inputs mentioning an order get the command pattern,
+    other routing requests get ``prose_tokens`` tokens of prose, and formatting
+    requests get a short sentence.
+    """
+    prose = " ".join(["word"] * prose_tokens)
+
+    def responder(request: Dict[str, Any]) -> str:
+        messages = request.get("messages", [])
+        system_prompt = str(messages[0].get("content", "")) if messages else ""
+        user_input = str(messages[-1].get("content", "")) if messages else ""
+        if system_prompt.startswith(ROUTING_PROMPT_PREFIX):
+            order_id = _ORDER_ID_RE.search(user_input) if "order" in user_input else None
+            return f"[[LOOKUP_ORDER_{order_id.group(0)}]]" if order_id else prose
+        return "Good news: your order has shipped and should arrive in two days."
+
+    return responder
+
+def make_inputs(count: int, command_ratio: float) -> List[str]:
+    """Build a deterministic mix of command and prose inputs."""
+    return [
+        f"Where is my order {1000 + index}?" if (index % 100) < command_ratio * 100
+        else f"Tell me something interesting about number {index}"
+        for index in range(count)
+    ]
+
+async def run_level(agent: Agent, inputs: List[str], concurrency: int) -> Dict[str, Any]:
+    """
+    Process every input with a fixed number of concurrent workers.
+
+    Args:
+        agent (Agent): Agent under test
+        inputs (List[str]): Inputs to process
+        concurrency (int): Number of concurrent workers
+
+    Returns:
+        Dict[str, Any]: Throughput, latency percentiles in milliseconds, CPU time
+            per request in milliseconds and the error count
+    """
+    first_chunk_times: List[float] = []
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(inputs)
+
+    async def worker() -> None:
+        nonlocal errors
+        for user_input in pending:
+            started = time.perf_counter()
+            first_chunk: Optional[float] = None
+            try:
+                async for _ in agent.process_input(user_input):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - started
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if first_chunk is not None:
+                first_chunk_times.append(first_chunk)
+
+    cpu_started = time.thread_time()
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_started
+    cpu = time.thread_time() - cpu_started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(inputs),
+        "errors": errors,
+        "throughput_rps": len(inputs) / wall if wall else 0.0,
+        "ttfc_p50_ms": percentile(first_chunk_times, 0.50) * 1000,
+        "ttfc_p95_ms": percentile(first_chunk_times, 0.95) * 1000,
+        "ttfc_p99_ms": percentile(first_chunk_times, 0.99) * 1000,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "cpu_per_request_ms": cpu / len(inputs) * 1000 if inputs else 0.0
+    }
+
+async def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Start the fake server and measure every concurrency level."""
+    config = FakeServerConfig(
+        first_token_delay=args.first_token_delay,
+        token_rate=args.token_rate,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    results = []
+    with FakeOpenAIServer(make_responder(args.prose_tokens), config) as server:
+        client = AsyncOpenAI(base_url=server.base_url, api_key="benchmark", max_retries=0)
+        agent = Agent("Customer support agent for an online shop", server.base_url, "benchmark", "fake-model", client=client)
+        agent.initialize_commands(build_registry())
+        try:
+            # Warm up connections, caches and lazy initialization
+            await run_level(agent, make_inputs(max(args.concurrency), args.command_ratio), max(args.concurrency))
+            for concurrency in args.concurrency:
+                results.append(await run_level(agent, make_inputs(args.requests, args.command_ratio), concurrency))
+        finally:
+            await agent.aclose()
+            await client.close()
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128], help="Concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--command-ratio", type=float, default=0.5, help="Fraction of inputs that route to a command")
+    parser.add_argument("--prose-tokens", type=int, default=50, help="Tokens of prose answers")
+    parser.add_argument("--first-token-delay", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Tokens per second, 0 for no delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of model calls that fail")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the error injection")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    print(format_table(results, list(results[0].keys())))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+In-process fake OpenAI-compatible streaming server for benchmarks.
+
+This module provides:
+1. A minimal HTTP/1.1 server answering ``POST /v1/chat/completions`` with
+   server-sent events, in the same format as the OpenAI API
+2. Configurable first-token delay, token rate and error injection
+3. A background-thread runner so the server's CPU time is not charged to
+   the agent under test
+
+Only the standard library is used, so benchmarks need no network access
+and no extra dependencies.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+@dataclass
+class FakeServerConfig:
+    """
+    Behaviour of the fake server.
+
+    Attributes:
+        first_token_delay (float): Seconds before the first content chunk (default: 0.05)
+        token_rate (float): Content chunks streamed per second after the first
+            one, 0 for no delay (default: 200.0)
+        chars_per_token (int): Characters of the response per streamed chunk (default: 4)
+        error_rate (float): Fraction of requests answered with an error (default: 0.0)
+        error_status (int): HTTP status of injected errors (default: 500)
+        seed (Optional[int]): Seed of the error injection (default: None)
+    """
+    first_token_delay: float = 0.05
+    token_rate: float = 200.0
+    chars_per_token: int = 4
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: Optional[int] = None
+
+# Maps a parsed chat completion request to the full response text
+Responder = Callable[[Dict[str, Any]], str]
+
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class FakeOpenAIServer:
+    """
+    Fake OpenAI-compatible chat completions server streaming canned responses.
+
+    The server runs its own event loop in a background thread. Point an
+    AsyncOpenAI client at ``base_url`` to use it.
+
+    Example Usage:
+        with FakeOpenAIServer(lambda request: "Hello there!", FakeServerConfig(token_rate=100)) as server:
+            agent = Agent("purpose", server.base_url, "unused", "fake-model")
+
+    Attributes:
+        responder (Responder): Function returning the response text of a request
+        config (FakeServerConfig): Delay, rate and error injection settings
+        requests (int): Number of chat completion requests received
+        errors (int): Number of injected errors
+    """
+
+    def __init__(self, responder: Responder, config: Optional[FakeServerConfig] = None):
+        """
+        Initialize the server; it is started by start() or the context manager.
+
+        Args:
+            responder (Responder): Function returning the response text of a request
+            config (Optional[FakeServerConfig]): Server behaviour (default: FakeServerConfig())
+        """
+        self.responder = responder
+        self.config = config or FakeServerConfig()
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(self.config.seed)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._port = 0
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to configure an OpenAI client with."""
+        return f"http://127.0.0.1:{self._port}/v1"
+
+    def start(self) -> None:
+        """Start the server in a background thread and wait until it listens."""
+        ready = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, "127.0.0.1", 0)
+            )
+            self._port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-openai-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self) -> None:
+        """Stop the server and its thread."""
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+            self._thread = None
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests on a keep-alive connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+                    await self._write_json(writer, 404, {"error": {"message": f"Unknown endpoint {path}"}})
+                    continue
+                await self._handle_completion(json.loads(body or b"{}"), writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+        """Write a complete JSON response."""
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _write_event(self, writer: asyncio.StreamWriter, data: str) -> None:
+        """Write one server-sent event as an HTTP chunk."""
+        event = f"data: {data}\n\n".encode()
+        writer.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+        await writer.drain()
+
+    async def _handle_completion(self, request: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        """Answer a chat completion request, streamed or not."""
+        self.requests += 1
+        config = self.config
+        if config.error_rate and self._random.random() < config.error_rate:
+            self.errors += 1
+            await self._write_json(writer, config.error_status, {"error": {"message": "Injected error", "type": "server_error"}})
+            return
+
+        text = self.responder(request)
+        step = max(config.chars_per_token, 1)
+        pieces = [text[start:start + step] for start in range(0, len(text), step)]
+        completion_id = f"chatcmpl-fake{self.requests}"
+        model = request.get("model", "fake-model")
+        prompt_chars = sum(len(str(message.get("content", ""))) for message in request.get("messages", []))
+        usage = {
+            "prompt_tokens": prompt_chars // step,
+            "completion_tokens": len(pieces),
+            "total_tokens": prompt_chars // step + len(pieces)
+        }
+
+        await asyncio.sleep(config.first_token_delay)
+        if not request.get("stream"):
+            await self._write_json(writer, 200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            return json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            })
+
+        interval = 1.0 / config.token_rate if config.token_rate else 0.0
+        for index, piece in enumerate(pieces):
+            if index and interval:
+                await asyncio.sleep(interval)
+            delta = {"role": "assistant", "content": piece} if index == 0 else {"content": piece}
+            await self._write_event(writer, chunk(delta))
+        await self._write_event(writer, chunk({}, "stop"))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            await self._write_event(writer, json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage
+            }))
+        await self._write_event(writer, "[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
@@ -0,0 +1,150 @@
+"""
+Micro-benchmarks of prompt rendering and command extraction at scale.
+
+The benchmark synthesizes registries of 10, 100, 1,000 and 10,000 commands
+and measures, per call:
+- SystemPromptManager.format_system_prompt over get_all_commands()
+- SystemPromptManager.get_system_prompt, cached and after a registry change
+- CommandRegistry.get_all_commands
+- Agent._extract_command for a hit on the last registered command and a miss
+- command_registry.CommandRegistry.extract_command for the same inputs
+
+Timings come from timeit with automatic loop counts. Memory is measured in a
+separate pass with tracemalloc: the peak allocation of a single call, and
+the memory retained by each registry.
+
+Usage:
+    python -m benchmarks.registry_scaling
+    python -m benchmarks.registry_scaling --sizes 100 1000 --json results.json
+"""
+
+import argparse
+import json
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.ai_agent.agent import Agent
+from src.commands.base import CommandMetadata, VariableMetadata
+from src.commands.command_registry import CommandRegistry
+from src.prompts.prompt_manager import SystemPromptManager
+from .stats import format_table
+
+AGENT_PURPOSE = "General purpose assistant with many integrations"
+
+def _noop_handler(**kwargs: str) -> str:
+    return "ok"
+
+def make_command(index: int) -> CommandMetadata:
+    """Synthesize a realistic command with two variables."""
+    return CommandMetadata(
+        name=f"action_{index}",
+        description=f"Performs action number {index} on a resource",
+        explanation=f"Looks up the resource and applies action {index} to it on behalf of the user.",
+        pattern=f"[[ACTION_{index}_{{resource_id}}_{{amount}}]]",
+        variables=[
+            VariableMetadata(name="resource_id", description="Identifier of the resource", example="res42"),
+            VariableMetadata(name="amount", description="Amount to apply", example="10")
+        ],
+        example_inputs=[f"Please run action {index} on res42 with 10", f"Do action {index} for res7"],
+        handler=_noop_handler,
+        result_prompt="Report the result.",
+        unsuccessful_prompt="Report the error.",
+        example_success_responses=[],
+        example_failed_responses=[]
+    )
+
+def build_registry(size: int) -> CommandRegistry:
+    """Create a registry holding ``size`` synthesized commands."""
+    registry = CommandRegistry()
+    for index in range(size):
+        registry.register(make_command(index))
+    return registry
+
+def time_per_call(operation: Callable[[], Any]) -> float:
+    """Get the best-of-three time per call of an operation, in microseconds."""
+    timer = timeit.Timer(operation)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=loops)) / loops * 1e6
+
+def peak_allocation(operation: Callable[[], Any]) -> int:
+    """Get the peak memory allocated by a single call of an operation, in bytes."""
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+def retained_memory(factory: Callable[[], Any]) -> Tuple[Any, int]:
+    """Build an object and get the memory it retains, in bytes."""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        built = factory()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return built, after - before
+
+def bump_registry(registry: CommandRegistry, manager: SystemPromptManager) -> str:
+    """Re-register one command, then render the prompt again."""
+    registry.register(registry.commands["action_0"])
+    return manager.get_system_prompt(registry)
+
+def benchmark_size(size: int) -> List[Dict[str, Any]]:
+    """Measure every operation on a registry of the given size."""
+    registry, registry_bytes = retained_memory(lambda: build_registry(size))
+    manager = SystemPromptManager(AGENT_PURPOSE)
+    agent = Agent(AGENT_PURPOSE, "http://127.0.0.1:9/v1", "benchmark", "fake-model")
+    agent.initialize_commands(registry)
+
+    last = size - 1
+    hit_text = f"[[ACTION_{last}_res42_10]]"
+    miss_text = "[[NOT_A_COMMAND_res42]]"
+    manager.get_system_prompt(registry)
+
+    operations: Dict[str, Callable[[], Any]] = {
+        "format_system_prompt": lambda: manager.format_system_prompt(registry.get_all_commands()),
+        "get_system_prompt (cached)": lambda: manager.get_system_prompt(registry),
+        "get_system_prompt (after change)": lambda: bump_registry(registry, manager),
+        "get_all_commands": registry.get_all_commands,
+        "Agent._extract_command (hit)": lambda: agent._extract_command(hit_text),
+        "Agent._extract_command (miss)": lambda: agent._extract_command(miss_text),
+        "CommandRegistry.extract_command (hit)": lambda: registry.extract_command(hit_text),
+        "CommandRegistry.extract_command (miss)": lambda: registry.extract_command(miss_text)
+    }
+    assert registry.extract_command(hit_text) == (f"action_{last}", {"resource_id": "res42", "amount": "10"})
+
+    rows = []
+    for name, operation in operations.items():
+        rows.append({
+            "commands": size,
+            "operation": name,
+            "per_call_us": time_per_call(operation),
+            "peak_alloc_kb": peak_allocation(operation) / 1024,
+            "registry_kb": registry_bytes / 1024
+        })
+    return rows
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="Registry sizes")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        rows = benchmark_size(size)
+        print(format_table(rows, ["commands", "operation", "per_call_us", "peak_alloc_kb", "registry_kb"]))
+        print()
+        results.extend(rows)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Statistics and reporting helpers shared by the benchmarks.
+"""
+
+import math
+from typing import Any, Dict, List, Sequence
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """
+    Get a percentile of a sample using the nearest-rank method.
+
+    Args:
+        values (Sequence[float]): Sample values
+        fraction (float): Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: The percentile, 0.0 for an empty sample
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+def format_table(rows: List[Dict[str, Any]], columns: Sequence[str]) -> str:
+    """
+    Format result rows as an aligned plain-text table.
+
+    Args:
+        rows (List[Dict[str, Any]]): One dictionary per row
+        columns (Sequence[str]): Keys to show, in order
+
+    Returns:
+        str: The table, with a header line
+    """
+    def cell(value: Any) -> str:
+        if isinstance(value, float):
+            return f"{value:.3f}" if abs(value) < 1000 else f"{value:.0f}"
+        return str(value)
+
+    cells = [[cell(row.get(column, "")) for column in columns] for row in rows]
+    widths = [
+        max([len(column)] + [len(row[index]) for row in cells])
+        for index, column in enumerate(columns)
+    ]
+    # Text columns are left-aligned, numeric columns right-aligned
+    numeric = [
+        all(isinstance(row.get(column), (int, float)) for row in rows)
+        for column in columns
+    ]
+
+    def align(value: str, width: int, is_numeric: bool) -> str:
+        return value.rjust(width) if is_numeric else value.ljust(width)
+
+    lines = ["  ".join(align(column, width, flag) for column, width, flag in zip(columns, widths, numeric))]
+    lines.extend(
+        "  ".join(align(value, width, flag) for value, width, flag in zip(row, widths, numeric))
+        for row in cells
+    )
+    return "\n".join(lines)
@@ -3,6 +3,38 @@ Aigent - A natural language command processing system powered by LLMs.
 """
 
 from .agent import Agent
+from .admission import AdmissionController, AdmissionTimeoutError
+from .cache import ResponseCache
+from .metrics import AgentMetrics, MetricsHook
+from .resilience import RetryPolicy, StreamTimeoutError
+from .routing import CommandSelector, IntentClassifier, RoutingCache
+from .tools import ToolCatalog
+from .tracing import OpenTelemetryTracer, Tracer
+from .session import Session, SessionStore, InMemorySessionStore, SQLiteSessionStore
+from .client import ClientFactory, ConnectionPoolConfig
 from ._version import version as __version__, version_tuple
 
-__all__ = ['Agent', '__version__', 'version_tuple'] 
\ No newline at end of file
+__all__ = [
+    'Agent',
+    'AdmissionController',
+    'AdmissionTimeoutError',
+    'ResponseCache',
+    'AgentMetrics',
+    'MetricsHook',
+    'RoutingCache',
+    'IntentClassifier',
+    'CommandSelector',
+    'RetryPolicy',
+    'StreamTimeoutError',
+    'ToolCatalog',
+    'Tracer',
+    'OpenTelemetryTracer',
+    'Session',
+    'SessionStore',
+    'InMemorySessionStore',
+    'SQLiteSessionStore',
+    'ClientFactory',
+    'ConnectionPoolConfig',
+    '__version__',
+    'version_tuple'
+]
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Admission control for LLM calls in the AI Agent framework.
+
+This module provides:
+1. A token bucket for requests-per-minute and tokens-per-minute limits
+2. An admission controller combining a concurrency limit, a fair FIFO queue
+   with a maximum wait, and rate limiting
+
+Under bursty load this keeps the agent below the provider's rate limits
+instead of firing unbounded concurrent requests that all fail together.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from ..prompts.tokens import CHARS_PER_TOKEN
+
+def estimate_request_tokens(messages: Any, max_tokens: int) -> int:
+    """
+    Estimate the tokens a chat completion request counts against rate limits.
+
+    Providers charge the prompt plus the requested completion budget, so the
+    estimate is the prompt size (about four characters per token) plus
+    ``max_tokens``.
+
+    Args:
+        messages (Any): Chat messages of the request
+        max_tokens (int): Maximum completion tokens of the request
+
+    Returns:
+        int: Estimated token count
+    """
+    prompt_chars = 0
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, str):
+            prompt_chars += len(content)
+        else:
+            # Content parts, e.g. text with cache-control hints
+            prompt_chars += sum(len(part.get("text", "")) for part in content)
+    return prompt_chars // CHARS_PER_TOKEN + max_tokens
+
+class AdmissionTimeoutError(RuntimeError):
+    """Raised when a request waits longer than the admission controller's max_wait."""
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    Attributes:
+        capacity (float): Maximum number of tokens, equal to the per-minute rate
+        tokens (float): Tokens currently available
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute (float): Refill rate and capacity of the bucket
+            clock (Callable[[], float]): Time source (default: time.monotonic)
+        """
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        """Add the tokens accumulated since the last update."""
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self, amount: float) -> None:
+        """
+        Wait until the requested amount is available and consume it.
+
+        Requests larger than the capacity are capped at the capacity so they
+        can still be admitted once the bucket is full.
+
+        Args:
+            amount (float): Number of tokens to consume
+        """
+        amount = min(float(amount), self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self._rate)
+
+class AdmissionController:
+    """
+    Bounded, fair and rate-limited admission of LLM calls.
+
+    Callers are admitted strictly in arrival order. A caller first waits for a
+    free concurrency slot, then for request and token budget. The slot is held
+    for the whole streamed call. Callers still waiting after ``max_wait``
+    seconds get an AdmissionTimeoutError instead of piling up.
+
+    One controller can be shared by every agent that talks to the same
+    model or provider account.
+
+    Example Usage:
+        controller = AdmissionController(
+            max_concurrency=32, max_wait=10.0,
+            requests_per_minute=3000, tokens_per_minute=250000
+        )
+        agent = Agent(..., admission_controller=controller)
+        controller.stats()  # {"queue_depth": 3, "in_flight": 32, ...}
+
+    Attributes:
+        max_concurrency (Optional[int]): Maximum number of concurrent calls
+        max_wait (Optional[float]): Maximum seconds a call may wait for admission
+        queue_depth (int): Number of calls currently waiting
+        in_flight (int): Number of admitted calls still running
+        admitted (int): Total number of admitted calls
+        rejected (int): Total number of calls that timed out waiting
+        total_wait (float): Total seconds admitted calls spent waiting
+        max_wait_seen (float): Longest wait of an admitted call, in seconds
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_concurrency (Optional[int]): Maximum number of concurrent calls,
+                None for no limit (default: None)
+            max_wait (Optional[float]): Maximum seconds to wait for admission, None
+                to wait indefinitely (default: None)
+            requests_per_minute (Optional[float]): Request rate limit (default: None)
+            tokens_per_minute (Optional[float]): Token rate limit, charged with the
+                estimated tokens of each call (default: None)
+            clock (Callable[[], float]): Time source (default: time.monotonic)
+        """
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self._clock = clock
+        self._request_bucket = TokenBucket(requests_per_minute, clock) if requests_per_minute else None
+        self._token_bucket = TokenBucket(tokens_per_minute, clock) if tokens_per_minute else None
+        # Created lazily so the controller can be built outside a running event loop
+        self._queue_lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _admit(self, tokens: int) -> None:
+        """Wait for this caller's turn, a concurrency slot and rate budget."""
+        if self._queue_lock is None:
+            self._queue_lock = asyncio.Lock()
+            if self.max_concurrency is not None:
+                self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        # asyncio.Lock wakes waiters in FIFO order, which makes admission fair
+        async with self._queue_lock:
+            if self._slots is not None:
+                await self._slots.acquire()
+            try:
+                if self._request_bucket is not None:
+                    await self._request_bucket.acquire(1)
+                if self._token_bucket is not None:
+                    await self._token_bucket.acquire(tokens)
+            except BaseException:
+                if self._slots is not None:
+                    self._slots.release()
+                raise
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0) -> AsyncIterator[None]:
+        """
+        Hold an admission slot for the duration of a call.
+
+        Args:
+            tokens (int): Estimated tokens of the call, charged against the
+                tokens-per-minute limit (default: 0)
+
+        Raises:
+            AdmissionTimeoutError: If the call is not admitted within max_wait
+        """
+        started = self._clock()
+        self.queue_depth += 1
+        try:
+            if self.max_wait is None:
+                await self._admit(tokens)
+            else:
+                await asyncio.wait_for(self._admit(tokens), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AdmissionTimeoutError(
+                f"Request not admitted within {self.max_wait} seconds"
+            ) from None
+        finally:
+            self.queue_depth -= 1
+
+        waited = self._clock() - started
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the queue and admission counters.
+
+        Returns:
+            Dict[str, Any]: Queue depth, in-flight calls, admitted and rejected
+                totals, and average and maximum wait time in seconds
+        """
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "average_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait": self.max_wait_seen
+        }
@@ -1,10 +1,32 @@
+import asyncio
+import logging
 import os
-from typing import Optional, Dict, List, AsyncGenerator
+import time
+from functools import partial
+from typing import Optional, Dict, List, AsyncGenerator, AsyncIterator, Any, Callable, Tuple, Union
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam
-from ..commands.base import CommandRegistry
-from ..prompts.prompt_manager import SystemPromptManager
-import re
+from openai.types.chat.chat_completion_chunk import ChoiceDeltaToolCall
+from ..commands.base import CommandRegistry, RESPONSE_MODE_LLM
+from ..commands.execution import CommandExecutor
+from ..commands.matching import COMMAND_BLOCK_RE, fill_pattern
+from ..commands.planning import STEP_STARTED, STEP_SUCCEEDED, PlanError, PlanExecutor, PlanStep, is_plan, parse_plan
+from ..prompts.prompt_manager import LAYOUT_CACHE_FRIENDLY, LAYOUT_CLASSIC, SystemPromptManager
+from ..prompts.tokens import TokenEstimator
+from .admission import AdmissionController, estimate_request_tokens
+from .cache import ResponseCache
+from .client import ClientFactory
+from .metrics import MetricsHook
+from .resilience import RetryPolicy, resilient_stream
+from .routing import CommandSelector, IntentClassifier, RoutingCache
+from .streaming import CommandPrefixDetector
+from .tools import ROUTING_MODE_PATTERN, ROUTING_MODE_TOOLS, ROUTING_MODES, ToolCallAccumulator, ToolCatalog
+from .tracing import NOOP_SPAN, NOOP_SPAN_CONTEXT, Tracer
+
+logger = logging.getLogger(__name__)
+
+# A streamed content chunk, or a tool-call delta in the "tools" routing mode
+StreamChunk = Union[str, ChoiceDeltaToolCall]
 
 class Agent:
     """
@@ -16,6 +38,9 @@ class Agent:
     3. Execute commands with extracted variables
     4. Format responses in a user-friendly way
     
+    The agent can be used as an async context manager, which calls aclose()
+    on exit to release the resources it owns.
+    
     Attributes:
         client (AsyncOpenAI): OpenAI API client for language model interactions
         command_registry (Optional[CommandRegistry]): Registry of available commands
@@ -25,6 +50,24 @@ class Agent:
         temperature (float): Controls randomness in the model's output (0.0 to 1.0)
         frequency_penalty (float): Reduces repetition by penalizing frequent tokens (-2.0 to 2.0)
         presence_penalty (float): Encourages diversity by penalizing used tokens (-2.0 to 2.0)
+        executor (CommandExecutor): Runs command handlers without blocking the event loop
+        response_cache (Optional[ResponseCache]): Cache for result and error formatting calls
+        routing_cache (Optional[RoutingCache]): Cache that routes inputs to commands without a model call
+        intent_classifier (Optional[IntentClassifier]): Local classifier that routes inputs to commands
+        command_selector (Optional[CommandSelector]): Picks the commands described in the routing prompt
+        admission_controller (Optional[AdmissionController]): Concurrency and rate limiter for LLM calls
+        retry_policy (Optional[RetryPolicy]): Deadlines, retries and hedging for LLM calls
+        token_estimator (TokenEstimator): Token counter for prompt budgets and cost reports
+        prompt_cache_hints (bool): Whether the static system prompt prefix is sent with a
+            cache-control hint
+        metrics (Optional[MetricsHook]): Receives per-stage latency, token and command metrics
+        tracer (Optional[Tracer]): Emits trace spans for each turn, LLM call and command
+        routing_mode (str): "pattern" to route on command patterns in the response
+            text, "tools" to route through native tool calling
+        tool_catalog (ToolCatalog): Cached tool schemas of the registered commands
+        max_concurrent_commands (int): Maximum number of command handlers run at
+            the same time within one turn
+        planning (bool): Whether the model may answer with a plan of dependent commands
     """
 
     def __init__(
@@ -36,7 +79,25 @@ class Agent:
         max_tokens: int = 2048,
         temperature: float = 0.7,
         frequency_penalty: float = 0.0,
-        presence_penalty: float = 0.0
+        presence_penalty: float = 0.0,
+        executor: Optional[CommandExecutor] = None,
+        client: Optional[AsyncOpenAI] = None,
+        client_factory: Optional[ClientFactory] = None,
+        response_cache: Optional[ResponseCache] = None,
+        routing_cache: Optional[RoutingCache] = None,
+        intent_classifier: Optional[IntentClassifier] = None,
+        command_selector: Optional[CommandSelector] = None,
+        admission_controller: Optional[AdmissionController] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        prompt_token_budget: Optional[int] = None,
+        tokenizer: Optional[Callable[[str], int]] = None,
+        prompt_layout: str = LAYOUT_CLASSIC,
+        prompt_cache_hints: bool = False,
+        metrics: Optional[MetricsHook] = None,
+        tracer: Optional[Tracer] = None,
+        routing_mode: str = ROUTING_MODE_PATTERN,
+        max_concurrent_commands: int = 4,
+        planning: bool = False
     ):
         """
         Initialize the AI Agent.
@@ -50,16 +111,149 @@ class Agent:
             temperature (float): Controls randomness in output (0.0 to 1.0, default: 0.7)
             frequency_penalty (float): Reduces repetition (-2.0 to 2.0, default: 0.0)
             presence_penalty (float): Encourages diversity (-2.0 to 2.0, default: 0.0)
+            executor (Optional[CommandExecutor]): Executor for command handlers, can be
+                shared between agents (default: a new CommandExecutor)
+            client (Optional[AsyncOpenAI]): Preconfigured client to use instead of
+                creating one; base_url and api_key are then ignored
+            client_factory (Optional[ClientFactory]): Factory providing a client bound
+                to a connection pool shared with other agents
+            response_cache (Optional[ResponseCache]): Opt-in cache that replays
+                previously streamed result and error formatting responses
+                (default: None, no caching)
+            routing_cache (Optional[RoutingCache]): Opt-in cache that resolves
+                repeated or near-identical inputs to a command without the
+                first-stage model call (default: None)
+            intent_classifier (Optional[IntentClassifier]): Opt-in local classifier,
+                consulted after the routing cache, that picks a command when it is
+                confident and leaves other inputs to the model (default: None)
+            command_selector (Optional[CommandSelector]): Opt-in retrieval stage that
+                describes only the commands most relevant to each input in the
+                routing prompt (default: None, all commands)
+            admission_controller (Optional[AdmissionController]): Limits concurrent
+                LLM calls and their request and token rates; share one controller
+                between agents using the same model (default: None, no limits)
+            retry_policy (Optional[RetryPolicy]): First-token, inter-chunk and total
+                deadlines, retries with exponential backoff and optional hedged
+                requests for every LLM call (default: None)
+            prompt_token_budget (Optional[int]): Maximum tokens of the system prompt;
+                example inputs and explanations of low-priority commands are trimmed
+                to fit (default: None, no limit)
+            tokenizer (Optional[Callable[[str], int]]): Token counting function, e.g.
+                tiktoken_counter(model_name) (default: a characters-per-token heuristic)
+            prompt_layout (str): "classic" (default) or "cache_friendly", which makes
+                the system prompt byte-stable, sorts commands by name and sends the
+                context after the history so provider prefix caching can reuse the
+                longest possible prefix
+            prompt_cache_hints (bool): Send the system prompt as content parts with an
+                ephemeral ``cache_control`` marker on its static prefix, for backends
+                with explicit prompt caching (default: False)
+            metrics (Optional[MetricsHook]): Opt-in hook receiving time-to-first-token,
+                stream, extraction and handler timings, token usage and command
+                hit/miss counts, e.g. an AgentMetrics collector. Token usage is
+                requested from the provider with ``stream_options`` (default: None)
+            tracer (Optional[Tracer]): Opt-in tracer, e.g. OpenTelemetryTracer(), that
+                receives nested spans for process_input, every LLM call, command
+                extraction and command execution (default: None, no tracing)
+            routing_mode (str): "pattern" (default) to have the model answer with a
+                command pattern, or "tools" to send the commands as tool schemas
+                and dispatch each tool call as soon as its arguments have
+                streamed, without pattern parsing
+            max_concurrent_commands (int): Maximum number of command handlers run
+                concurrently when one response invokes several commands (default: 4)
+            planning (bool): Let the model answer with a plan of commands whose
+                variables reference the outputs of earlier steps. Plans run in a
+                single turn with independent steps in parallel, reporting each
+                step as it finishes; requires the "pattern" routing mode
+                (default: False)
+                
+        Raises:
+            ValueError: If the routing mode is not supported, max_concurrent_commands
+                is less than 1, or planning is combined with the "tools" routing mode
         """
-        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key)
-        self.prompt_manager = SystemPromptManager(agent_purpose)
+        if routing_mode not in ROUTING_MODES:
+            raise ValueError(
+                f"Unsupported routing mode: {routing_mode}. "
+                f"Expected one of: {', '.join(ROUTING_MODES)}"
+            )
+        if max_concurrent_commands < 1:
+            raise ValueError("max_concurrent_commands must be at least 1")
+        if planning and routing_mode == ROUTING_MODE_TOOLS:
+            raise ValueError("Planning requires the pattern routing mode")
+        if client is not None:
+            self.client = client
+        elif client_factory is not None:
+            self.client = client_factory.get_client(base_url, api_key)
+        else:
+            self.client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+        # Shared clients and executors are closed by whoever created them
+        self._owns_client = client is None and client_factory is None
+        self._owns_executor = executor is None
+        self.token_estimator = TokenEstimator(tokenizer)
+        self.prompt_manager = SystemPromptManager(
+            agent_purpose,
+            token_budget=prompt_token_budget,
+            token_estimator=self.token_estimator,
+            layout=prompt_layout,
+            planning=planning
+        )
+        self.prompt_cache_hints = prompt_cache_hints
+        self.metrics = metrics
+        self.tracer = tracer
         self.command_registry = None
         self.model_name = model_name
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.frequency_penalty = frequency_penalty
         self.presence_penalty = presence_penalty
+        self.executor = executor or CommandExecutor()
+        self.response_cache = response_cache
+        self.routing_cache = routing_cache
+        self.intent_classifier = intent_classifier
+        self.command_selector = command_selector
+        self.admission_controller = admission_controller
+        self.retry_policy = retry_policy
+        self.routing_mode = routing_mode
+        self.tool_catalog = ToolCatalog()
+        self.max_concurrent_commands = max_concurrent_commands
+        self.planning = planning
+        
+    async def aclose(self) -> None:
+        """
+        Release the resources owned by the agent.
+        
+        Closes the client's connection pool and shuts down the command executor
+        if the agent created them. Clients obtained from a ClientFactory or passed
+        in explicitly, and shared executors, are left open.
+        """
+        if self._owns_client:
+            await self.client.close()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+    
+    async def __aenter__(self) -> "Agent":
+        """Enter the async context manager."""
+        return self
+    
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Release owned resources when leaving the context."""
+        await self.aclose()
+        
+    def _span(self, name: str, parent: Any = None, attributes: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Open a trace span, or the shared no-op span when tracing is disabled.
         
+        Args:
+            name (str): Span name
+            parent (Any): Parent span, None for the caller's current span
+            attributes (Optional[Dict[str, Any]]): Initial span attributes
+            
+        Returns:
+            Any: Context manager yielding the span
+        """
+        if self.tracer is None:
+            return NOOP_SPAN_CONTEXT
+        return self.tracer.span(name, parent, attributes)
+    
     def initialize_commands(self, command_registry: CommandRegistry) -> None:
         """
         Initialize the command registry for the agent.
@@ -72,12 +266,39 @@ class Agent:
         """
         self.command_registry = command_registry
     
-    async def process_input(self, user_input: str) -> AsyncGenerator[str, None]:
+    async def process_input(
+        self,
+        user_input: str,
+        context: Optional[Dict[str, Any]] = None,
+        history: Optional[List[ChatCompletionMessageParam]] = None
+    ) -> AsyncGenerator[str, None]:
         """
         Process user input through LLM and execute matching commands.
         
+        Plain prose responses are streamed to the caller as soon as the first
+        chunks rule out a command pattern. Responses starting with "[[" are
+        buffered until complete so the command can be extracted and executed.
+        
+        In the "tools" routing mode, content is streamed as it arrives and each
+        tool call is dispatched as soon as its arguments are complete.
+        
+        A response may invoke several commands. Their handlers run concurrently,
+        up to max_concurrent_commands at a time, and their results are presented
+        with one combined formatting call instead of one call per command.
+        
+        With planning enabled, a response starting with "[[PLAN]]" is run as a
+        plan: a progress line is yielded as each step finishes, then the results
+        are presented as for several commands.
+        
+        When a routing cache or intent classifier is configured, inputs they can
+        resolve skip the first-stage model call entirely.
+        
         Args:
             user_input (str): Natural language input from the user
+            context (Optional[Dict[str, Any]]): Values the caller already knows for
+                command variables, e.g. {"user_id": "user123"}
+            history (Optional[List[ChatCompletionMessageParam]]): Earlier conversation
+                messages sent with the routing call, usually managed by a Session
             
         Yields:
             str: Response chunks from the LLM or command execution results
@@ -87,26 +308,215 @@ class Agent:
         """
         if not self.command_registry:
             raise RuntimeError("Command registry not initialized. Call initialize_commands() first.")
+        
+        if self.metrics is None and self.tracer is None:
+            async for chunk in self._process_input(user_input, context, history, NOOP_SPAN):
+                yield chunk
+            return
+        
+        started = time.perf_counter()
+        try:
+            with self._span("aigent.process_input", None, {"gen_ai.request.model": self.model_name}) as span:
+                async for chunk in self._process_input(user_input, context, history, span):
+                    yield chunk
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("process_input_seconds", time.perf_counter() - started)
+    
+    async def _process_input(
+        self,
+        user_input: str,
+        context: Optional[Dict[str, Any]],
+        history: Optional[List[ChatCompletionMessageParam]],
+        span: Any
+    ) -> AsyncGenerator[str, None]:
+        """Route the input, then execute and present the matching commands (see process_input())."""
+        routed = self._route_locally(user_input, context)
+        route_source = routed[0] if routed is not None else "model"
+        span.set_attribute("aigent.route_source", route_source)
+        if self.metrics is not None:
+            self.metrics.increment("routes_total", source=route_source)
+        
+        command_calls: List[Tuple[str, Dict[str, str]]] = []
+        executions: List["asyncio.Future[Tuple[str, bool]]"] = []
+        if routed is not None:
+            routed_response = full_response = unreleased = routed[1]
+        elif self.routing_mode == ROUTING_MODE_TOOLS:
+            routed_response = None
+            semaphore = asyncio.Semaphore(self.max_concurrent_commands)
+            accumulator = ToolCallAccumulator()
+            unknown_commands: List[str] = []
+            
+            def dispatch(tool_call: Tuple[str, Dict[str, str]]) -> None:
+                if self.command_registry.get_command(tool_call[0]) is None:
+                    logger.warning("Tool call to unregistered command: %s", tool_call[0])
+                    unknown_commands.append(tool_call[0])
+                    return
+                command_calls.append(tool_call)
+                executions.append(self._dispatch_tool_call(*tool_call, semaphore, span))
+            
+            try:
+                async for response_chunk in self._get_llm_response(user_input, context, history, span):
+                    if isinstance(response_chunk, str):
+                        yield response_chunk
+                        continue
+                    tool_call = accumulator.feed(response_chunk)
+                    if tool_call is not None:
+                        # Dispatch each call as soon as its arguments are complete
+                        dispatch(tool_call)
+                for tool_call in accumulator.finish():
+                    dispatch(tool_call)
+            except BaseException:
+                for execution in executions:
+                    execution.cancel()
+                raise
+            if self.metrics is not None:
+                if command_calls:
+                    self.metrics.increment("commands_total", result="hit")
+                if unknown_commands or not command_calls:
+                    self.metrics.increment("commands_total", max(len(unknown_commands), 1), result="miss")
+            if unknown_commands:
+                # Reported like a failed command, since there is no prompt to format it with
+                yield "\n\n".join(f"No handler registered for command: {name}" for name in unknown_commands)
+                if command_calls:
+                    yield "\n\n"
+            if not command_calls:
+                return
+            full_response = ""
+            if self.routing_cache is not None and not history and not unknown_commands:
+                # Cached as command text, unless the values do not survive a round trip
+                command_texts = [
+                    fill_pattern(self.command_registry.get_command(name).pattern, variables)
+                    for name, variables in command_calls
+                ]
+                if all(command_texts) and self._extract_commands("\n".join(command_texts)) == command_calls:
+                    full_response = "\n".join(command_texts)
+            unreleased = full_response
+        else:
+            routed_response = None
+            # Stream prose straight through, hold back only what may be a command block
+            detector = CommandPrefixDetector()
+            async for response_chunk in self._get_llm_response(user_input, context, history, span):
+                released = detector.feed(response_chunk)
+                if released:
+                    yield released
+            # Commands are extracted from the full text, the released part included
+            full_response = detector.text
+            unreleased = detector.flush()
             
-        # Accumulate full response
-        full_response = ""
-        async for response_chunk in self._get_llm_response(user_input):
-            full_response += response_chunk
+        if self.planning and is_plan(full_response):
+            try:
+                steps = PlanExecutor(self.command_registry, self.executor).validate(parse_plan(full_response))
+            except PlanError:
+                steps = []
+            if self.metrics is not None:
+                self.metrics.increment("commands_total", result="hit" if steps else "miss")
+            if not steps:
+                if unreleased:
+                    yield unreleased
+                return
+            if routed_response is None and self.routing_cache is not None and not history:
+                self.routing_cache.store(user_input, self.command_registry, context, full_response.strip())
+            async for response in self._run_plan(steps, span):
+                yield response
+            return
+        
+        if not command_calls:
+            # Extract every command from the complete response
+            with self._span("aigent.extract_command", span) as extract_span:
+                if self.metrics is None:
+                    command_calls = self._extract_commands(full_response)
+                else:
+                    started = time.perf_counter()
+                    command_calls = self._extract_commands(full_response)
+                    self.metrics.observe("command_extraction_seconds", time.perf_counter() - started)
+                    self.metrics.increment("commands_total", result="hit" if command_calls else "miss")
+                extract_span.set_attribute("aigent.command", ",".join(name for name, _ in command_calls))
+        if command_calls:
+            # Follow-up turns may depend on the history, so only stateless ones are cached
+            if routed_response is None and self.routing_cache is not None and not history and full_response:
+                self.routing_cache.store(user_input, self.command_registry, context, full_response.strip())
+            span.set_attribute("aigent.command", ",".join(name for name, _ in command_calls))
+            if executions:
+                outcomes = await asyncio.gather(*executions)
+            else:
+                outcomes = await self._execute_commands(command_calls, span)
+            async for response in self._present_results(command_calls, outcomes, span):
+                yield response
+        elif unreleased:
+            yield unreleased
+    
+    async def _present_results(
+        self,
+        command_calls: List[Tuple[str, Dict[str, str]]],
+        outcomes: List[Tuple[str, bool]],
+        parent_span: Any = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Present the results of the commands executed in a turn.
+        
+        Results of commands with a local response mode are rendered first. The
+        others are formatted by the language model: with their own prompt when
+        there is one, and with a single combined call when there are several.
+        
+        Args:
+            command_calls (List[Tuple[str, Dict[str, str]]]): Executed commands and
+                their variables
+            outcomes (List[Tuple[str, bool]]): Tuple of (result_message, success_flag)
+                of each command
+            parent_span (Any): Trace span the formatting call is nested under
             
-        # Try to extract command from the complete response
-        command_result = self._extract_command(full_response)
-        if command_result:
-            command_name, variables = command_result
-            result, success = self._execute_command(command_name, variables)
+        Yields:
+            str: Response chunks
+        """
+        rendered: List[str] = []
+        formatted: List[Tuple[str, str, bool]] = []
+        for (command_name, _), (result, success) in zip(command_calls, outcomes):
+            command = self.command_registry.get_command(command_name)
+            # Commands with a local response mode skip the formatting call
+            if command.response_mode != RESPONSE_MODE_LLM:
+                rendered.append(command.render_response(result, success))
+            else:
+                formatted.append((command_name, result, success))
+        
+        if rendered:
+            yield "\n\n".join(rendered)
+            if formatted:
+                yield "\n\n"
+        if len(formatted) > 1:
+            async for combined_response in self._get_llm_combined_response(formatted, parent_span):
+                yield combined_response
+        elif formatted:
+            command_name, result, success = formatted[0]
             # Get final LLM response with the result
             if success:
-                async for formatted_response in self._get_llm_response_with_result(result, command_name):
+                async for formatted_response in self._get_llm_response_with_result(result, command_name, parent_span):
                     yield formatted_response
             else:
-                async for error_response in self._get_llm_error_response(result, command_name):
+                async for error_response in self._get_llm_error_response(result, command_name, parent_span):
                     yield error_response
-        else:
-            yield full_response
+    
+    def _route_locally(self, user_input: str, context: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+        """
+        Try to resolve user input to command text without calling the model.
+        
+        The routing cache is consulted first, then the intent classifier.
+        
+        Args:
+            user_input (str): Natural language input from the user
+            context (Optional[Dict[str, Any]]): Known command variable values
+            
+        Returns:
+            Optional[Tuple[str, str]]: Tuple of (source, command_text), where source
+                is "routing_cache" or "intent_classifier", None if the input must go
+                to the model
+        """
+        for source, router in (("routing_cache", self.routing_cache), ("intent_classifier", self.intent_classifier)):
+            if router is not None:
+                command_text = router.lookup(user_input, self.command_registry, context)
+                if command_text is not None:
+                    return source, command_text
+        return None
     
     def _extract_command(self, text: str) -> Optional[tuple[str, Dict[str, str]]]:
         """
@@ -126,31 +536,41 @@ class Agent:
         text = text.strip()
         
         # Look for command pattern in square brackets
-        command_match = re.search(r'\[\[(.*?)\]\]', text)
+        command_match = COMMAND_BLOCK_RE.search(text)
         if not command_match:
             return None
             
-        command_text = command_match.group(1)
+        # Look the command up in the registry's precompiled pattern index
+        return self.command_registry.matcher.match(command_match.group(1))
+    
+    def _extract_commands(self, text: str) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        Extract every command invocation from LLM response text.
         
-        # Try to match with registered commands
-        for name, metadata in self.command_registry.commands.items():
-            # Create pattern for variable extraction
-            var_pattern = metadata.pattern.replace("[[", "").replace("]]", "")
-            for var in metadata.variables:
-                var_pattern = var_pattern.replace("{" + var.name + "}", f"(?P<{var.name}>[^}}]*)")
-            
-            match = re.match(f"^{var_pattern}$", command_text)
+        Args:
+            text (str): Text to extract commands from
             
-            if match:
-                variables = match.groupdict()
-                return name, variables
-                
-        return None
+        Returns:
+            List[Tuple[str, Dict[str, str]]]: Tuple of (command_name, variables) for
+                each "[[...]]" block matching a registered command, in order
+        """
+        if not self.command_registry:
+            return []
+        
+        match = self.command_registry.matcher.match
+        return [
+            command_result
+            for command_result in map(match, COMMAND_BLOCK_RE.findall(text))
+            if command_result is not None
+        ]
     
-    def _execute_command(self, command_name: str, variables: Dict[str, str]) -> tuple[str, bool]:
+    async def _execute_command(self, command_name: str, variables: Dict[str, str]) -> tuple[str, bool]:
         """
         Execute a command with the given variables.
         
+        ``async def`` handlers are awaited; sync handlers are run according to
+        their execution policy so they do not block the event loop.
+        
         Args:
             command_name (str): Name of the command to execute
             variables (Dict[str, str]): Variables extracted from the command pattern
@@ -169,33 +589,406 @@ class Agent:
         if not command:
             return f"No handler registered for command: {command_name}", False
             
+        started = time.perf_counter() if self.metrics is not None else 0.0
         try:
-            result = command.handler(**variables)
-            return result, True
+            result = await self.executor.run(command, variables)
+            outcome = result, True
         except Exception as e:
-            return f"Error executing command: {str(e)}", False
+            outcome = f"Error executing command: {str(e)}", False
+        if self.metrics is not None:
+            self.metrics.observe("command_duration_seconds", time.perf_counter() - started, command=command_name)
+            self.metrics.increment("command_executions_total", command=command_name, success=str(outcome[1]).lower())
+        return outcome
     
-    async def _get_llm_response(self, user_input: str) -> AsyncGenerator[str, None]:
+    async def _run_command(
+        self,
+        command_name: str,
+        variables: Dict[str, str],
+        semaphore: asyncio.Semaphore,
+        parent_span: Any = None
+    ) -> Tuple[str, bool]:
         """
-        Get streaming response from OpenAI's LLM.
+        Execute a command in its own trace span once the turn's semaphore admits it.
         
         Args:
-            user_input (str): User's natural language input
+            command_name (str): Name of the command to execute
+            variables (Dict[str, str]): Variables extracted for the command
+            semaphore (asyncio.Semaphore): Limits the concurrent commands of a turn
+            parent_span (Any): Trace span the execution span is nested under
+            
+        Returns:
+            Tuple[str, bool]: Tuple of (result_message, success_flag)
+        """
+        async with semaphore:
+            return await self._execute_traced(command_name, variables, parent_span)
+    
+    def _dispatch_tool_call(
+        self,
+        command_name: str,
+        variables: Dict[str, str],
+        semaphore: asyncio.Semaphore,
+        parent_span: Any = None
+    ) -> "asyncio.Future[Tuple[str, bool]]":
+        """
+        Start executing a tool call after checking its arguments.
+        
+        Tool arguments arrive by name, so they are checked against the
+        command's declared variables first; a call with missing or unexpected
+        arguments never reaches the handler and fails with a clear message.
+        
+        Args:
+            command_name (str): Name of the registered command to execute
+            variables (Dict[str, str]): Arguments of the tool call
+            semaphore (asyncio.Semaphore): Limits the concurrent commands of a turn
+            parent_span (Any): Trace span the execution span is nested under
+            
+        Returns:
+            asyncio.Future[Tuple[str, bool]]: Resolves to (result_message, success_flag)
+        """
+        try:
+            self.command_registry.get_command(command_name).validate_variables(variables)
+        except ValueError as e:
+            outcome: "asyncio.Future[Tuple[str, bool]]" = asyncio.get_running_loop().create_future()
+            outcome.set_result((f"Error executing command: {str(e)}", False))
+            if self.metrics is not None:
+                self.metrics.increment("command_executions_total", command=command_name, success="false")
+            return outcome
+        return asyncio.ensure_future(self._run_command(command_name, variables, semaphore, parent_span))
+    
+    async def _execute_traced(
+        self,
+        command_name: str,
+        variables: Dict[str, str],
+        parent_span: Any = None
+    ) -> Tuple[str, bool]:
+        """
+        Execute a command in its own "aigent.execute_command" trace span.
+        
+        Args:
+            command_name (str): Name of the command to execute
+            variables (Dict[str, str]): Variables extracted for the command
+            parent_span (Any): Trace span the execution span is nested under
+            
+        Returns:
+            Tuple[str, bool]: Tuple of (result_message, success_flag)
+        """
+        with self._span("aigent.execute_command", parent_span, {"aigent.command": command_name}) as execute_span:
+            result, success = await self._execute_command(command_name, variables)
+            execute_span.set_attribute("aigent.success", success)
+        return result, success
+    
+    async def _run_plan(self, steps: List[PlanStep], parent_span: Any = None) -> AsyncGenerator[str, None]:
+        """
+        Run a validated plan, streaming progress, then present its results.
+        
+        Args:
+            steps (List[PlanStep]): Plan steps in dependency order
+            parent_span (Any): Trace span the plan span is nested under
+            
+        Yields:
+            str: A progress line per finished step, then the formatted results
+        """
+        outcomes: Dict[str, Tuple[str, bool]] = {}
+        with self._span("aigent.plan", parent_span, {"aigent.plan.steps": len(steps)}) as plan_span:
+            plan_executor = PlanExecutor(
+                self.command_registry,
+                self.executor,
+                self.max_concurrent_commands,
+                runner=partial(self._execute_traced, parent_span=plan_span)
+            )
+            async for event in plan_executor.run(steps):
+                if event.status == STEP_STARTED:
+                    continue
+                outcomes[event.step.id] = (event.result, event.status == STEP_SUCCEEDED)
+                yield f"{event.describe()}\n"
+        yield "\n"
+        
+        command_calls = [(step.command, step.variables) for step in steps]
+        async for response in self._present_results(command_calls, [outcomes[step.id] for step in steps], parent_span):
+            yield response
+    
+    async def _execute_commands(
+        self,
+        command_calls: List[Tuple[str, Dict[str, str]]],
+        parent_span: Any = None
+    ) -> List[Tuple[str, bool]]:
+        """
+        Execute the commands of a turn concurrently.
+        
+        At most max_concurrent_commands handlers run at the same time. Failures
+        are reported per command and do not affect the others.
+        
+        Args:
+            command_calls (List[Tuple[str, Dict[str, str]]]): Commands and their variables
+            parent_span (Any): Trace span the execution spans are nested under
+            
+        Returns:
+            List[Tuple[str, bool]]: Tuple of (result_message, success_flag) of each
+                command, in the order of command_calls
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_commands)
+        return list(await asyncio.gather(*(
+            self._run_command(command_name, variables, semaphore, parent_span)
+            for command_name, variables in command_calls
+        )))
+    
+    def _formatting_cache_key(self, command_name: str, messages: List[ChatCompletionMessageParam]) -> Optional[str]:
+        """
+        Build the response cache key for a formatting call.
+        
+        Args:
+            command_name (str): Name of the command whose result is formatted
+            messages (List[ChatCompletionMessageParam]): Prompt and result messages
+            
+        Returns:
+            Optional[str]: Cache key, None if response caching is disabled
+        """
+        if self.response_cache is None:
+            return None
+        return self.response_cache.make_key(
+            command_name,
+            messages,
+            self.model_name,
+            self.max_tokens,
+            self.temperature,
+            self.frequency_penalty,
+            self.presence_penalty
+        )
+    
+    async def _stream_completion(
+        self,
+        messages: List[ChatCompletionMessageParam],
+        stage: str,
+        cache_key: Optional[str] = None,
+        parent_span: Any = None,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """
+        Stream a chat completion and yield its text content.
+        
+        This is the single path through which the agent talks to the language
+        model. Cross-cutting concerns such as timeouts, retries, caching,
+        metrics and tracing are implemented here so that every stage gets them.
+        
+        Args:
+            messages (List[ChatCompletionMessageParam]): Messages to send to the model
+            stage (str): Name of the calling stage: "route" for the first-stage
+                command routing call, "result", "error" and "combined" for
+                formatting calls
+            cache_key (Optional[str]): Response cache key. When given and a cache is
+                configured, a cached response is replayed instead of calling the
+                model, and a fully streamed response is stored for later calls
+            parent_span (Any): Trace span the call's "aigent.llm" span is nested under
+            tools (Optional[List[Dict[str, Any]]]): Tool schemas the model may call
+                
+        Yields:
+            StreamChunk: Non-empty content chunks from the language model, and
+                tool-call deltas when tools are given
+        """
+        attributes = {"aigent.stage": stage, "gen_ai.request.model": self.model_name}
+        with self._span("aigent.llm", parent_span, attributes) as span:
+            if cache_key is not None and self.response_cache is not None:
+                cached_chunks = self.response_cache.get(cache_key)
+                span.set_attribute("aigent.cache_hit", cached_chunks is not None)
+                if cached_chunks is not None:
+                    if self.metrics is not None:
+                        self.metrics.increment("llm_calls_total", stage=stage, outcome="cached")
+                    for content in cached_chunks:
+                        yield content
+                    return
+                
+                chunks: List[str] = []
+                async for content in self._stream_measured(messages, stage, span, tools):
+                    chunks.append(content)
+                    yield content
+                self.response_cache.set(cache_key, chunks)
+                return
+            
+            async for content in self._stream_measured(messages, stage, span, tools):
+                yield content
+    
+    async def _stream_measured(
+        self,
+        messages: List[ChatCompletionMessageParam],
+        stage: str,
+        span: Any,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """
+        Stream a chat completion, reporting latency and token usage if enabled.
+        
+        Args:
+            messages (List[ChatCompletionMessageParam]): Messages to send to the model
+            stage (str): Name of the calling stage, used as a metrics label
+            span (Any): Trace span of the call, receives the token usage
+            tools (Optional[List[Dict[str, Any]]]): Tool schemas the model may call
+            
+        Yields:
+            StreamChunk: Non-empty content chunks and tool-call deltas
+        """
+        if self.metrics is None and self.tracer is None:
+            async for content in self._stream_admitted(messages, tools=tools):
+                yield content
+            return
+        
+        usage: Dict[str, int] = {}
+        outcome = "cancelled"
+        started = time.perf_counter()
+        first_token_seen = False
+        try:
+            async for content in self._stream_admitted(messages, usage, tools):
+                if not first_token_seen:
+                    first_token_seen = True
+                    if self.metrics is not None:
+                        self.metrics.observe("llm_time_to_first_token_seconds", time.perf_counter() - started, stage=stage)
+                yield content
+            outcome = "ok"
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if usage:
+                span.set_attribute("gen_ai.usage.input_tokens", usage.get("prompt_tokens", 0))
+                span.set_attribute("gen_ai.usage.output_tokens", usage.get("completion_tokens", 0))
+            if self.metrics is not None:
+                self.metrics.observe("llm_stream_seconds", time.perf_counter() - started, stage=stage)
+                self.metrics.increment("llm_calls_total", stage=stage, outcome=outcome)
+                if usage:
+                    self.metrics.increment("llm_prompt_tokens_total", usage.get("prompt_tokens", 0), stage=stage)
+                    self.metrics.increment("llm_completion_tokens_total", usage.get("completion_tokens", 0), stage=stage)
+    
+    async def _stream_admitted(
+        self,
+        messages: List[ChatCompletionMessageParam],
+        usage: Optional[Dict[str, int]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """
+        Stream a chat completion once the admission controller, if any, admits it.
+        
+        Args:
+            messages (List[ChatCompletionMessageParam]): Messages to send to the model
+            usage (Optional[Dict[str, int]]): Filled with the token usage reported
+                by the provider, if any
+            tools (Optional[List[Dict[str, Any]]]): Tool schemas the model may call
+            
+        Yields:
+            StreamChunk: Non-empty content chunks and tool-call deltas
+        """
+        if self.admission_controller is not None:
+            tokens = estimate_request_tokens(messages, self.max_tokens)
+            async with self.admission_controller.slot(tokens):
+                async for content in self._stream_model(messages, usage, tools):
+                    yield content
+        else:
+            async for content in self._stream_model(messages, usage, tools):
+                yield content
+    
+    async def _stream_model(
+        self,
+        messages: List[ChatCompletionMessageParam],
+        usage: Optional[Dict[str, int]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """
+        Stream a chat completion, applying the retry policy if one is configured.
+        
+        Args:
+            messages (List[ChatCompletionMessageParam]): Messages to send to the model
+            usage (Optional[Dict[str, int]]): Filled with the token usage reported
+                by the provider, if any
+            tools (Optional[List[Dict[str, Any]]]): Tool schemas the model may call
             
         Yields:
-            str: Response chunks from the language model
+            StreamChunk: Non-empty content chunks and tool-call deltas
             
         Raises:
-            RuntimeError: If command registry is not initialized
+            StreamTimeoutError: If a deadline of the retry policy is missed
         """
-        if not self.command_registry:
-            raise RuntimeError("Command registry not initialized")
+        if self.retry_policy is None:
+            async for content in self._stream_model_once(messages, usage, tools):
+                yield content
+            return
+        
+        # Every attempt reports into its own usage dictionary; only the winner's is kept
+        attempt_usages: Dict[Any, Optional[Dict[str, int]]] = {}
+        winners: List[Any] = []
+        
+        def open_attempt() -> AsyncIterator[StreamChunk]:
+            attempt_usage: Optional[Dict[str, int]] = {} if usage is not None else None
+            stream = self._stream_model_once(messages, attempt_usage, tools)
+            attempt_usages[stream] = attempt_usage
+            return stream
+        
+        def open_hedge() -> AsyncIterator[StreamChunk]:
+            attempt_usage: Optional[Dict[str, int]] = {} if usage is not None else None
+            stream = self._stream_hedge(messages, attempt_usage, tools)
+            attempt_usages[stream] = attempt_usage
+            return stream
+        
+        try:
+            async for content in resilient_stream(open_attempt, self.retry_policy, open_hedge, winners.append):
+                yield content
+        finally:
+            if usage is not None and winners:
+                usage.update(attempt_usages[winners[0]] or {})
+    
+    async def _stream_hedge(
+        self,
+        messages: List[ChatCompletionMessageParam],
+        usage: Optional[Dict[str, int]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """
+        Stream a hedged attempt of a chat completion.
+        
+        The first attempt runs in the admission slot of the call. A hedged
+        attempt is an extra concurrent request, so it waits for an admission
+        slot of its own and counts against the controller's limits.
+        
+        Args:
+            messages (List[ChatCompletionMessageParam]): Messages to send to the model
+            usage (Optional[Dict[str, int]]): Filled with the token usage of this attempt
+            tools (Optional[List[Dict[str, Any]]]): Tool schemas the model may call
             
-        messages: List[ChatCompletionMessageParam] = [
-            {"role": "system", "content": self.prompt_manager.format_system_prompt(self.command_registry.get_all_commands())},
-            {"role": "user", "content": user_input}
-        ]
+        Yields:
+            StreamChunk: Non-empty content chunks and tool-call deltas
+        """
+        if self.admission_controller is None:
+            async for content in self._stream_model_once(messages, usage, tools):
+                yield content
+            return
         
+        async with self.admission_controller.slot(estimate_request_tokens(messages, self.max_tokens)):
+            async for content in self._stream_model_once(messages, usage, tools):
+                yield content
+    
+    async def _stream_model_once(
+        self,
+        messages: List[ChatCompletionMessageParam],
+        usage: Optional[Dict[str, int]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """
+        Make a single streaming chat completion request and yield its text content.
+        
+        Args:
+            messages (List[ChatCompletionMessageParam]): Messages to send to the model
+            usage (Optional[Dict[str, int]]): When given, usage reporting is requested
+                and the dictionary is filled with the prompt and completion token
+                counts from the stream's final chunk
+            tools (Optional[List[Dict[str, Any]]]): Tool schemas the model may call
+            
+        Yields:
+            StreamChunk: Non-empty content chunks from the language model, and
+                the tool-call deltas of each chunk when tools are given
+        """
+        options: Dict[str, Any] = {}
+        if usage is not None:
+            options["stream_options"] = {"include_usage": True}
+        if tools:
+            options["tools"] = tools
+            options["tool_choice"] = "auto"
         stream = await self.client.chat.completions.create(
             model=self.model_name,
             messages=messages,
@@ -203,20 +996,106 @@ class Agent:
             max_tokens=self.max_tokens,
             temperature=self.temperature,
             frequency_penalty=self.frequency_penalty,
-            presence_penalty=self.presence_penalty
+            presence_penalty=self.presence_penalty,
+            **options
         )
         
-        async for chunk in stream:
-            if chunk and hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        try:
+            async for chunk in stream:
+                if usage is not None and getattr(chunk, 'usage', None):
+                    usage["prompt_tokens"] = chunk.usage.prompt_tokens or 0
+                    usage["completion_tokens"] = chunk.usage.completion_tokens or 0
+                if not chunk or not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                content = getattr(delta, 'content', None)
+                if content:
+                    yield content
+                if tools and getattr(delta, 'tool_calls', None):
+                    for tool_call in delta.tool_calls:
+                        yield tool_call
+        finally:
+            # Release the connection even if the consumer stops early or is cancelled
+            await stream.close()
     
-    async def _get_llm_response_with_result(self, result: str, command_name: str) -> AsyncGenerator[str, None]:
+    async def _get_llm_response(
+        self,
+        user_input: str,
+        context: Optional[Dict[str, Any]] = None,
+        history: Optional[List[ChatCompletionMessageParam]] = None,
+        parent_span: Any = None
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """
+        Get streaming response from OpenAI's LLM.
+        
+        In the "tools" routing mode the commands are sent as tool schemas and
+        tool-call deltas are yielded along with the content.
+        
+        Args:
+            user_input (str): User's natural language input
+            context (Optional[Dict[str, Any]]): Known command variable values,
+                sent to the model after the system prompt
+            history (Optional[List[ChatCompletionMessageParam]]): Earlier conversation
+                messages, sent before the user input
+            parent_span (Any): Trace span the LLM call is nested under
+            
+        Yields:
+            StreamChunk: Response chunks from the language model
+            
+        Raises:
+            RuntimeError: If command registry is not initialized
+        """
+        if not self.command_registry:
+            raise RuntimeError("Command registry not initialized")
+            
+        command_names = None
+        if self.command_selector is not None:
+            command_names = self.command_selector.select(user_input, self.command_registry)
+        tools = None
+        if self.routing_mode == ROUTING_MODE_TOOLS:
+            tools = self.tool_catalog.get_tools(self.command_registry, command_names)
+            static_prompt, variable_prompt = self.prompt_manager.format_tool_prompt(), ""
+        else:
+            static_prompt, variable_prompt = self.prompt_manager.get_prompt_parts(self.command_registry, command_names)
+        if self.prompt_cache_hints:
+            # Mark the end of the static prefix for backends with explicit prompt caching
+            system_content: Any = [{"type": "text", "text": static_prompt, "cache_control": {"type": "ephemeral"}}]
+            if variable_prompt:
+                system_content.append({"type": "text", "text": variable_prompt})
+        else:
+            system_content = static_prompt + variable_prompt
+        messages: List[ChatCompletionMessageParam] = [{"role": "system", "content": system_content}]
+        
+        context_message: Optional[ChatCompletionMessageParam] = None
+        if context:
+            context_message = {"role": "system", "content": self.prompt_manager.format_context_prompt(context)}
+        if self.prompt_manager.layout == LAYOUT_CACHE_FRIENDLY:
+            # History only grows between turns, so it stays part of the cached prefix
+            messages.extend(history or [])
+            if context_message:
+                messages.append(context_message)
+        else:
+            if context_message:
+                messages.append(context_message)
+            messages.extend(history or [])
+        messages.append({"role": "user", "content": user_input})
+        
+        async for content in self._stream_completion(messages, stage="route", parent_span=parent_span, tools=tools):
+            yield content
+    
+    async def _get_llm_response_with_result(
+        self,
+        result: str,
+        command_name: str,
+        parent_span: Any = None
+    ) -> AsyncGenerator[str, None]:
         """
         Get streaming response with command execution result.
         
         Args:
             result (str): Result from command execution
             command_name (str): Name of the executed command
+            parent_span (Any): Trace span the LLM call is nested under
             
         Yields:
             str: Formatted response chunks from the language model
@@ -237,27 +1116,23 @@ class Agent:
             {"role": "user", "content": f"Format this result: {result}"}
         ]
         
-        stream = await self.client.chat.completions.create(
-            model=self.model_name,
-            messages=messages,
-            stream=True,
-            max_tokens=self.max_tokens,
-            temperature=self.temperature,
-            frequency_penalty=self.frequency_penalty,
-            presence_penalty=self.presence_penalty
-        )
-        
-        async for chunk in stream:
-            if chunk and hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        cache_key = self._formatting_cache_key(command_name, messages)
+        async for content in self._stream_completion(messages, stage="result", cache_key=cache_key, parent_span=parent_span):
+            yield content
     
-    async def _get_llm_error_response(self, error: str, command_name: str) -> AsyncGenerator[str, None]:
+    async def _get_llm_error_response(
+        self,
+        error: str,
+        command_name: str,
+        parent_span: Any = None
+    ) -> AsyncGenerator[str, None]:
         """
         Get streaming response for error handling.
         
         Args:
             error (str): Error message from command execution
             command_name (str): Name of the command that failed
+            parent_span (Any): Trace span the LLM call is nested under
             
         Yields:
             str: Formatted error response chunks from the language model
@@ -278,16 +1153,55 @@ class Agent:
             {"role": "user", "content": f"Handle this error: {error}"}
         ]
         
-        stream = await self.client.chat.completions.create(
-            model=self.model_name,
-            messages=messages,
-            stream=True,
-            max_tokens=self.max_tokens,
-            temperature=self.temperature,
-            frequency_penalty=self.frequency_penalty,
-            presence_penalty=self.presence_penalty
-        )
+        cache_key = self._formatting_cache_key(command_name, messages)
+        async for content in self._stream_completion(messages, stage="error", cache_key=cache_key, parent_span=parent_span):
+            yield content
+    
+    async def _get_llm_combined_response(
+        self,
+        outcomes: List[Tuple[str, str, bool]],
+        parent_span: Any = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Get one streaming response presenting the results of several commands.
+        
+        The system prompt combines the result_prompt or unsuccessful_prompt of
+        each command, so a turn with several commands needs a single
+        formatting call.
+        
+        Args:
+            outcomes (List[Tuple[str, str, bool]]): Tuple of (command_name,
+                result_message, success_flag) of each executed command
+            parent_span (Any): Trace span the LLM call is nested under
+            
+        Yields:
+            str: Formatted response chunks from the language model
+            
+        Raises:
+            RuntimeError: If command registry is not initialized
+            ValueError: If a command is not found in registry
+        """
+        if not self.command_registry:
+            raise RuntimeError("Command registry not initialized")
+        
+        instructions: Dict[str, str] = {}
+        results: List[str] = []
+        for command_name, result, success in outcomes:
+            command = self.command_registry.get_command(command_name)
+            if not command:
+                raise ValueError(f"Command not found: {command_name}")
+            if success:
+                instructions.setdefault(command_name, command.result_prompt)
+                results.append(f"- {command_name} result: {result}")
+            else:
+                instructions.setdefault(f"{command_name} (failed)", command.unsuccessful_prompt)
+                results.append(f"- {command_name} error: {result}")
+        
+        messages: List[ChatCompletionMessageParam] = [
+            {"role": "system", "content": self.prompt_manager.format_combined_result_prompt(list(instructions.items()))},
+            {"role": "user", "content": "Format these results:\n" + "\n".join(results)}
+        ]
         
-        async for chunk in stream:
-            if chunk and hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content 
\ No newline at end of file
+        cache_key = self._formatting_cache_key(",".join(name for name, _, _ in outcomes), messages)
+        async for content in self._stream_completion(messages, stage="combined", cache_key=cache_key, parent_span=parent_span):
+            yield content
@@ -0,0 +1,136 @@
+"""
+Response caching for the AI Agent framework.
+
+This module provides an in-memory LRU cache with time-to-live expiry for
+streamed LLM responses. Cached responses are stored as the list of chunks
+that were originally streamed, so a cache hit can be replayed to the caller
+as an identical async stream.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+class ResponseCache:
+    """
+    LRU cache with TTL expiry for streamed LLM responses.
+
+    The agent uses it for the result and error formatting calls, which are
+    often made with identical inputs (e.g. the same "Error: Rate limit exceeded"
+    result for many users at once). Entries are keyed by a hash of everything
+    that influences the response: command name, prompt, model parameters and
+    the result text.
+
+    Example Usage:
+        cache = ResponseCache(max_entries=2048, ttl=60.0)
+        agent = Agent(..., response_cache=cache)
+
+    Attributes:
+        max_entries (int): Maximum number of cached responses
+        ttl (Optional[float]): Seconds an entry stays valid, None for no expiry
+        hits (int): Number of cache hits so far
+        misses (int): Number of cache misses so far
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached responses (default: 1024)
+            ttl (Optional[float]): Seconds an entry stays valid, None to keep
+                entries until evicted (default: 300.0)
+            clock (Callable[[], float]): Time source, mainly useful for testing
+                (default: time.monotonic)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[str, ...]]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Build a cache key from JSON-serializable parts.
+
+        Args:
+            *parts (Any): Values that influence the cached response
+
+        Returns:
+            str: SHA-256 hex digest of the serialized parts
+        """
+        serialized = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """
+        Get the cached chunks for a key, counting a hit or a miss.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Optional[List[str]]: Cached response chunks, None on a miss or if the
+                entry has expired
+        """
+        chunks = self.peek(key)
+        if chunks is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return chunks
+
+    def peek(self, key: str) -> Optional[List[str]]:
+        """
+        Get the cached chunks for a key without counting a hit or a miss.
+
+        Used by callers that probe several keys for one lookup and keep their
+        own statistics.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Optional[List[str]]: Cached response chunks, None on a miss or if the
+                entry has expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, chunks = entry
+        if expires_at < self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return list(chunks)
+
+    def set(self, key: str, chunks: List[str]) -> None:
+        """
+        Store response chunks, evicting the least recently used entry if full.
+
+        Args:
+            key (str): Cache key
+            chunks (List[str]): Response chunks in streaming order
+        """
+        expires_at = self._clock() + self.ttl if self.ttl is not None else float("inf")
+        self._entries[key] = (expires_at, tuple(chunks))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Number of cached responses, including entries that have expired but not been evicted."""
+        return len(self._entries)
@@ -0,0 +1,112 @@
+"""
+LLM client management for the AI Agent framework.
+
+This module provides:
+1. Connection pool configuration for the OpenAI-compatible HTTP client
+2. A client factory that shares one connection pool across many agents
+
+Sharing the pool means per-tenant agents reuse warm keep-alive connections
+instead of paying a fresh TCP/TLS handshake on their first request.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+@dataclass
+class ConnectionPoolConfig:
+    """
+    Tuning options for the shared HTTP connection pool.
+
+    Attributes:
+        max_connections (int): Maximum number of concurrent connections (default: 100)
+        max_keepalive_connections (int): Maximum number of idle connections kept
+            alive for reuse (default: 20)
+        keepalive_expiry (float): Seconds an idle connection is kept alive (default: 30.0)
+        http2 (bool): Enable HTTP/2, requires the ``h2`` package, e.g. installed
+            with ``pip install httpx[http2]`` (default: False)
+    """
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+class ClientFactory:
+    """
+    Factory for OpenAI clients that share a single HTTP connection pool.
+
+    Clients are cached per (base_url, api_key) pair, and all of them send their
+    requests through the same underlying ``httpx.AsyncClient``. Agents created
+    with the factory do not own the pool; close it through the factory once all
+    agents are done.
+
+    Example Usage:
+        async with ClientFactory(ConnectionPoolConfig(max_connections=200)) as factory:
+            agent_a = Agent(..., client_factory=factory)
+            agent_b = Agent(..., client_factory=factory)
+
+    Attributes:
+        pool_config (ConnectionPoolConfig): Configuration of the shared pool
+    """
+
+    def __init__(self, pool_config: Optional[ConnectionPoolConfig] = None):
+        """
+        Initialize the client factory.
+
+        Args:
+            pool_config (Optional[ConnectionPoolConfig]): Configuration of the shared
+                connection pool (default: ConnectionPoolConfig())
+        """
+        self.pool_config = pool_config or ConnectionPoolConfig()
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._clients: Dict[Tuple[str, str], AsyncOpenAI] = {}
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """The shared HTTP client, created on first use."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_config.max_connections,
+                    max_keepalive_connections=self.pool_config.max_keepalive_connections,
+                    keepalive_expiry=self.pool_config.keepalive_expiry
+                ),
+                http2=self.pool_config.http2
+            )
+            self._clients = {}
+        return self._http_client
+
+    def get_client(self, base_url: str, api_key: str) -> AsyncOpenAI:
+        """
+        Get an OpenAI client that uses the shared connection pool.
+
+        Args:
+            base_url (str): Base URL for the OpenAI API
+            api_key (str): OpenAI API key
+
+        Returns:
+            AsyncOpenAI: Client bound to the shared pool
+        """
+        http_client = self.http_client
+        key = (base_url, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+            self._clients[key] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close the shared connection pool and forget all cached clients."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self._clients = {}
+
+    async def __aenter__(self) -> "ClientFactory":
+        """Enter the async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Close the shared connection pool when leaving the context."""
+        await self.aclose()
@@ -0,0 +1,230 @@
+"""
+Latency and token metrics for the AI Agent framework.
+
+This module provides:
+1. A MetricsHook interface the agent reports every stage to
+2. An in-process AgentMetrics collector with counters and latency histograms
+3. A Prometheus text exporter that needs no external service
+
+The agent reports the following metrics (``stage`` is "route", "result",
+"error" or "combined" for the single call presenting the results of several
+commands):
+- llm_time_to_first_token_seconds{stage}: time until the first content chunk
+- llm_stream_seconds{stage}: total time of a streamed call
+- llm_calls_total{stage,outcome}: calls by outcome ("ok", "error", "cancelled"
+  or "cached" for replays from the response cache)
+- llm_prompt_tokens_total{stage}, llm_completion_tokens_total{stage}: token
+  usage reported in the stream's ``usage`` field
+- routes_total{source}: how inputs were routed ("routing_cache",
+  "intent_classifier" or "model")
+- command_extraction_seconds, commands_total{result}: command extraction time
+  and whether a command was found ("hit") or not ("miss")
+- command_duration_seconds{command}, command_executions_total{command,success}:
+  handler run time and outcome
+- process_input_seconds: total time of a process_input() call
+"""
+
+import bisect
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+class MetricsHook:
+    """
+    Interface the agent reports its metrics to.
+
+    Every method is a no-op, so subclasses override only what they need, e.g.
+    to forward measurements to StatsD or another metrics library.
+
+    Example Usage:
+        class LoggingMetrics(MetricsHook):
+            def observe(self, name, value, **labels):
+                logger.info("%s %s %.3f", name, labels, value)
+
+        agent = Agent(..., metrics=LoggingMetrics())
+    """
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Record a measurement, such as a duration in seconds.
+
+        Args:
+            name (str): Metric name, e.g. "llm_time_to_first_token_seconds"
+            value (float): Measured value
+            **labels (str): Label values, e.g. stage="route"
+        """
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increase a counter.
+
+        Args:
+            name (str): Metric name, e.g. "llm_calls_total"
+            amount (float): Amount to add (default: 1.0)
+            **labels (str): Label values, e.g. stage="route", outcome="ok"
+        """
+
+class _Histogram:
+    """Cumulative-bucket histogram of observed values."""
+
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self, bucket_count: int):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+
+def _label_set(labels: Dict[str, str]) -> LabelSet:
+    """Turn label keyword arguments into a hashable, sorted key."""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _escape_label_value(value: str) -> str:
+    """Escape backslashes, double quotes and newlines in a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: LabelSet, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    """Format labels in the Prometheus text format."""
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in pairs) + "}"
+
+def _format_value(value: float) -> str:
+    """Format a sample value in the Prometheus text format."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class AgentMetrics(MetricsHook):
+    """
+    In-process metrics collector with a Prometheus text exporter.
+
+    Counters are kept per metric name and label set; observations go into
+    fixed-bucket histograms, so memory stays constant however many requests
+    are recorded. One collector can be shared by several agents.
+
+    Example Usage:
+        metrics = AgentMetrics()
+        agent = Agent(..., metrics=metrics)
+        ...
+        print(metrics.export_prometheus())  # serve this from a /metrics endpoint
+
+    Attributes:
+        namespace (str): Prefix of exported metric names
+        buckets (Tuple[float, ...]): Upper bounds of the histogram buckets
+    """
+
+    def __init__(self, namespace: str = "aigent", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize an empty collector.
+
+        Args:
+            namespace (str): Prefix of exported metric names (default: "aigent")
+            buckets (Sequence[float]): Upper bounds of the histogram buckets
+                (default: DEFAULT_BUCKETS, 5 ms to 60 s)
+        """
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._histograms: Dict[str, Dict[LabelSet, _Histogram]] = {}
+        # Handlers run in worker threads may report too
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record a measurement in the histogram of a metric."""
+        key = _label_set(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                histogram.bucket_counts[index] += 1
+            histogram.count += 1
+            histogram.sum += value
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        """Increase a counter."""
+        key = _label_set(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        """
+        Get the value of a counter.
+
+        Args:
+            name (str): Metric name
+            **labels (str): Label values identifying the series
+
+        Returns:
+            float: Current value, 0.0 if nothing was recorded
+        """
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_set(labels), 0.0)
+
+    def get_summary(self, name: str, **labels: str) -> Dict[str, float]:
+        """
+        Get the count, sum and mean of a histogram.
+
+        Args:
+            name (str): Metric name
+            **labels (str): Label values identifying the series
+
+        Returns:
+            Dict[str, float]: Number of observations, their sum and their mean
+        """
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_set(labels))
+            if histogram is None:
+                return {"count": 0, "sum": 0.0, "mean": 0.0}
+            return {
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "mean": histogram.sum / histogram.count if histogram.count else 0.0
+            }
+
+    def reset(self) -> None:
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def export_prometheus(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text, e.g. to be served from a /metrics endpoint
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                full_name = f"{self.namespace}_{name}"
+                lines.append(f"# TYPE {full_name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                full_name = f"{self.namespace}_{name}"
+                lines.append(f"# TYPE {full_name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items(), key=lambda item: item[0]):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, histogram.bucket_counts):
+                        cumulative += count
+                        lines.append(
+                            f"{full_name}_bucket{_format_labels(labels, [('le', _format_value(bound))])} {cumulative}"
+                        )
+                    lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,239 @@
+"""
+Timeouts, retries and hedged requests for streamed LLM calls.
+
+This module provides:
+1. A retry policy with per-stage deadlines (first token, between chunks, total)
+2. Exponential backoff retries for retriable errors
+3. Optional hedged requests that start a second attempt when the first one is
+   slow to produce its first token, and keep whichever streams first
+
+Retries and hedging only happen before the first chunk has been passed on to
+the caller; once output has been streamed, a failure is raised as-is.
+
+Every attempt is a separate stream opened by the caller, so a caller can give
+each attempt its own state (such as token usage) and keep only the winner's,
+and can admit a hedged attempt separately from the first one.
+"""
+
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, List, Optional, Tuple
+import openai
+
+class StreamTimeoutError(TimeoutError):
+    """Raised when a streamed LLM call misses one of its deadlines."""
+
+# Exceptions from the OpenAI client that are worth retrying
+RETRIABLE_ERRORS: Tuple[type, ...] = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    StreamTimeoutError
+)
+
+@dataclass
+class RetryPolicy:
+    """
+    Deadlines, retries and hedging for streamed LLM calls.
+
+    Attributes:
+        max_retries (int): Number of retries after the first attempt (default: 2)
+        backoff_base (float): Backoff before the first retry, doubled for each
+            further retry, in seconds (default: 0.5)
+        backoff_max (float): Upper bound of the backoff, in seconds (default: 8.0)
+        jitter (float): Random fraction of the backoff added or removed to spread
+            retries out (default: 0.1)
+        first_token_timeout (Optional[float]): Seconds an attempt may take to
+            produce its first chunk (default: None)
+        inter_chunk_timeout (Optional[float]): Seconds allowed between two chunks
+            once streaming has started (default: None)
+        total_timeout (Optional[float]): Seconds allowed for the whole call,
+            including retries (default: None)
+        hedge_after (Optional[float]): Seconds after which a second, hedged attempt
+            is started if the first has not produced a chunk yet, e.g. your p95
+            time-to-first-token (default: None, no hedging)
+    """
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    jitter: float = 0.1
+    first_token_timeout: Optional[float] = None
+    inter_chunk_timeout: Optional[float] = None
+    total_timeout: Optional[float] = None
+    hedge_after: Optional[float] = None
+
+    def backoff(self, retry: int) -> float:
+        """
+        Get the delay before a retry.
+
+        Args:
+            retry (int): Zero-based retry number
+
+        Returns:
+            float: Delay in seconds
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** retry))
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def is_retriable(self, error: BaseException) -> bool:
+        """
+        Check whether an error may succeed on retry.
+
+        Args:
+            error (BaseException): Error raised by an attempt
+
+        Returns:
+            bool: True for connection errors, timeouts, rate limits and server errors
+        """
+        return isinstance(error, RETRIABLE_ERRORS)
+
+class _Attempt:
+    """A single streaming attempt, pumped into a queue by its own task."""
+
+    def __init__(self, open_stream: Callable[[], AsyncIterator[str]]):
+        self.queue: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+        self.stream = open_stream()
+        self.task = asyncio.ensure_future(self._pump())
+
+    async def _pump(self) -> None:
+        try:
+            async for content in self.stream:
+                self.queue.put_nowait(("chunk", content))
+            self.queue.put_nowait(("end", None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            self.queue.put_nowait(("error", error))
+
+    def cancel(self) -> None:
+        self.task.cancel()
+
+def _remaining(deadline: Optional[float], timeout: Optional[float]) -> Optional[float]:
+    """Get the tighter of a relative timeout and the time left until a deadline."""
+    loop = asyncio.get_running_loop()
+    left = deadline - loop.time() if deadline is not None else None
+    if left is None:
+        return timeout
+    if timeout is None:
+        return max(left, 0.0)
+    return max(min(left, timeout), 0.0)
+
+async def _first_event(
+    open_stream: Callable[[], AsyncIterator[str]],
+    open_hedge: Callable[[], AsyncIterator[str]],
+    policy: RetryPolicy,
+    deadline: Optional[float]
+) -> Tuple[_Attempt, Tuple[str, Any]]:
+    """
+    Run one attempt (plus an optional hedge) until a chunk or the end arrives.
+
+    Returns:
+        Tuple[_Attempt, Tuple[str, Any]]: The winning attempt and its first event
+
+    Raises:
+        StreamTimeoutError: If no attempt produced a chunk in time
+        Exception: The error of the last failing attempt
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    attempts: List[_Attempt] = [_Attempt(open_stream)]
+    waiters = {asyncio.ensure_future(attempts[0].queue.get()): attempts[0]}
+    hedged = policy.hedge_after is None
+    last_error: Optional[BaseException] = None
+    try:
+        while waiters:
+            first_token_left = (
+                policy.first_token_timeout - (loop.time() - started)
+                if policy.first_token_timeout is not None else None
+            )
+            timeout = _remaining(deadline, first_token_left)
+            if not hedged:
+                hedge_left = max(policy.hedge_after - (loop.time() - started), 0.0)
+                timeout = hedge_left if timeout is None else min(timeout, hedge_left)
+
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if not hedged and loop.time() - started >= policy.hedge_after:
+                    hedged = True
+                    hedge = _Attempt(open_hedge)
+                    attempts.append(hedge)
+                    waiters[asyncio.ensure_future(hedge.queue.get())] = hedge
+                    continue
+                raise StreamTimeoutError("Timed out waiting for the first chunk")
+
+            for waiter in done:
+                attempt = waiters.pop(waiter)
+                event = waiter.result()
+                if event[0] == "error":
+                    last_error = event[1]
+                    continue
+                attempts.remove(attempt)
+                return attempt, event
+        raise last_error
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+        for attempt in attempts:
+            attempt.cancel()
+
+async def resilient_stream(
+    open_stream: Callable[[], AsyncIterator[str]],
+    policy: RetryPolicy,
+    open_hedge: Optional[Callable[[], AsyncIterator[str]]] = None,
+    on_winner: Optional[Callable[[AsyncIterator[str]], None]] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Stream content with deadlines, retries and optional hedging.
+
+    Args:
+        open_stream (Callable[[], AsyncIterator[str]]): Starts a new streaming
+            attempt and returns its content chunks
+        policy (RetryPolicy): Deadlines, retry and hedging configuration
+        open_hedge (Optional[Callable[[], AsyncIterator[str]]]): Starts a hedged
+            attempt, e.g. one that waits for its own admission slot
+            (default: open_stream)
+        on_winner (Optional[Callable[[AsyncIterator[str]], None]]): Called with
+            the stream of the attempt whose chunks are passed on, before the
+            first of them; the streams of the other attempts are discarded
+
+    Yields:
+        str: Content chunks of the winning attempt
+
+    Raises:
+        StreamTimeoutError: If a deadline is missed and retries are exhausted
+        Exception: The last error if it is not retriable or retries are exhausted
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.total_timeout if policy.total_timeout is not None else None
+
+    retry = 0
+    while True:
+        try:
+            attempt, event = await _first_event(open_stream, open_hedge or open_stream, policy, deadline)
+            break
+        except Exception as error:
+            if retry >= policy.max_retries or not policy.is_retriable(error):
+                raise
+            delay = policy.backoff(retry)
+            if deadline is not None and loop.time() + delay >= deadline:
+                raise
+            await asyncio.sleep(delay)
+            retry += 1
+
+    if on_winner is not None:
+        on_winner(attempt.stream)
+    try:
+        while event[0] == "chunk":
+            yield event[1]
+            try:
+                event = await asyncio.wait_for(
+                    attempt.queue.get(),
+                    timeout=_remaining(deadline, policy.inter_chunk_timeout)
+                )
+            except asyncio.TimeoutError:
+                raise StreamTimeoutError("Timed out waiting for the next chunk") from None
+        if event[0] == "error":
+            raise event[1]
+    finally:
+        attempt.cancel()
@@ -0,0 +1,364 @@
+"""
+Multi-turn conversation sessions for the AI Agent framework.
+
+This module provides:
+1. A Session that keeps a bounded, compact conversation history on top of an Agent
+2. Token-budgeted trimming of old turns, with optional summarization
+3. Pluggable session stores (in-memory LRU and SQLite)
+
+Every session is memory-bounded: history lives in a fixed-size ring buffer,
+individual messages and the running summary are capped in length, and old
+turns are dropped once the history exceeds its token budget.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from functools import partial
+from typing import Any, AsyncGenerator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from ..prompts.tokens import TokenEstimator
+
+# (role, content) pair; tuples keep per-message overhead low
+HistoryEntry = Tuple[str, str]
+
+class SessionStore(ABC):
+    """
+    Base class for session persistence.
+
+    Stores keep each session's state as a JSON-serializable dictionary.
+    Subclasses implement load(), save() and delete().
+    """
+
+    @abstractmethod
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the state of a session.
+
+        Args:
+            session_id (str): Session identifier
+
+        Returns:
+            Optional[Dict[str, Any]]: Stored state, None if the session is unknown
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        """
+        Save the state of a session.
+
+        Args:
+            session_id (str): Session identifier
+            state (Dict[str, Any]): JSON-serializable session state
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """
+        Delete a session.
+
+        Args:
+            session_id (str): Session identifier
+        """
+        raise NotImplementedError
+
+class InMemorySessionStore(SessionStore):
+    """
+    In-process session store with LRU eviction.
+
+    Attributes:
+        max_sessions (Optional[int]): Maximum number of sessions kept, None for no limit
+    """
+
+    def __init__(self, max_sessions: Optional[int] = 100000):
+        """
+        Initialize the store.
+
+        Args:
+            max_sessions (Optional[int]): Maximum number of sessions kept before the
+                least recently used one is evicted (default: 100000)
+        """
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, str]" = OrderedDict()
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Load the state of a session."""
+        serialized = self._sessions.get(session_id)
+        if serialized is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        return json.loads(serialized)
+
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Save the state of a session, evicting the least recently used one if full."""
+        # States are kept serialized: one compact string per session
+        self._sessions[session_id] = json.dumps(state, separators=(",", ":"))
+        self._sessions.move_to_end(session_id)
+        while self.max_sessions is not None and len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str) -> None:
+        """Delete a session."""
+        self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        """Number of stored sessions."""
+        return len(self._sessions)
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store backed by a SQLite database.
+
+    Database calls run in the event loop's default executor so they do not
+    block other conversations.
+
+    Attributes:
+        path (str): Path of the database file, or ":memory:"
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store and create its table if needed.
+
+        Args:
+            path (str): Path of the database file, or ":memory:"
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking database call in the default executor."""
+        return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
+
+    def _load(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _save(self, session_id: str, serialized: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sessions (id, state) VALUES (?, ?)", (session_id, serialized)
+            )
+
+    def _delete(self, session_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Load the state of a session."""
+        serialized = await self._run(self._load, session_id)
+        return json.loads(serialized) if serialized is not None else None
+
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Save the state of a session."""
+        await self._run(self._save, session_id, json.dumps(state, separators=(",", ":")))
+
+    async def delete(self, session_id: str) -> None:
+        """Delete a session."""
+        await self._run(self._delete, session_id)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._connection.close()
+
+class Session:
+    """
+    Multi-turn conversation with an Agent.
+
+    Each call to process_input() sends the recent conversation history to the
+    model along with the new input, then records the input and the response
+    the user saw. History is kept within three bounds:
+    - at most ``max_turns`` user/assistant exchanges (a ring buffer)
+    - at most ``max_history_tokens`` tokens, counted with the agent's token
+      estimator; the oldest exchanges are dropped first, and passed to
+      ``summarizer`` if one is configured
+    - at most ``max_message_chars`` characters per stored message
+
+    Example Usage:
+        store = SQLiteSessionStore("sessions.db")
+        session = await Session.load(agent, "user123", store=store)
+        async for chunk in session.process_input("Create me a wallet", context={"user_id": "user123"}):
+            print(chunk, end="")
+
+    Exchanges are always kept or dropped whole, so the history never starts
+    with an assistant reply whose question is gone.
+
+    Attributes:
+        agent (Agent): Agent that processes the inputs
+        session_id (str): Session identifier
+        store (Optional[SessionStore]): Where the session is persisted after each turn
+        summary (str): Summary of turns that no longer fit in the history
+        token_estimator (TokenEstimator): Token counter of the history budget, the
+            agent's own estimator when it has one
+    """
+
+    __slots__ = (
+        "agent", "session_id", "store", "max_turns", "max_history_tokens",
+        "max_message_chars", "max_summary_chars", "summarizer", "summary",
+        "token_estimator", "_history"
+    )
+
+    def __init__(
+        self,
+        agent: Any,
+        session_id: str,
+        store: Optional[SessionStore] = None,
+        max_turns: int = 10,
+        max_history_tokens: int = 1000,
+        max_message_chars: int = 2000,
+        max_summary_chars: int = 1000,
+        summarizer: Optional[Callable[[str, List[Dict[str, str]]], Awaitable[str]]] = None
+    ):
+        """
+        Initialize an empty session.
+
+        Args:
+            agent (Agent): Agent that processes the inputs
+            session_id (str): Session identifier
+            store (Optional[SessionStore]): Store the session is saved to after every
+                turn (default: None, not persisted)
+            max_turns (int): Maximum number of user/assistant exchanges kept (default: 10)
+            max_history_tokens (int): Token budget of the history sent to the model
+                (default: 1000)
+            max_message_chars (int): Longer messages are truncated before being stored
+                (default: 2000)
+            max_summary_chars (int): Maximum length of the running summary (default: 1000)
+            summarizer (Optional[Callable[[str, List[Dict[str, str]]], Awaitable[str]]]):
+                Coroutine function receiving the current summary and the messages
+                being dropped, returning the new summary. Dropped turns are simply
+                discarded when None (default: None)
+        """
+        self.agent = agent
+        self.session_id = session_id
+        self.store = store
+        self.max_turns = max_turns
+        self.max_history_tokens = max_history_tokens
+        self.max_message_chars = max_message_chars
+        self.max_summary_chars = max_summary_chars
+        self.summarizer = summarizer
+        self.summary = ""
+        self.token_estimator: TokenEstimator = getattr(agent, "token_estimator", None) or TokenEstimator()
+        self._history: Deque[HistoryEntry] = deque(maxlen=max_turns * 2)
+
+    @classmethod
+    async def load(cls, agent: Any, session_id: str, store: SessionStore, **kwargs: Any) -> "Session":
+        """
+        Load a session from a store, or start a new one if it is unknown.
+
+        Args:
+            agent (Agent): Agent that processes the inputs
+            session_id (str): Session identifier
+            store (SessionStore): Store to load from and save to
+            **kwargs (Any): Further Session options
+
+        Returns:
+            Session: The restored or new session
+        """
+        session = cls(agent, session_id, store=store, **kwargs)
+        state = await store.load(session_id)
+        if state:
+            session.summary = state.get("summary", "")
+            session._history.extend((role, content) for role, content in state.get("history", []))
+            # State that was not written by to_state(), e.g. edited or migrated
+            # by other code, may start with an assistant reply
+            while session._history and session._history[0][0] != "user":
+                session._history.popleft()
+        return session
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        Get the JSON-serializable state of the session.
+
+        Returns:
+            Dict[str, Any]: Summary and history of the session
+        """
+        return {"summary": self.summary, "history": [list(entry) for entry in self._history]}
+
+    def get_history(self) -> List[Dict[str, str]]:
+        """
+        Get the history messages sent to the model with the next input.
+
+        Returns:
+            List[Dict[str, str]]: Chat messages, starting with the summary if any
+        """
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        messages.extend({"role": role, "content": content} for role, content in self._history)
+        return messages
+
+    def _history_tokens(self) -> int:
+        """Count the tokens of the stored history and summary."""
+        count = self.token_estimator.count
+        return (count(self.summary) if self.summary else 0) + sum(count(content) for _, content in self._history)
+
+    async def _append_turn(self, user_input: str, response: str) -> None:
+        """Record an exchange, dropping or summarizing old exchanges to stay within bounds."""
+        if len(self._history) + 2 > self._history.maxlen:
+            # The ring buffer would otherwise drop the oldest message on its own
+            await self._drop_oldest(len(self._history) + 2 - self._history.maxlen)
+        self._history.append(("user", user_input[:self.max_message_chars]))
+        self._history.append(("assistant", response[:self.max_message_chars]))
+
+        # Drop the oldest exchanges until the history fits the token budget,
+        # always keeping the exchange just added
+        excess_tokens = self._history_tokens() - self.max_history_tokens
+        count = 0
+        while excess_tokens > 0 and count < len(self._history) - 2:
+            excess_tokens -= self.token_estimator.count(self._history[count][1])
+            excess_tokens -= self.token_estimator.count(self._history[count + 1][1])
+            count += 2
+        if count:
+            await self._drop_oldest(count)
+
+    async def _drop_oldest(self, count: int) -> None:
+        """Remove the oldest messages, passing them to the summarizer if configured."""
+        dropped = [self._history.popleft() for _ in range(min(count, len(self._history)))]
+        if self.summarizer is not None and dropped:
+            summary = await self.summarizer(
+                self.summary, [{"role": role, "content": content} for role, content in dropped]
+            )
+            self.summary = summary[:self.max_summary_chars]
+
+    async def process_input(
+        self,
+        user_input: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Process user input with the conversation history and record the turn.
+
+        Args:
+            user_input (str): Natural language input from the user
+            context (Optional[Dict[str, Any]]): Known command variable values
+
+        Yields:
+            str: Response chunks from the agent
+        """
+        chunks: List[str] = []
+        async for chunk in self.agent.process_input(user_input, context, history=self.get_history()):
+            chunks.append(chunk)
+            yield chunk
+
+        await self._append_turn(user_input, "".join(chunks))
+        if self.store is not None:
+            await self.store.save(self.session_id, self.to_state())
+
+    async def clear(self) -> None:
+        """Forget the history and summary, and delete the session from its store."""
+        self._history.clear()
+        self.summary = ""
+        if self.store is not None:
+            await self.store.delete(self.session_id)
@@ -0,0 +1,137 @@
+"""
+Streaming helpers for the AI Agent framework.
+
+This module provides:
+1. Incremental detection of command blocks in streamed LLM output
+2. Classification of a response as containing a command or only prose
+
+The detector lets the agent forward prose to the caller as soon as it is
+clear it cannot be part of a command block, instead of waiting for the whole
+completion to finish.
+"""
+
+from typing import List
+
+COMMAND_PREFIX = "[["
+COMMAND_SUFFIX = "]]"
+
+class CommandPrefixDetector:
+    """
+    Incremental classifier for streamed LLM responses.
+
+    The system prompt asks the model to answer with only the command pattern
+    when a command matches, but models sometimes add a preamble such as
+    "Sure! [[GENERATE_WALLET_user123]]". The detector therefore releases text
+    up to the first "[" that may open a command block, and holds everything
+    from there on:
+    - a "[" not followed by another "[" is released with the following text
+    - a "[[" whose line ends before a closing "]]" cannot be a command block
+      (blocks never span lines) and is released
+    - once a complete "[[...]]" block has been seen, the response is
+      classified as a command and the rest of the stream is held back, so the
+      caller can extract the commands from the full text
+
+    Leading whitespace is held until the first visible character, so a
+    response made of only a command releases nothing.
+
+    Example Usage:
+        detector = CommandPrefixDetector()
+        for chunk in chunks:
+            released = detector.feed(chunk)
+            if released:
+                print(released, end="")
+        commands = extract_commands(detector.text)
+        if not commands:
+            print(detector.flush(), end="")
+
+    Attributes:
+        decision (Optional[str]): "command" once a complete block was seen, None before
+    """
+
+    COMMAND = "command"
+
+    def __init__(self, prefix: str = COMMAND_PREFIX, suffix: str = COMMAND_SUFFIX):
+        """
+        Initialize the detector.
+
+        Args:
+            prefix (str): Opening of a command block (default: "[[")
+            suffix (str): Closing of a command block (default: "]]")
+        """
+        self.prefix = prefix
+        self.suffix = suffix
+        self.decision = None
+        self._released: List[str] = []
+        self._buffer: List[str] = []
+
+    @property
+    def is_command(self) -> bool:
+        """Whether a complete command block has been seen."""
+        return self.decision == self.COMMAND
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far, released or not."""
+        return "".join(self._released) + "".join(self._buffer)
+
+    def feed(self, chunk: str) -> str:
+        """
+        Feed the next streamed chunk into the detector.
+
+        Args:
+            chunk (str): Next chunk of the streamed response
+
+        Returns:
+            str: Text that can be forwarded to the caller right away. Empty while
+                the text may be part of a command block.
+        """
+        self._buffer.append(chunk)
+        if self.decision == self.COMMAND:
+            return ""
+
+        held = "".join(self._buffer)
+        released = ""
+        while True:
+            start = held.find(self.prefix)
+            if start == -1:
+                # Keep a trailing partial prefix, e.g. a "[" split from its pair
+                keep = next(
+                    (size for size in range(len(self.prefix) - 1, 0, -1) if held.endswith(self.prefix[:size])),
+                    0
+                )
+                cut = len(held) - keep
+                break
+            end = held.find(self.suffix, start + len(self.prefix))
+            line_end = held.find("\n", start + len(self.prefix))
+            if end != -1 and (line_end == -1 or end < line_end):
+                self.decision = self.COMMAND
+                cut = start
+                break
+            if line_end == -1:
+                # Undecided until the block closes or its line ends
+                cut = start
+                break
+            released += held[:line_end + 1]
+            held = held[line_end + 1:]
+
+        released += held[:cut]
+        if not self._released and released.isspace():
+            # Nothing visible yet: the response may still be only a command
+            return ""
+        self._buffer = [held[cut:]] if cut < len(held) else []
+        if released:
+            self._released.append(released)
+        return released
+
+    def flush(self) -> str:
+        """
+        Release everything held back so far.
+
+        Returns:
+            str: Held text, emptying the internal buffer
+        """
+        text = "".join(self._buffer)
+        if text:
+            self._released.append(text)
+        self._buffer = []
+        return text
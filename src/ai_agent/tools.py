@@ -0,0 +1,175 @@
+"""
+Tool/function-calling routing for the AI Agent framework.
+
+This module provides:
+1. Conversion of CommandMetadata into OpenAI tool schemas, cached per command
+2. An accumulator for streamed tool-call deltas that reports a call as soon
+   as its arguments form complete JSON
+
+In the "tools" routing mode the model selects a command through the API's
+native function calling instead of emitting "[[PATTERN]]" text, so the
+arguments arrive schema-constrained and need no pattern parsing. Variables
+are passed by name, so values may contain any character, including "}".
+Models do not always honour the schema, so the agent checks the argument
+names against the command's variables before dispatching a call.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Route by parsing "[[PATTERN]]" text in the model's response
+ROUTING_MODE_PATTERN = "pattern"
+# Route through native tool/function calling
+ROUTING_MODE_TOOLS = "tools"
+
+ROUTING_MODES = (ROUTING_MODE_PATTERN, ROUTING_MODE_TOOLS)
+
+def command_to_tool(metadata: Any) -> Dict[str, Any]:
+    """
+    Convert a command into an OpenAI tool schema.
+
+    Every variable becomes a required string parameter described by its
+    description and example.
+
+    Args:
+        metadata (CommandMetadata): Command to convert
+
+    Returns:
+        Dict[str, Any]: Tool definition for the ``tools`` request parameter
+    """
+    description = metadata.description.rstrip(".")
+    if metadata.explanation:
+        description = f"{description}. {metadata.explanation}"
+    return {
+        "type": "function",
+        "function": {
+            "name": metadata.name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    variable.name: {
+                        "type": "string",
+                        "description": f"{variable.description} (Example: {variable.example})"
+                    }
+                    for variable in metadata.variables
+                },
+                "required": [variable.name for variable in metadata.variables],
+                "additionalProperties": False
+            }
+        }
+    }
+
+class ToolCatalog:
+    """
+    Cache of tool schemas for the commands of a registry.
+
+    Schemas are rebuilt only for commands added or replaced since the last
+    registry version, so building the ``tools`` parameter of a request is a
+    list lookup.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty catalog."""
+        self._tools: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+        self._all_tools: List[Dict[str, Any]] = []
+        self._synced_key: Optional[Tuple[int, int]] = None
+
+    def _sync(self, registry: Any) -> None:
+        """Patch the cached schemas to match the registry, once per registry version."""
+        synced_key = (id(registry), registry.version)
+        if synced_key == self._synced_key:
+            return
+        tools: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+        for name, metadata in registry.commands.items():
+            cached = self._tools.get(name)
+            tools[name] = cached if cached is not None and cached[0] is metadata else (metadata, command_to_tool(metadata))
+        self._tools = tools
+        self._all_tools = [tool for _, tool in tools.values()]
+        self._synced_key = synced_key
+
+    def get_tools(self, registry: Any, command_names: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Get the tool schemas of a registry's commands.
+
+        Args:
+            registry (Any): Command registry exposing ``commands`` and ``version``
+            command_names (Optional[Sequence[str]]): Commands to include, None for
+                all of them. Unknown names are ignored
+
+        Returns:
+            List[Dict[str, Any]]: Tool definitions
+        """
+        self._sync(registry)
+        if command_names is None:
+            return self._all_tools
+        return [self._tools[name][1] for name in command_names if name in self._tools]
+
+class ToolCallAccumulator:
+    """
+    Reassembles tool calls from streamed tool-call deltas.
+
+    The API streams each call's name first and its JSON arguments in
+    fragments. A call is reported complete as soon as its arguments parse,
+    so the caller can dispatch it while later calls are still streaming.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty accumulator."""
+        self._names: Dict[int, str] = {}
+        self._arguments: Dict[int, List[str]] = {}
+        self._completed: Dict[int, Tuple[str, Dict[str, str]]] = {}
+
+    def feed(self, delta: Any) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        Add a streamed tool-call delta.
+
+        Args:
+            delta (Any): A ``ChoiceDeltaToolCall`` from a streamed chunk
+
+        Returns:
+            Optional[Tuple[str, Dict[str, str]]]: Tuple of (command_name, variables)
+                if this delta completed a call, None otherwise
+        """
+        index = delta.index or 0
+        function = delta.function
+        if function is None or index in self._completed:
+            return None
+        if function.name:
+            self._names[index] = self._names.get(index, "") + function.name
+        if function.arguments:
+            self._arguments.setdefault(index, []).append(function.arguments)
+            # Only a closing brace can complete a JSON object
+            if function.arguments.rstrip().endswith("}"):
+                return self._try_complete(index)
+        return None
+
+    def _try_complete(self, index: int) -> Optional[Tuple[str, Dict[str, str]]]:
+        """Parse the arguments of a call, recording it if they are complete."""
+        name = self._names.get(index)
+        if not name:
+            return None
+        text = "".join(self._arguments.get(index, [])) or "{}"
+        try:
+            arguments = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(arguments, dict):
+            return None
+        call = (name, {key: value if isinstance(value, str) else json.dumps(value) for key, value in arguments.items()})
+        self._completed[index] = call
+        return call
+
+    def finish(self) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        Complete the remaining calls once the stream has ended.
+
+        Calls streamed without arguments are completed here; calls whose
+        arguments never formed valid JSON are dropped.
+
+        Returns:
+            List[Tuple[str, Dict[str, str]]]: Calls completed by this method, in
+                stream order, excluding those already returned by feed()
+        """
+        remaining = [index for index in sorted(self._names) if index not in self._completed]
+        return [call for call in map(self._try_complete, remaining) if call is not None]
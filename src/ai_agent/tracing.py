@@ -0,0 +1,137 @@
+"""
+Tracing for the AI Agent framework.
+
+This module provides:
+1. A Tracer interface the agent emits nested spans through
+2. An OpenTelemetry-backed tracer (requires the optional opentelemetry-api package)
+
+Spans are parented explicitly rather than through the "current span" context,
+because the agent's spans wrap async generators that yield to the caller
+between chunks. Only the outermost span of a turn picks up the caller's
+current span as its parent.
+
+Without a tracer the agent uses a shared no-op span, so tracing costs nothing
+when disabled.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Optional
+
+class _NoOpSpan:
+    """Span that ignores everything, used when tracing is disabled."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+NOOP_SPAN = _NoOpSpan()
+# nullcontext instances are reusable, so one serves every disabled span
+NOOP_SPAN_CONTEXT = nullcontext(NOOP_SPAN)
+
+class Tracer(ABC):
+    """
+    Interface the agent emits trace spans through.
+
+    Subclasses implement start_span() and end_span(); spans they return must
+    provide ``set_attribute(key, value)``.
+
+    The agent emits these spans, nested under "aigent.process_input":
+    - aigent.llm: every LLM call, with the stage, model, cache hit and token usage
+    - aigent.extract_command: command extraction from the routing response
+    - aigent.execute_command: the command handler, with its name and outcome
+    """
+
+    @abstractmethod
+    def start_span(self, name: str, parent: Any = None, attributes: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Start a span.
+
+        Args:
+            name (str): Span name, e.g. "aigent.llm"
+            parent (Any): Parent span, None to use the caller's current span
+            attributes (Optional[Dict[str, Any]]): Initial span attributes
+
+        Returns:
+            Any: The started span
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def end_span(self, span: Any, error: Optional[BaseException] = None) -> None:
+        """
+        End a span.
+
+        Args:
+            span (Any): Span returned by start_span()
+            error (Optional[BaseException]): Exception that ended the span's work, if any
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def span(self, name: str, parent: Any = None, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        """
+        Trace a block of code.
+
+        Args:
+            name (str): Span name
+            parent (Any): Parent span, None to use the caller's current span
+            attributes (Optional[Dict[str, Any]]): Initial span attributes
+
+        Yields:
+            Any: The started span, ended when the block exits
+        """
+        span = self.start_span(name, parent, attributes)
+        error: Optional[BaseException] = None
+        try:
+            yield span
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.end_span(span, error)
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Tracer that emits OpenTelemetry spans.
+
+    Spans go to whatever tracer provider the application configured, so they
+    appear next to the application's own spans, e.g. under the HTTP request
+    that called the agent.
+
+    Example Usage:
+        agent = Agent(..., tracer=OpenTelemetryTracer())
+    """
+
+    def __init__(self, tracer: Any = None, instrumentation_name: str = "aigent"):
+        """
+        Initialize the tracer.
+
+        Args:
+            tracer (Any): OpenTelemetry tracer to use (default: one obtained from
+                the global tracer provider)
+            instrumentation_name (str): Instrumentation scope name used when no
+                tracer is given (default: "aigent")
+
+        Raises:
+            ImportError: If opentelemetry-api is not installed
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError("opentelemetry-api is required for tracing: pip install opentelemetry-api") from e
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer(instrumentation_name)
+
+    def start_span(self, name: str, parent: Any = None, attributes: Optional[Dict[str, Any]] = None) -> Any:
+        """Start an OpenTelemetry span, explicitly parented when a parent is given."""
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        return self._tracer.start_span(name, context=context, attributes=attributes)
+
+    def end_span(self, span: Any, error: Optional[BaseException] = None) -> None:
+        """End an OpenTelemetry span, recording the error if any."""
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(error)))
+        span.end()
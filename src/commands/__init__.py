@@ -3,11 +3,20 @@ Command system for the AI agent.
 """
 
 from .base import CommandRegistry, CommandMetadata, command
+from .matching import PrefixIndexMatcher, AlternationMatcher
+from .planning import PlanError, PlanEvent, PlanExecutor, PlanStep, parse_plan
 from ..prompts.prompt_manager import VariableMetadata
 
 __all__ = [
     'CommandRegistry',
     'CommandMetadata',
     'command',
+    'PrefixIndexMatcher',
+    'AlternationMatcher',
+    'PlanExecutor',
+    'PlanStep',
+    'PlanEvent',
+    'PlanError',
+    'parse_plan',
     'VariableMetadata'
 ] 
\ No newline at end of file
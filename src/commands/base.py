@@ -10,13 +10,28 @@ The module uses a decorator-based approach to register commands with their metad
 making it easy to add new commands while maintaining a consistent structure.
 """
 
+import inspect
 from typing import Callable, Dict, List, TypeVar, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import wraps
-from ..prompts.prompt_manager import VariableMetadata
+from ..prompts.prompt_manager import SystemPromptManager, VariableMetadata
+from .execution import EXECUTION_THREAD, validate_execution_policy
+from .matching import PrefixIndexMatcher
 
 T = TypeVar('T')
 
+# Format command results with a second LLM call using result_prompt/unsuccessful_prompt
+RESPONSE_MODE_LLM = "llm"
+# Render results locally using the example responses as templates
+RESPONSE_MODE_TEMPLATE = "template"
+# Return the handler's result unchanged
+RESPONSE_MODE_RAW = "raw"
+
+RESPONSE_MODES = (RESPONSE_MODE_LLM, RESPONSE_MODE_TEMPLATE, RESPONSE_MODE_RAW)
+
+# Placeholder replaced by the actual result in "template" response mode
+RESULT_PLACEHOLDER = "{result}"
+
 @dataclass
 class CommandMetadata:
     """
@@ -38,8 +53,20 @@ class CommandMetadata:
         handler (Callable): Function that implements the command's functionality
         result_prompt (str): Template for formatting successful results
         unsuccessful_prompt (str): Template for formatting error messages
-        example_success_responses (List[Dict[str, str]]): Example successful responses
-        example_failed_responses (List[Dict[str, str]]): Example error responses
+        example_success_responses (List[Dict[str, str]]): Example successful responses,
+            each with "result" and "response" keys. In "template" mode the first
+            response is the template and must contain a "{result}" placeholder
+        example_failed_responses (List[Dict[str, str]]): Example error responses, in
+            the same format as example_success_responses
+        execution (str): How a sync handler is run: "thread" (default), "process"
+            or "inline". ``async def`` handlers are always awaited directly.
+        response_mode (str): How results are presented: "llm" (default), "template"
+            or "raw"
+        priority (int): Importance in the system prompt; when the prompt exceeds
+            its token budget, lower-priority commands are trimmed first (default: 0)
+        prompt_fragment (str): Rendered system prompt block of the command, set by
+            render_prompt_fragment() when the command is registered; its token
+            count is left to the prompt manager's TokenEstimator
     """
     name: str
     description: str
@@ -52,6 +79,96 @@ class CommandMetadata:
     unsuccessful_prompt: str
     example_success_responses: List[Dict[str, str]]
     example_failed_responses: List[Dict[str, str]]
+    execution: str = EXECUTION_THREAD
+    response_mode: str = RESPONSE_MODE_LLM
+    priority: int = 0
+    prompt_fragment: str = field(default="", repr=False, compare=False)
+    
+    def prompt_info(self) -> Dict[str, Any]:
+        """
+        Describe the command in the format used for system prompt generation.
+        
+        Returns:
+            Dict[str, Any]: Pattern, description, explanation, variables and
+                example inputs of the command
+        """
+        return {
+            "pattern": self.pattern,
+            "description": self.description,
+            "explanation": self.explanation,
+            "variables": [
+                {"name": var.name, "description": var.description, "example": var.example}
+                for var in self.variables
+            ],
+            "example_inputs": self.example_inputs
+        }
+    
+    def render_prompt_fragment(self) -> str:
+        """
+        Render and store the command's system prompt block.
+        
+        Registries call this once at registration, so system prompts are
+        assembled by joining the stored blocks instead of re-rendering every
+        command on each request.
+        
+        Returns:
+            str: The rendered block
+        """
+        self.prompt_fragment = SystemPromptManager.format_command(self.name, self.prompt_info())
+        return self.prompt_fragment
+    
+    def render_response(self, result: Any, success: bool) -> str:
+        """
+        Render a command result locally, without calling the language model.
+        
+        In "template" mode the first example response of the matching kind
+        (success or failure) is used as a template, with "{result}" replaced by
+        the actual result. Without an example, without a "{result}" placeholder
+        in it, and in "raw" mode, the result is returned unchanged, so example
+        data is never shown in place of the real result.
+        
+        Args:
+            result (Any): Result or error message from command execution
+            success (bool): Whether the command executed successfully
+            
+        Returns:
+            str: Response to show to the user
+        """
+        result = str(result)
+        if self.response_mode != RESPONSE_MODE_TEMPLATE:
+            return result
+        examples = self.example_success_responses if success else self.example_failed_responses
+        if not examples:
+            return result
+        template = examples[0]["response"]
+        if RESULT_PLACEHOLDER not in template:
+            return result
+        return template.replace(RESULT_PLACEHOLDER, result)
+    
+    def validate_variables(self, variables: Dict[str, Any]) -> None:
+        """
+        Check that variable values match the command's declared variables exactly.
+        
+        Values extracted from the command pattern always do; values supplied by
+        name (tool calls, plan steps) are checked with this before the handler
+        is called.
+        
+        Args:
+            variables (Dict[str, Any]): Variable values by name
+            
+        Raises:
+            ValueError: If a declared variable is missing or an undeclared one is given
+        """
+        declared = [var.name for var in self.variables]
+        missing = [name for name in declared if name not in variables]
+        unexpected = [name for name in variables if name not in declared]
+        if missing:
+            raise ValueError(f"Missing variables for command {self.name}: {', '.join(missing)}")
+        if unexpected:
+            raise ValueError(
+                f"Unsupported variables for command {self.name}: {', '.join(unexpected)}. "
+                f"Expected one of: {', '.join(declared) or 'none'}"
+            )
 
 class CommandRegistry:
     """
@@ -64,11 +181,17 @@ class CommandRegistry:
     - Each command has a unique name
     - All required metadata is provided
     - Commands can be easily looked up by name
+    
+    Every registration or removal bumps ``version``, which lets consumers such as
+    the SystemPromptManager cache data derived from the registry. Command patterns
+    are compiled into ``matcher`` at registration time.
     """
     
     _instance = None
     _initialized = False
     commands: Dict[str, CommandMetadata]
+    version: int
+    matcher: Any
     
     def __new__(cls):
         """
@@ -85,6 +208,8 @@ class CommandRegistry:
         """Initialize the command registry if not already initialized."""
         if not self._initialized:
             self.commands = {}
+            self.version = 0
+            self.matcher = PrefixIndexMatcher()
             self._initialized = True
     
     @classmethod
@@ -106,7 +231,41 @@ class CommandRegistry:
         Args:
             metadata (CommandMetadata): Complete metadata for the command
         """
+        metadata.render_prompt_fragment()
         self.commands[metadata.name] = metadata
+        self.matcher.add(metadata)
+        self.version += 1
+    
+    def unregister(self, name: str) -> Optional[CommandMetadata]:
+        """
+        Remove a command from the registry.
+        
+        Args:
+            name (str): Name of the command to remove
+            
+        Returns:
+            Optional[CommandMetadata]: Metadata of the removed command, None if it
+                was not registered
+        """
+        metadata = self.commands.pop(name, None)
+        if metadata is not None:
+            self.matcher.remove(name)
+            self.version += 1
+        return metadata
+    
+    def set_matcher(self, matcher: Any) -> None:
+        """
+        Replace the pattern matching engine used for command lookup.
+        
+        The new matcher is populated with every registered command. Both
+        PrefixIndexMatcher (the default) and AlternationMatcher are supported.
+        
+        Args:
+            matcher (Any): Matcher exposing ``add()``, ``remove()`` and ``match()``
+        """
+        for metadata in self.commands.values():
+            matcher.add(metadata)
+        self.matcher = matcher
     
     def get_command(self, name: str) -> Optional[CommandMetadata]:
         """
@@ -120,6 +279,20 @@ class CommandRegistry:
         """
         return self.commands.get(name)
     
+    def get_command_info(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a single command in a format suitable for configuration.
+        
+        Args:
+            name (str): Name of the command to describe
+            
+        Returns:
+            Optional[Dict[str, Any]]: Command metadata in a format suitable for
+                system prompt generation, None if the command is not registered
+        """
+        cmd = self.commands.get(name)
+        return cmd.prompt_info() if cmd is not None else None
+    
     def get_all_commands(self) -> Dict[str, Dict[str, Any]]:
         """
         Get all commands in a format suitable for configuration.
@@ -128,19 +301,7 @@ class CommandRegistry:
             Dict[str, Dict[str, Any]]: Dictionary mapping command names to their metadata
                 in a format suitable for system prompt generation
         """
-        return {
-            name: {
-                "pattern": cmd.pattern,
-                "description": cmd.description,
-                "explanation": cmd.explanation,
-                "variables": [
-                    {"name": var.name, "description": var.description, "example": var.example}
-                    for var in cmd.variables
-                ],
-                "example_inputs": cmd.example_inputs
-            }
-            for name, cmd in self.commands.items()
-        }
+        return {name: self.get_command_info(name) for name in self.commands}
 
 def command(
     registry: CommandRegistry,
@@ -153,7 +314,10 @@ def command(
     example_success_responses: List[Dict[str, str]],
     example_failed_responses: List[Dict[str, str]],
     result_prompt: str,
-    unsuccessful_prompt: str
+    unsuccessful_prompt: str,
+    execution: str = EXECUTION_THREAD,
+    response_mode: str = RESPONSE_MODE_LLM,
+    priority: int = 0
 ) -> Callable[[Callable[..., T]], Callable[..., T]]:
     """
     Decorator to register a function as a command.
@@ -166,15 +330,59 @@ def command(
         pattern (str): Pattern string with variable placeholders
         variables (List[VariableMetadata]): List of variables used in the pattern
         example_inputs (List[str]): Example natural language inputs
-        example_success_responses (List[Dict[str, str]]): Example successful responses
-        example_failed_responses (List[Dict[str, str]]): Example error responses
+        example_success_responses (List[Dict[str, str]]): Example successful responses,
+            each with "result" and "response" keys. With response_mode="template"
+            the first response is rendered with "{result}" replaced by the actual
+            result, so it must contain that placeholder
+        example_failed_responses (List[Dict[str, str]]): Example error responses, in
+            the same format; the first one is the error template in "template" mode
         result_prompt (str): Template for formatting successful results
         unsuccessful_prompt (str): Template for formatting error messages
+        execution (str): Execution policy for sync handlers: "thread" to run in a
+            thread pool (default), "process" to run in a process pool for CPU-bound
+            work, or "inline" to call directly on the event loop. Handlers defined
+            with ``async def`` are awaited natively.
+        response_mode (str): How results are presented to the user. "llm" (default)
+            rewords them with a second model call using result_prompt or
+            unsuccessful_prompt. "template" renders the first example response,
+            replacing "{result}" with the actual result. "raw" returns the result
+            unchanged. The last two skip the second model call entirely.
+        priority (int): Importance of the command in the system prompt. When the
+            prompt exceeds its token budget, the examples and explanations of
+            lower-priority commands are trimmed first (default: 0)
+            
+    Raises:
+        ValueError: If the execution policy or response mode is not supported, or
+            if a template used by the "template" response mode lacks the
+            "{result}" placeholder
     """
+    validate_execution_policy(execution)
+    if response_mode not in RESPONSE_MODES:
+        raise ValueError(
+            f"Unsupported response mode: {response_mode}. "
+            f"Expected one of: {', '.join(RESPONSE_MODES)}"
+        )
+    if response_mode == RESPONSE_MODE_TEMPLATE:
+        # A template without the placeholder would show its example data as the result
+        for field_name, examples in (
+            ("example_success_responses", example_success_responses),
+            ("example_failed_responses", example_failed_responses)
+        ):
+            if examples and RESULT_PLACEHOLDER not in examples[0]["response"]:
+                raise ValueError(
+                    f"Command {name} uses the template response mode, but the first entry of "
+                    f"{field_name} has no {RESULT_PLACEHOLDER} placeholder"
+                )
+    
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
-        @wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> T:
-            return func(*args, **kwargs)
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> T:
+                return await func(*args, **kwargs)
+        else:
+            @wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> T:
+                return func(*args, **kwargs)
         
         # Format result prompt with success examples
         formatted_result_prompt = result_prompt.format(
@@ -204,7 +412,10 @@ def command(
             result_prompt=formatted_result_prompt,
             unsuccessful_prompt=formatted_unsuccessful_prompt,
             example_success_responses=example_success_responses,
-            example_failed_responses=example_failed_responses
+            example_failed_responses=example_failed_responses,
+            execution=execution,
+            response_mode=response_mode,
+            priority=priority
         )
         registry.register(metadata)
         return wrapper
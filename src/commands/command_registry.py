@@ -17,10 +17,10 @@ ensuring consistency and proper command handling throughout the system.
 
 import json
 from typing import Dict, Optional, Any, Callable
-import re
 from pathlib import Path
 from dataclasses import dataclass
 from .base import CommandMetadata
+from .matching import COMMAND_BLOCK_RE, PrefixIndexMatcher
 
 class CommandRegistry:
     """
@@ -60,12 +60,17 @@ class CommandRegistry:
             to their complete metadata
         command_handlers (Dict[str, Callable]): Dictionary mapping command names
             to their handler functions
+        version (int): Counter bumped on every registration or removal
+        matcher (Any): Engine used to look up commands, a PrefixIndexMatcher
+            by default
     """
     
     def __init__(self) -> None:
         """Initialize a new command registry."""
         self.commands: Dict[str, CommandMetadata] = {}
         self.command_handlers: Dict[str, Callable] = {}
+        self.version = 0
+        self.matcher = PrefixIndexMatcher()
     
     def register(self, metadata: CommandMetadata) -> None:
         """
@@ -74,7 +79,42 @@ class CommandRegistry:
         Args:
             metadata (CommandMetadata): Complete metadata for the command
         """
+        metadata.render_prompt_fragment()
         self.commands[metadata.name] = metadata
+        self.matcher.add(metadata)
+        self.version += 1
+    
+    def unregister(self, name: str) -> Optional[CommandMetadata]:
+        """
+        Remove a command and its handler from the registry.
+        
+        Args:
+            name (str): Name of the command to remove
+            
+        Returns:
+            Optional[CommandMetadata]: Metadata of the removed command, None if it
+                was not registered
+        """
+        self.command_handlers.pop(name, None)
+        metadata = self.commands.pop(name, None)
+        if metadata is not None:
+            self.matcher.remove(name)
+            self.version += 1
+        return metadata
+    
+    def set_matcher(self, matcher: Any) -> None:
+        """
+        Replace the pattern matching engine used for command lookup.
+        
+        The new matcher is populated with every registered command. Both
+        PrefixIndexMatcher (the default) and AlternationMatcher are supported.
+        
+        Args:
+            matcher (Any): Matcher exposing ``add()``, ``remove()`` and ``match()``
+        """
+        for metadata in self.commands.values():
+            matcher.add(metadata)
+        self.matcher = matcher
     
     def get_command(self, name: str) -> Optional[CommandMetadata]:
         """
@@ -103,19 +143,21 @@ class CommandRegistry:
             Dict[str, Dict[str, Any]]: Dictionary containing formatted command
                 metadata for all registered commands, with command names as keys
         """
-        return {
-            name: {
-                "pattern": cmd.pattern,
-                "description": cmd.description,
-                "explanation": cmd.explanation,
-                "variables": [
-                    {"name": var.name, "description": var.description, "example": var.example}
-                    for var in cmd.variables
-                ],
-                "example_inputs": cmd.example_inputs
-            }
-            for name, cmd in self.commands.items()
-        }
+        return {name: self.get_command_info(name) for name in self.commands}
+    
+    def get_command_info(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a single registered command in a format suitable for prompt generation.
+        
+        Args:
+            name (str): Name of the command to describe
+            
+        Returns:
+            Optional[Dict[str, Any]]: Formatted command metadata, None if the
+                command is not registered
+        """
+        cmd = self.commands.get(name)
+        return cmd.prompt_info() if cmd is not None else None
 
     def register_handler(self, command_name: str, handler: Callable) -> None:
         """
@@ -159,9 +201,9 @@ class CommandRegistry:
         """
         Extract command and variables from text if present.
         
-        Searches the input text for any registered command patterns and extracts
-        variables if a match is found. The search is performed using regex pattern
-        matching against all registered command patterns.
+        Searches the input text for "[[...]]" blocks and looks each one up in the
+        precompiled pattern index, returning the first block that matches a
+        registered command.
         
         Args:
             text (str): Text to search for command patterns
@@ -176,11 +218,10 @@ class CommandRegistry:
             >>> registry.extract_command("[[GENERATE_WALLET_123]]")
             ("generate_wallet", {"user_id": "123"})
         """
-        for cmd_name, cmd_info in self.commands.items():
-            pattern = cmd_info.pattern.replace('{', '(?P<').replace('}', '>[^}]*)')
-            match = re.search(f"\\[\\[{pattern}\\]\\]", text)
-            if match:
-                return cmd_name, match.groupdict()
+        for block in COMMAND_BLOCK_RE.finditer(text):
+            result = self.matcher.match(block.group(1))
+            if result:
+                return result
         return None
         
     def execute_command(self, command_name: str, variables: Dict[str, str]) -> str:
@@ -0,0 +1,163 @@
+"""
+Command execution for the AI Agent framework.
+
+This module handles:
+1. Awaiting ``async def`` command handlers natively
+2. Offloading synchronous handlers to a thread or process pool
+3. Per-command execution policies
+
+Running handlers off the event loop keeps one slow command (e.g. a wallet
+generation that talks to an HSM and a database) from stalling every other
+conversation served by the same process.
+"""
+
+import asyncio
+import importlib
+import inspect
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+# Run the sync handler directly on the event loop (for trivial, non-blocking handlers)
+EXECUTION_INLINE = "inline"
+# Run the sync handler in a thread pool (for I/O-bound handlers)
+EXECUTION_THREAD = "thread"
+# Run the sync handler in a process pool (for CPU-bound handlers)
+EXECUTION_PROCESS = "process"
+
+EXECUTION_POLICIES = (EXECUTION_INLINE, EXECUTION_THREAD, EXECUTION_PROCESS)
+
+def validate_execution_policy(execution: str) -> str:
+    """
+    Validate an execution policy name.
+
+    Args:
+        execution (str): Policy name ("inline", "thread" or "process")
+
+    Returns:
+        str: The validated policy name
+
+    Raises:
+        ValueError: If the policy is not supported
+    """
+    if execution not in EXECUTION_POLICIES:
+        raise ValueError(
+            f"Unsupported execution policy: {execution}. "
+            f"Expected one of: {', '.join(EXECUTION_POLICIES)}"
+        )
+    return execution
+
+def _invoke_by_reference(module_name: str, qualname: str, kwargs: Dict[str, Any]) -> Any:
+    """
+    Import a handler by its module and qualified name and call it.
+
+    Handlers decorated with @command are replaced in their module by a wrapper,
+    so the original function cannot be pickled by reference. Sending the names
+    instead and resolving them in the worker process avoids that problem.
+
+    Args:
+        module_name (str): Module defining the handler
+        qualname (str): Qualified name of the handler within the module
+        kwargs (Dict[str, Any]): Keyword arguments for the handler
+
+    Returns:
+        Any: Handler result
+    """
+    target: Any = importlib.import_module(module_name)
+    for attribute in qualname.split("."):
+        target = getattr(target, attribute)
+    return target(**kwargs)
+
+class CommandExecutor:
+    """
+    Executes command handlers according to their execution policy.
+
+    - ``async def`` handlers are always awaited on the event loop
+    - "thread" handlers run in the thread pool
+    - "process" handlers run in the process pool and must be module-level functions
+    - "inline" handlers are called directly on the event loop
+
+    Pools are created lazily on first use. When ``max_threads`` is not set, the
+    event loop's default executor is used for thread offloading.
+
+    Example Usage:
+        executor = CommandExecutor(max_threads=32, max_processes=4)
+        result = await executor.run(metadata, {"user_id": "123"})
+
+    Attributes:
+        max_threads (Optional[int]): Size of the dedicated thread pool
+        max_processes (Optional[int]): Size of the process pool
+    """
+
+    def __init__(self, max_threads: Optional[int] = None, max_processes: Optional[int] = None):
+        """
+        Initialize the executor.
+
+        Args:
+            max_threads (Optional[int]): Size of a dedicated thread pool. Uses the
+                event loop's default executor when None (default: None)
+            max_processes (Optional[int]): Size of the process pool used by the
+                "process" policy (default: number of CPUs)
+        """
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_thread_pool(self) -> Optional[Executor]:
+        """Get the dedicated thread pool, or None to use the loop's default executor."""
+        if self.max_threads is None:
+            return None
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.max_threads, thread_name_prefix="aigent-command"
+            )
+        return self._thread_pool
+
+    def _get_process_pool(self) -> Executor:
+        """Get the process pool, creating it on first use."""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.max_processes)
+        return self._process_pool
+
+    async def run(self, metadata: Any, variables: Dict[str, str]) -> Any:
+        """
+        Run a command handler with the given variables.
+
+        Args:
+            metadata (Any): Command metadata exposing ``handler`` and ``execution``
+            variables (Dict[str, str]): Variables extracted from the command pattern
+
+        Returns:
+            Any: Handler result
+
+        Raises:
+            Exception: Any exception raised by the handler
+        """
+        handler: Callable = metadata.handler
+        if inspect.iscoroutinefunction(handler):
+            return await handler(**variables)
+
+        execution = getattr(metadata, "execution", EXECUTION_THREAD)
+        if execution == EXECUTION_INLINE:
+            return handler(**variables)
+
+        loop = asyncio.get_running_loop()
+        if execution == EXECUTION_PROCESS:
+            call = partial(_invoke_by_reference, handler.__module__, handler.__qualname__, variables)
+            return await loop.run_in_executor(self._get_process_pool(), call)
+        return await loop.run_in_executor(self._get_thread_pool(), partial(handler, **variables))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Shut down the pools owned by this executor.
+
+        Args:
+            wait (bool): Whether to wait for running handlers to finish (default: True)
+        """
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+            self._process_pool = None
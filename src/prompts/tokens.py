@@ -0,0 +1,102 @@
+"""
+Token counting for the AI Agent framework.
+
+This module provides:
+1. An offline heuristic token counter that needs no extra dependencies
+2. An optional tiktoken-based counter for exact counts with OpenAI models
+3. A caching estimator that counts each distinct prompt fragment only once
+
+Prompt size drives both cost and first-token latency, so the prompt manager
+uses these counts to report per-command prompt cost and enforce a budget.
+"""
+
+import math
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# Rough average number of characters per token for English text
+CHARS_PER_TOKEN = 4
+
+def heuristic_token_count(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without a tokenizer.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count, about one token per four characters
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def tiktoken_counter(model_name: str) -> Callable[[str], int]:
+    """
+    Create an exact token counter for an OpenAI model using tiktoken.
+
+    Args:
+        model_name (str): Model whose encoding to use, e.g. "gpt-3.5-turbo"
+
+    Returns:
+        Callable[[str], int]: Function returning the token count of a text
+
+    Raises:
+        ImportError: If tiktoken is not installed
+    """
+    try:
+        import tiktoken
+    except ImportError as e:
+        raise ImportError("tiktoken is required for exact token counts: pip install tiktoken") from e
+    try:
+        encoding = tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
+class TokenEstimator:
+    """
+    Token counter with a per-fragment LRU cache.
+
+    Prompts are assembled from the same fragments over and over (the header,
+    each command block), so counting is cached by fragment text.
+
+    Example Usage:
+        estimator = TokenEstimator(tokenizer=tiktoken_counter("gpt-4o"))
+        estimator.count("Available commands:")
+
+    Attributes:
+        tokenizer (Callable[[str], int]): Function returning the token count of a text
+        max_entries (int): Maximum number of cached fragment counts
+    """
+
+    def __init__(self, tokenizer: Optional[Callable[[str], int]] = None, max_entries: int = 4096):
+        """
+        Initialize the estimator.
+
+        Args:
+            tokenizer (Optional[Callable[[str], int]]): Token counting function
+                (default: heuristic_token_count)
+            max_entries (int): Maximum number of cached fragment counts (default: 4096)
+        """
+        self.tokenizer = tokenizer or heuristic_token_count
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of a text, using the cache when possible.
+
+        Args:
+            text (str): Text to measure
+
+        Returns:
+            int: Token count
+        """
+        count = self._counts.get(text)
+        if count is not None:
+            self._counts.move_to_end(text)
+            return count
+        count = self.tokenizer(text)
+        self._counts[text] = count
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return count
@@ -0,0 +1,142 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import asyncio
+import types
+
+import pytest
+
+from src.ai_agent.agent import Agent
+from src.commands.base import CommandRegistry, VariableMetadata, command
+
+@pytest.fixture
+def registry():
+    """The singleton CommandRegistry, emptied before and after each test."""
+    registry = CommandRegistry()
+    for name in list(registry.commands):
+        registry.unregister(name)
+    yield registry
+    for name in list(registry.commands):
+        registry.unregister(name)
+
+def generate_wallet(user_id: str) -> str:
+    return f"Wallet for {user_id}"
+
+def send_funds(amount: str, address: str) -> str:
+    return f"Sent {amount} to {address}"
+
+GENERATE_WALLET = dict(
+    name="generate_wallet",
+    description="Generates a new cryptocurrency wallet",
+    explanation="Creates a wallet for the user.",
+    pattern="[[GENERATE_WALLET_{user_id}]]",
+    variables=[VariableMetadata(name="user_id", description="User identifier", example="user123")],
+    example_inputs=["Please generate me a wallet", "Create me a new wallet", "I need a cryptocurrency wallet"],
+    example_success_responses=[],
+    example_failed_responses=[],
+    result_prompt="Present the wallet.",
+    unsuccessful_prompt="Explain the failure."
+)
+
+SEND_FUNDS = dict(
+    name="send_funds",
+    description="Sends funds to an address",
+    explanation="Transfers the amount to the address.",
+    pattern="[[SEND_{amount}_{address}]]",
+    variables=[
+        VariableMetadata(name="amount", description="Amount to send", example="10"),
+        VariableMetadata(name="address", description="Recipient address", example="0x123")
+    ],
+    example_inputs=["send 10 to 0x123"],
+    example_success_responses=[],
+    example_failed_responses=[],
+    result_prompt="Confirm the transfer.",
+    unsuccessful_prompt="Explain the failure."
+)
+
+def _command_adder(registry, definition, default_handler):
+    def add(handler=None, **overrides):
+        command(registry=registry, **{**definition, **overrides})(handler or default_handler)
+        return registry.get_command(definition["name"])
+    return add
+
+@pytest.fixture
+def add_generate_wallet(registry):
+    """Register the generate_wallet command, with optional @command overrides and handler."""
+    return _command_adder(registry, GENERATE_WALLET, generate_wallet)
+
+@pytest.fixture
+def add_send_funds(registry):
+    """Register the send_funds command, with optional @command overrides and handler."""
+    return _command_adder(registry, SEND_FUNDS, send_funds)
+
+@pytest.fixture
+def wallet_registry(registry, add_generate_wallet):
+    """Registry holding only generate_wallet."""
+    add_generate_wallet()
+    return registry
+
+@pytest.fixture
+def send_registry(registry, add_generate_wallet, add_send_funds):
+    """Registry holding send_funds and generate_wallet."""
+    add_send_funds()
+    add_generate_wallet()
+    return registry
+
+class FakeStream:
+    """
+    Chat completion stream replaying scripted items: strings are content
+    chunks, lists hold tool-call deltas, dicts are the final usage report and
+    numbers are pauses in seconds.
+    """
+
+    def __init__(self, items, delay=0.0):
+        self.items = items
+        self.delay = delay
+        self.closed = False
+
+    async def __aiter__(self):
+        for item in self.items:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if isinstance(item, (int, float)):
+                await asyncio.sleep(item)
+                continue
+            if isinstance(item, dict):
+                yield types.SimpleNamespace(choices=[], usage=types.SimpleNamespace(**item))
+                continue
+            content, tool_calls = (item, None) if isinstance(item, str) else (None, item)
+            delta = types.SimpleNamespace(content=content, tool_calls=tool_calls)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+    async def close(self):
+        self.closed = True
+
+class FakeModel:
+    """
+    Stand-in for the chat completions API.
+
+    ``responder`` receives the keyword arguments of every request and returns
+    the items of the streamed response (see FakeStream).
+    """
+
+    def __init__(self, responder, delay=0.0):
+        self.responder = responder
+        self.delay = delay
+        self.requests = []
+        self.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=self))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return FakeStream(self.responder(kwargs), self.delay)
+
+@pytest.fixture
+def make_agent(registry):
+    """Build an Agent on the test registry, answering requests with a FakeModel."""
+    def make(responder, delay=0.0, **options):
+        model = FakeModel(responder, delay)
+        agent = Agent("Wallet assistant", "", "key", "model", client=model.client, **options)
+        agent.initialize_commands(registry)
+        return agent, model
+    return make
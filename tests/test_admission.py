@@ -0,0 +1,143 @@
+"""
+Tests for admission control of LLM calls.
+"""
+
+import asyncio
+
+import pytest
+
+from src.ai_agent.admission import AdmissionController, AdmissionTimeoutError, TokenBucket
+
+class FakeClock:
+    """Manually advanced time source."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+async def enter(controller):
+    async with controller.slot():
+        pass
+
+def test_callers_are_admitted_in_arrival_order_within_the_concurrency_bound():
+    controller = AdmissionController(max_concurrency=2)
+    admitted = []
+    peak = 0
+
+    async def call(number):
+        nonlocal peak
+        async with controller.slot():
+            admitted.append(number)
+            peak = max(peak, controller.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(call(number) for number in range(8)))
+
+    asyncio.run(run())
+
+    assert admitted == list(range(8))
+    assert peak == 2
+    assert controller.stats()["admitted"] == 8
+    assert controller.in_flight == 0
+
+def test_waiting_longer_than_max_wait_raises():
+    controller = AdmissionController(max_concurrency=1, max_wait=0.02)
+
+    async def run():
+        async with controller.slot():
+            with pytest.raises(AdmissionTimeoutError):
+                async with controller.slot():
+                    pass
+            rejected = controller.stats()
+        # The rejected caller must not have kept a slot
+        await asyncio.wait_for(enter(controller), 0.5)
+        return rejected
+
+    rejected = asyncio.run(run())
+
+    assert rejected["rejected"] == 1
+    assert rejected["queue_depth"] == 0
+    assert rejected["in_flight"] == 1
+    assert controller.stats()["admitted"] == 2
+
+def test_token_bucket_refills_at_its_per_minute_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, clock=clock)
+
+    asyncio.run(bucket.acquire(60))
+    assert bucket.tokens == 0
+
+    clock.now = 30.0
+    bucket._refill()
+    assert bucket.tokens == pytest.approx(30)
+
+    clock.now = 300.0
+    bucket._refill()
+    assert bucket.tokens == 60
+
+def test_rate_limits_delay_admission_until_the_bucket_refills():
+    # 600 requests per minute is one every 0.1 seconds once the burst is spent
+    controller = AdmissionController(requests_per_minute=600, tokens_per_minute=6000)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for _ in range(600):
+            async with controller.slot(tokens=1):
+                pass
+        started = loop.time()
+        async with controller.slot(tokens=1):
+            pass
+        return loop.time() - started
+
+    assert 0.05 <= asyncio.run(run()) < 0.5
+
+def test_token_limit_charges_the_estimated_tokens():
+    controller = AdmissionController(tokens_per_minute=6000)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        async with controller.slot(tokens=6000):
+            pass
+        started = loop.time()
+        # 60 tokens refill in 0.6 seconds at 100 tokens per second
+        async with controller.slot(tokens=60):
+            pass
+        return loop.time() - started
+
+    assert 0.4 <= asyncio.run(run()) < 1.5
+
+def test_stats_report_the_waits():
+    clock = FakeClock()
+    controller = AdmissionController(max_concurrency=1, clock=clock)
+
+    async def holder(release):
+        async with controller.slot():
+            await release.wait()
+
+    async def run():
+        release = asyncio.Event()
+        holding = asyncio.ensure_future(holder(release))
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(enter(controller))
+        await asyncio.sleep(0)
+        queued = controller.stats()
+        clock.now = 4.0
+        release.set()
+        await asyncio.gather(holding, waiting)
+        return queued
+
+    queued = asyncio.run(run())
+
+    assert queued["queue_depth"] == 1
+    assert queued["in_flight"] == 1
+    assert controller.stats() == {
+        "queue_depth": 0,
+        "in_flight": 0,
+        "admitted": 2,
+        "rejected": 0,
+        "average_wait": 2.0,
+        "max_wait": 4.0
+    }
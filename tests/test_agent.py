@@ -0,0 +1,69 @@
+"""
+Tests for turns executing several commands.
+"""
+
+import asyncio
+
+def routing_then_formatting(routing_response):
+    """Responder answering the routing call with a fixed text and echoing formatting calls."""
+    def responder(request):
+        prompt = request["messages"][-1]["content"]
+        if prompt.startswith(("Format", "Handle")):
+            return [f"<{prompt}>"]
+        return [routing_response]
+    return responder
+
+def formatting_requests(model):
+    return [request for request in model.requests if request["messages"][-1]["content"].startswith(("Format", "Handle"))]
+
+async def run_turn(agent, user_input):
+    return "".join([chunk async for chunk in agent.process_input(user_input)])
+
+def test_handlers_run_concurrently_up_to_the_limit(add_send_funds, make_agent):
+    running = 0
+    peak = 0
+
+    async def send_funds(amount, address):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return f"Sent {amount} to {address}"
+
+    add_send_funds(send_funds)
+    response = "\n".join(f"[[SEND_{amount}_0x{amount}]]" for amount in range(1, 7))
+    agent, _ = make_agent(routing_then_formatting(response), max_concurrent_commands=3)
+
+    output = asyncio.run(run_turn(agent, "send six payments"))
+
+    assert peak == 3
+    assert all(f"Sent {amount} to 0x{amount}" in output for amount in range(1, 7))
+
+def test_failing_command_does_not_hide_the_other_results(add_send_funds, add_generate_wallet, make_agent):
+    def generate_wallet(user_id):
+        raise RuntimeError("wallet service down")
+
+    add_send_funds()
+    add_generate_wallet(generate_wallet)
+    agent, model = make_agent(routing_then_formatting("[[GENERATE_WALLET_u1]]\n[[SEND_5_0xabc]]"))
+
+    output = asyncio.run(run_turn(agent, "make a wallet and send 5 to 0xabc"))
+
+    assert "generate_wallet error: Error executing command: wallet service down" in output
+    assert "send_funds result: Sent 5 to 0xabc" in output
+    assert len(formatting_requests(model)) == 1
+
+def test_several_commands_are_presented_by_one_combined_call(add_send_funds, add_generate_wallet, make_agent):
+    add_send_funds()
+    add_generate_wallet()
+    agent, model = make_agent(routing_then_formatting("[[GENERATE_WALLET_u1]]\n[[SEND_5_0xabc]]\n[[SEND_7_0xdef]]"))
+
+    output = asyncio.run(run_turn(agent, "make a wallet and send two payments"))
+
+    [request] = formatting_requests(model)
+    system_prompt = request["messages"][0]["content"]
+    assert "Present the wallet." in system_prompt
+    assert "Confirm the transfer." in system_prompt
+    assert len(model.requests) == 2
+    assert output.count("<Format these results:") == 1
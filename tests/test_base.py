@@ -0,0 +1,74 @@
+"""
+Tests for command registration and local response rendering.
+"""
+
+import pytest
+
+from src.prompts.prompt_manager import SystemPromptManager
+from src.prompts.tokens import TokenEstimator
+
+@pytest.fixture
+def register_wallet_command(add_generate_wallet):
+    def register(response_mode, success_response, failed_response="Failed: {result}"):
+        return add_generate_wallet(
+            example_success_responses=[{"result": "Generated wallet: abc", "response": success_response}],
+            example_failed_responses=[{"result": "Error: timeout", "response": failed_response}],
+            response_mode=response_mode
+        )
+    return register
+
+def test_template_mode_renders_the_actual_result(registry, register_wallet_command):
+    metadata = register_wallet_command("template", "Your wallet address is: {result}")
+
+    assert metadata.render_response("REAL123", True) == "Your wallet address is: REAL123"
+    assert metadata.render_response("Error: down", False) == "Failed: Error: down"
+
+def test_template_mode_rejects_a_success_template_without_placeholder(registry, register_wallet_command):
+    with pytest.raises(ValueError, match="example_success_responses"):
+        register_wallet_command("template", "Your wallet address is: ajiosdaiosdiasjd")
+    assert registry.get_command("generate_wallet") is None
+
+def test_template_mode_rejects_a_failure_template_without_placeholder(registry, register_wallet_command):
+    with pytest.raises(ValueError, match="example_failed_responses"):
+        register_wallet_command("template", "Wallet: {result}", failed_response="Network issues, sorry.")
+
+def test_llm_mode_accepts_examples_without_placeholder(registry, register_wallet_command):
+    metadata = register_wallet_command("llm", "Your wallet address is: ajiosdaiosdiasjd")
+
+    assert metadata.response_mode == "llm"
+
+def test_template_without_placeholder_falls_back_to_the_raw_result(registry, register_wallet_command):
+    metadata = register_wallet_command("raw", "Your wallet address is: ajiosdaiosdiasjd")
+    # Metadata built directly, bypassing the decorator's validation
+    metadata.response_mode = "template"
+
+    assert metadata.render_response("REAL123", True) == "REAL123"
+
+def test_command_token_costs_use_the_managers_tokenizer(registry, register_wallet_command):
+    register_wallet_command("llm", "Your wallet is ready")
+    manager = SystemPromptManager("Wallet assistant", token_estimator=TokenEstimator(tokenizer=lambda text: len(text.split())))
+
+    fragment = registry.get_command("generate_wallet").prompt_fragment
+
+    assert manager.command_token_costs(registry) == {"generate_wallet": len(fragment.split())}
+
+def test_block_token_counts_are_cached_per_registry_version_and_tokenizer(registry, register_wallet_command, add_send_funds):
+    register_wallet_command("llm", "Your wallet is ready")
+    estimator = TokenEstimator(tokenizer=lambda text: len(text.split()))
+    manager = SystemPromptManager("Wallet assistant", token_budget=10, token_estimator=estimator)
+    counted = []
+    count = estimator.count
+    estimator.count = lambda text: counted.append(text) or count(text)
+
+    manager.command_token_costs(registry)
+    manager.command_token_costs(registry)
+    assert len(counted) == 1
+
+    add_send_funds()
+    costs = manager.command_token_costs(registry)
+    assert set(costs) == {"generate_wallet", "send_funds"}
+    assert len(counted) == 3
+
+    manager.token_estimator = TokenEstimator(tokenizer=len)
+    fragment = registry.get_command("generate_wallet").prompt_fragment
+    assert manager.command_token_costs(registry)["generate_wallet"] == len(fragment)
@@ -0,0 +1,100 @@
+"""
+Tests for command pattern matching.
+"""
+
+import re
+
+import pytest
+
+from src.commands.base import VariableMetadata, command
+from src.commands.matching import AlternationMatcher, PrefixIndexMatcher
+
+def register(registry, name, pattern):
+    variables = re.findall(r'\{(\w+)\}', pattern)
+    command(
+        registry=registry,
+        name=name,
+        description=f"Runs {name}",
+        explanation="",
+        pattern=pattern,
+        variables=[VariableMetadata(name=v, description=v, example="x") for v in variables],
+        example_inputs=[],
+        example_success_responses=[],
+        example_failed_responses=[],
+        result_prompt="Present the result.",
+        unsuccessful_prompt="Explain the failure."
+    )(lambda **variables: variables)
+
+def baseline_match(registry, command_text):
+    """The original lookup: try each pattern in registration order as its own regex."""
+    for name, metadata in registry.commands.items():
+        var_pattern = metadata.pattern.replace("[[", "").replace("]]", "")
+        for var in metadata.variables:
+            var_pattern = var_pattern.replace("{" + var.name + "}", f"(?P<{var.name}>[^}}]*)")
+        match = re.match(f"^{var_pattern}$", command_text)
+        if match:
+            return name, match.groupdict()
+    return None
+
+def all_matchers(registry, command_text):
+    """Results of the baseline, the prefix index and the alternation regex."""
+    prefix_index = PrefixIndexMatcher()
+    alternation = AlternationMatcher()
+    for metadata in registry.commands.values():
+        prefix_index.add(metadata)
+        alternation.add(metadata)
+    return [baseline_match(registry, command_text), prefix_index.match(command_text), alternation.match(command_text)]
+
+@pytest.fixture
+def shared_prefix_registry(registry):
+    # More specific patterns are registered first so that the baseline, which
+    # takes the first match in registration order, agrees with longest prefix first
+    register(registry, "send_all", "[[SEND_ALL_{address}]]")
+    register(registry, "send", "[[SEND_{amount}_{address}]]")
+    register(registry, "generate_wallet", "[[GENERATE_WALLET_{user_id}]]")
+    register(registry, "generate_key", "[[GENERATE_{kind}_KEY]]")
+    register(registry, "balance", "[[BALANCE]]")
+    register(registry, "swap", "[[SWAP_{amount}_{source}_TO_{target}]]")
+    return registry
+
+@pytest.mark.parametrize("command_text, expected", [
+    ("SEND_ALL_0xabc", ("send_all", {"address": "0xabc"})),
+    ("SEND_10_0xabc", ("send", {"amount": "10", "address": "0xabc"})),
+    ("GENERATE_WALLET_u1", ("generate_wallet", {"user_id": "u1"})),
+    ("GENERATE_SIGNING_KEY", ("generate_key", {"kind": "SIGNING"})),
+    ("BALANCE", ("balance", {})),
+    ("SWAP_5_ETH_TO_BTC", ("swap", {"amount": "5", "source": "ETH", "target": "BTC"})),
+    ("SEND", None),
+    ("BALANCE_NOW", None),
+    ("UNKNOWN_1", None),
+    ("", None)
+])
+def test_matchers_agree_with_the_baseline(shared_prefix_registry, command_text, expected):
+    assert all_matchers(shared_prefix_registry, command_text) == [expected] * 3
+
+def test_longest_prefix_wins_regardless_of_registration_order(registry):
+    register(registry, "send", "[[SEND_{amount}_{address}]]")
+    register(registry, "send_all", "[[SEND_ALL_{address}]]")
+
+    baseline, prefix_index, alternation = all_matchers(registry, "SEND_ALL_0xabc")
+
+    assert baseline == ("send", {"amount": "ALL", "address": "0xabc"})
+    assert prefix_index == alternation == ("send_all", {"address": "0xabc"})
+
+@pytest.mark.parametrize("matcher_class", [PrefixIndexMatcher, AlternationMatcher])
+def test_registry_matcher_follows_unregister(shared_prefix_registry, matcher_class):
+    shared_prefix_registry.set_matcher(matcher_class())
+    try:
+        assert shared_prefix_registry.matcher.match("SEND_ALL_0xabc")[0] == "send_all"
+
+        shared_prefix_registry.unregister("send_all")
+        assert shared_prefix_registry.matcher.match("SEND_ALL_0xabc") == baseline_match(shared_prefix_registry, "SEND_ALL_0xabc")
+        assert shared_prefix_registry.matcher.match("SEND_ALL_0xabc")[0] == "send"
+
+        shared_prefix_registry.unregister("balance")
+        assert shared_prefix_registry.matcher.match("BALANCE") is None
+
+        register(shared_prefix_registry, "balance", "[[BALANCE_{asset}]]")
+        assert shared_prefix_registry.matcher.match("BALANCE_ETH") == ("balance", {"asset": "ETH"})
+    finally:
+        shared_prefix_registry.set_matcher(PrefixIndexMatcher())
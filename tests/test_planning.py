@@ -0,0 +1,117 @@
+"""
+Tests for plan parsing, validation and dependency-aware execution.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.commands.base import VariableMetadata, command
+from src.commands.planning import (
+    STEP_FAILED, STEP_SKIPPED, STEP_STARTED, STEP_SUCCEEDED, PlanError, PlanExecutor, parse_plan
+)
+
+def register(registry, name, variables, handler):
+    command(
+        registry=registry,
+        name=name,
+        description=f"Runs {name}",
+        explanation="",
+        pattern="[[" + "_".join([name.upper(), *(f"{{{v}}}" for v in variables)]) + "]]",
+        variables=[VariableMetadata(name=v, description=v, example="x") for v in variables],
+        example_inputs=[],
+        example_success_responses=[],
+        example_failed_responses=[],
+        result_prompt="Present the result.",
+        unsuccessful_prompt="Explain the failure.",
+        execution="inline"
+    )(handler)
+
+@pytest.fixture
+def plan_registry(registry):
+    async def create_wallet(user_id):
+        return {"address": f"0x{user_id}", "private_key": "secret"}
+
+    async def fund_wallet(address, amount):
+        return f"Funded {address} with {amount}"
+
+    async def fail(reason):
+        raise RuntimeError(reason)
+
+    register(registry, "create_wallet", ["user_id"], create_wallet)
+    register(registry, "fund_wallet", ["address", "amount"], fund_wallet)
+    register(registry, "fail", ["reason"], fail)
+    return registry
+
+async def collect(executor, steps):
+    return [(event.step.id, event.status, event.result) async for event in executor.run(steps)]
+
+def test_field_reference_receives_one_field_of_a_structured_result(plan_registry):
+    steps = parse_plan('''[[PLAN]]
+{"steps": [{"id": "s1", "command": "create_wallet", "variables": {"user_id": "abc"}},
+           {"id": "s2", "command": "fund_wallet", "variables": {"address": "$s1.address", "amount": "10"}}]}''')
+
+    events = asyncio.run(collect(PlanExecutor(plan_registry), steps))
+
+    assert steps[1].depends_on == ["s1"]
+    assert ("s2", STEP_SUCCEEDED, "Funded 0xabc with 10") in events
+
+def test_unknown_field_fails_the_step(plan_registry):
+    steps = parse_plan('''{"steps": [{"id": "s1", "command": "create_wallet", "variables": {"user_id": "abc"}},
+           {"id": "s2", "command": "fund_wallet", "variables": {"address": "$s1.iban", "amount": "10"}}]}''')
+
+    events = asyncio.run(collect(PlanExecutor(plan_registry), steps))
+
+    assert ("s2", STEP_FAILED, "Output of step s1 has no field: iban") in events
+
+@pytest.mark.parametrize("variables", [
+    {"address": "0x1"},
+    {"address": "0x1", "amount": "10", "memo": "hi"},
+    {"wallet": "0x1", "amount": "10"}
+])
+def test_validate_rejects_variables_not_matching_the_command(plan_registry, variables):
+    steps = parse_plan(json.dumps({"steps": [{"id": "s1", "command": "fund_wallet", "variables": variables}]}))
+
+    with pytest.raises(PlanError, match="Invalid variables in step s1"):
+        PlanExecutor(plan_registry).validate(steps)
+
+def test_validate_rejects_cycles(plan_registry):
+    steps = parse_plan('''[{"id": "a", "command": "fund_wallet", "variables": {"address": "$b", "amount": "1"}},
+                           {"id": "b", "command": "fund_wallet", "variables": {"address": "$a", "amount": "1"}},
+                           {"id": "c", "command": "create_wallet", "variables": {"user_id": "u"}}]''')
+
+    with pytest.raises(PlanError, match="cycle between steps: a, b"):
+        PlanExecutor(plan_registry).validate(steps)
+
+def test_dependents_of_a_failed_step_are_skipped_while_other_branches_run(plan_registry):
+    steps = parse_plan('''[{"id": "s1", "command": "fail", "variables": {"reason": "offline"}},
+                           {"id": "s2", "command": "fund_wallet", "variables": {"address": "$s1", "amount": "1"}},
+                           {"id": "s3", "command": "fund_wallet", "variables": {"address": "$s2", "amount": "2"}},
+                           {"id": "s4", "command": "create_wallet", "variables": {"user_id": "u"}}]''')
+
+    events = asyncio.run(collect(PlanExecutor(plan_registry), steps))
+    statuses = {step_id: status for step_id, status, _ in events if status != STEP_STARTED}
+
+    assert statuses == {"s1": STEP_FAILED, "s2": STEP_SKIPPED, "s3": STEP_SKIPPED, "s4": STEP_SUCCEEDED}
+    assert ("s1", STEP_FAILED, "Error executing command: offline") in events
+
+def test_independent_steps_run_concurrently_up_to_the_limit(registry):
+    running = 0
+    peak = 0
+
+    async def slow(user_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return user_id
+
+    register(registry, "slow", ["user_id"], slow)
+    steps = parse_plan(json.dumps([{"command": "slow", "variables": {"user_id": f"u{i}"}} for i in range(6)]))
+
+    events = asyncio.run(collect(PlanExecutor(registry, max_concurrency=2), steps))
+
+    assert peak == 2
+    assert sum(status == STEP_SUCCEEDED for _, status, _ in events) == 6
@@ -0,0 +1,172 @@
+"""
+Tests for deadlines, retries and hedging of streamed LLM calls.
+"""
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from src.ai_agent.admission import AdmissionController
+from src.ai_agent.metrics import AgentMetrics
+from src.ai_agent.resilience import RetryPolicy, StreamTimeoutError, resilient_stream
+
+def scripted_attempts(*scripts):
+    """
+    Build an open_stream function whose n-th attempt follows the n-th script.
+
+    A script item is a chunk (str), a pause in seconds (number) or an
+    exception to raise. ``opened`` counts attempts, ``cancelled`` lists the
+    attempts cancelled before they finished.
+    """
+    opened = []
+    cancelled = []
+
+    def open_stream():
+        number = len(opened)
+        opened.append(number)
+
+        async def stream():
+            try:
+                for item in scripts[min(number, len(scripts) - 1)]:
+                    if isinstance(item, BaseException):
+                        raise item
+                    if isinstance(item, (int, float)):
+                        await asyncio.sleep(item)
+                    else:
+                        yield item
+            except asyncio.CancelledError:
+                cancelled.append(number)
+                raise
+
+        return stream()
+
+    return open_stream, opened, cancelled
+
+async def collect(open_stream, policy, received=None, **options):
+    received = [] if received is None else received
+    async for chunk in resilient_stream(open_stream, policy, **options):
+        received.append(chunk)
+    return received
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.example.com"))
+
+def test_first_token_timeout():
+    open_stream, opened, _ = scripted_attempts([1.0, "late"])
+    policy = RetryPolicy(max_retries=1, backoff_base=0.0, first_token_timeout=0.02)
+
+    with pytest.raises(StreamTimeoutError, match="first chunk"):
+        asyncio.run(collect(open_stream, policy))
+    assert len(opened) == 2
+
+def test_inter_chunk_timeout_is_not_retried_after_output():
+    open_stream, opened, _ = scripted_attempts(["a", 1.0, "b"])
+    policy = RetryPolicy(max_retries=2, backoff_base=0.0, inter_chunk_timeout=0.02)
+    received = []
+
+    with pytest.raises(StreamTimeoutError, match="next chunk"):
+        asyncio.run(collect(open_stream, policy, received))
+    assert received == ["a"]
+    assert len(opened) == 1
+
+def test_total_timeout_covers_the_whole_call():
+    open_stream, _, _ = scripted_attempts(["a", 0.03, "b", 0.03, "c", 0.03, "d"])
+    policy = RetryPolicy(inter_chunk_timeout=1.0, total_timeout=0.05)
+    received = []
+
+    with pytest.raises(StreamTimeoutError):
+        asyncio.run(collect(open_stream, policy, received))
+    assert received[:2] == ["a", "b"]
+    assert "d" not in received
+
+def test_retriable_errors_are_retried():
+    open_stream, opened, _ = scripted_attempts([connection_error()], [StreamTimeoutError()], ["ok"])
+    policy = RetryPolicy(max_retries=2, backoff_base=0.0)
+
+    assert asyncio.run(collect(open_stream, policy)) == ["ok"]
+    assert len(opened) == 3
+
+def test_other_errors_are_raised_at_once():
+    open_stream, opened, _ = scripted_attempts([ValueError("bad request")], ["ok"])
+    policy = RetryPolicy(max_retries=2, backoff_base=0.0)
+
+    with pytest.raises(ValueError, match="bad request"):
+        asyncio.run(collect(open_stream, policy))
+    assert len(opened) == 1
+
+def test_retries_stop_after_max_retries():
+    open_stream, opened, _ = scripted_attempts([connection_error()])
+    policy = RetryPolicy(max_retries=2, backoff_base=0.0)
+
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(collect(open_stream, policy))
+    assert len(opened) == 3
+
+def test_error_after_output_is_not_retried():
+    open_stream, opened, _ = scripted_attempts(["partial", connection_error()], ["ok"])
+    policy = RetryPolicy(max_retries=2, backoff_base=0.0)
+    received = []
+
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(collect(open_stream, policy, received))
+    assert received == ["partial"]
+    assert len(opened) == 1
+
+def test_backoff_doubles_up_to_the_maximum():
+    policy = RetryPolicy(backoff_base=0.5, backoff_max=3.0, jitter=0.0)
+
+    assert [policy.backoff(retry) for retry in range(4)] == [0.5, 1.0, 2.0, 3.0]
+    jittered = RetryPolicy(backoff_base=1.0, jitter=0.1)
+    assert all(0.9 <= jittered.backoff(0) <= 1.1 for _ in range(50))
+
+def test_hedge_wins_and_the_slow_attempt_is_cancelled():
+    open_stream, opened, cancelled = scripted_attempts([1.0, "slow"], ["fast", "er"])
+    policy = RetryPolicy(hedge_after=0.02)
+    winners = []
+
+    assert asyncio.run(collect(open_stream, policy, on_winner=winners.append)) == ["fast", "er"]
+    assert len(opened) == 2
+    assert cancelled == [0]
+    assert len(winners) == 1
+
+def test_hedge_uses_its_own_opener():
+    open_stream, _, _ = scripted_attempts([1.0, "slow"])
+    open_hedge, hedges, _ = scripted_attempts(["hedged"])
+
+    received = asyncio.run(collect(open_stream, RetryPolicy(hedge_after=0.02), open_hedge=open_hedge))
+
+    assert received == ["hedged"]
+    assert len(hedges) == 1
+
+def test_agent_admits_the_hedge_separately_and_reports_the_winners_usage(wallet_registry, make_agent):
+    controller = AdmissionController(max_concurrency=4)
+    in_flight = []
+    requests = 0
+
+    def responder(request):
+        nonlocal requests
+        requests += 1
+        if requests == 1:
+            return [0.3, "slow", {"prompt_tokens": 999, "completion_tokens": 999}]
+        in_flight.append(controller.in_flight)
+        return ["Hello!", {"prompt_tokens": 12, "completion_tokens": 3}]
+
+    metrics = AgentMetrics()
+    agent, _ = make_agent(
+        responder,
+        admission_controller=controller,
+        retry_policy=RetryPolicy(hedge_after=0.02),
+        metrics=metrics
+    )
+
+    async def run():
+        return "".join([chunk async for chunk in agent.process_input("hello")])
+
+    assert asyncio.run(run()) == "Hello!"
+    assert in_flight == [2]
+    assert controller.stats()["admitted"] == 2
+    assert controller.in_flight == 0
+    assert metrics.get_counter("llm_prompt_tokens_total", stage="route") == 12
+    assert metrics.get_counter("llm_completion_tokens_total", stage="route") == 3
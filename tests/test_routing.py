@@ -0,0 +1,103 @@
+"""
+Tests for local routing: the routing cache and the intent classifier.
+"""
+
+import pytest
+
+from src.ai_agent.cache import ResponseCache
+from src.ai_agent.routing import CommandSelector, IntentClassifier, RoutingCache
+
+def test_values_from_the_input_are_replayed_only_for_the_identical_input(send_registry):
+    cache = RoutingCache()
+    cache.store("send 1,000 to 0xAbC", send_registry, None, "[[SEND_1,000_0xAbC]]")
+
+    assert cache.lookup("send 1,000 to 0xAbC", send_registry) == "[[SEND_1,000_0xAbC]]"
+    assert cache.lookup("send 1.000 to 0xabc", send_registry) is None
+    assert cache.lookup("Send 1,000 to 0xAbC!", send_registry) is None
+
+def test_values_from_context_match_normalized_inputs(send_registry):
+    cache = RoutingCache()
+    context = {"user_id": "u1"}
+    cache.store("Create me a new wallet!", send_registry, context, "[[GENERATE_WALLET_u1]]")
+
+    assert cache.lookup("create me a   new wallet", send_registry, context) == "[[GENERATE_WALLET_u1]]"
+    assert cache.lookup("create me a new wallet", send_registry, {"user_id": "u2"}) is None
+
+def test_value_differing_from_context_is_not_normalized(send_registry):
+    cache = RoutingCache()
+    cache.store("Create a wallet for Bob", send_registry, {"user_id": "u1"}, "[[GENERATE_WALLET_bob]]")
+
+    assert cache.lookup("create a wallet for bob", send_registry, {"user_id": "u1"}) is None
+    assert cache.lookup("Create a wallet for Bob", send_registry, {"user_id": "u1"}) == "[[GENERATE_WALLET_bob]]"
+
+def test_each_lookup_is_counted_once(send_registry):
+    cache = RoutingCache()
+    context = {"user_id": "u1"}
+    cache.store("Create me a new wallet!", send_registry, context, "[[GENERATE_WALLET_u1]]")
+
+    cache.lookup("Create me a new wallet!", send_registry, context)
+    cache.lookup("create me a new wallet", send_registry, context)
+    cache.lookup("send 5 to 0xabc", send_registry, context)
+
+    assert (cache.exact_hits, cache.semantic_hits, cache.misses) == (2, 0, 1)
+
+def test_peeking_does_not_count_as_a_lookup():
+    responses = ResponseCache()
+    responses.set("key", ["cached"])
+
+    assert responses.peek("key") == ["cached"]
+    assert responses.peek("other") is None
+    assert (responses.hits, responses.misses) == (0, 0)
+    assert responses.get("other") is None
+    assert (responses.hits, responses.misses) == (0, 1)
+
+@pytest.mark.parametrize("user_input", [
+    "Create me a new wallet!",
+    "please generate me a wallet",
+    "I need a new cryptocurrency wallet"
+])
+def test_classifier_routes_paraphrases_of_the_examples(wallet_registry, user_input):
+    classifier = IntentClassifier()
+
+    assert classifier.lookup(user_input, wallet_registry, {"user_id": "u1"}) == "[[GENERATE_WALLET_u1]]"
+
+@pytest.mark.parametrize("user_input", [
+    "Don't create me a new wallet",
+    "I need a cryptocurrency wallet? no",
+    "never generate me a wallet"
+])
+def test_classifier_rejects_negated_requests(wallet_registry, user_input):
+    classifier = IntentClassifier()
+
+    assert classifier.predict(user_input, wallet_registry) is None
+
+@pytest.mark.parametrize("user_input", [
+    "delete my wallet please",
+    "what's the weather like today",
+    "thank you"
+])
+def test_classifier_rejects_unrelated_requests(wallet_registry, user_input):
+    classifier = IntentClassifier()
+
+    assert classifier.predict(user_input, wallet_registry) is None
+
+def test_unknown_words_lower_the_score(wallet_registry):
+    classifier = IntentClassifier()
+
+    exact = classifier.scores("Create me a new wallet", wallet_registry)["generate_wallet"]
+    padded = classifier.scores("Create me a new wallet for my grandmother tomorrow", wallet_registry)["generate_wallet"]
+
+    assert exact == pytest.approx(1.0)
+    assert padded < exact - 0.2
+
+def test_selector_picks_the_best_matching_commands(send_registry):
+    selector = CommandSelector(top_k=1)
+
+    assert selector.select("please send 5 to 0xabc", send_registry) == ["send_funds"]
+
+def test_selector_falls_back_to_priority_when_nothing_matches(registry, add_send_funds, add_generate_wallet):
+    add_send_funds()
+    add_generate_wallet(priority=10)
+
+    assert CommandSelector(top_k=1).select("hi", registry) == ["generate_wallet"]
+    assert CommandSelector(top_k=5).select("hi", registry) == ["generate_wallet", "send_funds"]
@@ -0,0 +1,65 @@
+"""
+Tests for multi-turn sessions and session stores.
+"""
+
+import asyncio
+
+import pytest
+
+from src.ai_agent.session import InMemorySessionStore, Session, SessionStore
+from src.prompts.tokens import TokenEstimator
+
+class EchoAgent:
+    """Agent stand-in answering every input with a fixed reply."""
+
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.token_estimator = TokenEstimator(tokenizer=lambda text: len(text.split()))
+
+    async def process_input(self, user_input, context=None, history=None):
+        yield self.reply
+
+async def run_turns(session, inputs):
+    for user_input in inputs:
+        async for _ in session.process_input(user_input):
+            pass
+
+def test_budget_drops_whole_exchanges():
+    session = Session(EchoAgent("two words"), "s1", max_history_tokens=5)
+
+    asyncio.run(run_turns(session, ["one two", "three four", "five six"]))
+
+    history = session.get_history()
+    assert [message["role"] for message in history] == ["user", "assistant"]
+    assert history[0]["content"] == "five six"
+
+def test_budget_is_counted_with_the_agents_estimator():
+    # Four words per exchange, but far more than four characters per token
+    session = Session(EchoAgent("a much longer assistant reply"), "s1", max_history_tokens=14)
+
+    asyncio.run(run_turns(session, ["first question", "second question"]))
+
+    assert len(session.get_history()) == 4
+
+def test_ring_buffer_keeps_exchanges_aligned():
+    session = Session(EchoAgent("ok"), "s1", max_turns=2)
+
+    asyncio.run(run_turns(session, ["a", "b", "c"]))
+
+    assert [message["content"] for message in session.get_history()] == ["b", "ok", "c", "ok"]
+
+def test_loading_drops_an_orphaned_assistant_reply():
+    store = InMemorySessionStore()
+    asyncio.run(store.save("s1", {"summary": "", "history": [["assistant", "orphan"], ["user", "hi"], ["assistant", "hello"]]}))
+
+    session = asyncio.run(Session.load(EchoAgent("ok"), "s1", store=store))
+
+    assert [message["content"] for message in session.get_history()] == ["hi", "hello"]
+
+def test_session_store_is_abstract():
+    class IncompleteStore(SessionStore):
+        async def load(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteStore()
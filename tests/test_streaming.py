@@ -0,0 +1,71 @@
+"""
+Tests for streaming command detection.
+"""
+
+import asyncio
+
+from src.ai_agent.streaming import CommandPrefixDetector
+
+def feed_all(chunks):
+    detector = CommandPrefixDetector()
+    released = [detector.feed(chunk) for chunk in chunks]
+    return detector, released
+
+def test_prose_is_released_as_it_streams():
+    detector, released = feed_all(["Hello", " there", ", how can I help?"])
+
+    assert released == ["Hello", " there", ", how can I help?"]
+    assert not detector.is_command
+    assert detector.flush() == ""
+
+def test_command_after_leading_whitespace_releases_nothing():
+    detector, released = feed_all(["\n  ", "[[GENERATE_", "WALLET_u1]]"])
+
+    assert released == ["", "", ""]
+    assert detector.is_command
+    assert detector.flush() == "\n  [[GENERATE_WALLET_u1]]"
+
+def test_prefix_split_across_chunks_is_held():
+    detector, released = feed_all(["Sure [", "[GENERATE_WALLET_u1]", "] done"])
+
+    assert released == ["Sure ", "", ""]
+    assert detector.is_command
+    assert detector.text == "Sure [[GENERATE_WALLET_u1]] done"
+
+def test_single_bracket_followed_by_prose_is_released():
+    detector, released = feed_all(["See [", "1] for details"])
+
+    assert released == ["See ", "[1] for details"]
+    assert not detector.is_command
+
+def test_command_after_prose_is_held_back():
+    detector, released = feed_all(["Sure! ", "I'll do that. [[GENERATE", "_WALLET_u1]]"])
+
+    assert "".join(released) == "Sure! I'll do that. "
+    assert detector.is_command
+    assert detector.flush() == "[[GENERATE_WALLET_u1]]"
+
+def test_unclosed_block_is_released_at_the_end_of_its_line():
+    detector, released = feed_all(["Use [[brackets", " like this\nfor", " lists"])
+
+    assert "".join(released) == "Use [[brackets like this\nfor lists"
+    assert not detector.is_command
+
+def test_agent_runs_a_command_placed_after_a_preamble(wallet_registry, make_agent):
+    def responder(request):
+        prompt = request["messages"][-1]["content"]
+        if prompt.startswith("Format"):
+            return [f"Formatted: {prompt}"]
+        return ["Sure! ", "Creating it now. [[GENERATE_", "WALLET_u1]]"]
+
+    agent, model = make_agent(responder)
+
+    async def run():
+        return [chunk async for chunk in agent.process_input("Create me a new wallet")]
+
+    output = "".join(asyncio.run(run()))
+
+    assert output.startswith("Sure! Creating it now. ")
+    assert "[[GENERATE_WALLET_u1]]" not in output
+    assert "Wallet for u1" in output
+    assert len(model.requests) == 2
@@ -0,0 +1,75 @@
+"""
+Tests for tool-call routing: streamed argument reassembly and dispatch.
+"""
+
+import asyncio
+import logging
+
+from openai.types.chat.chat_completion_chunk import ChoiceDeltaToolCall, ChoiceDeltaToolCallFunction
+
+from src.ai_agent.metrics import AgentMetrics
+from src.ai_agent.tools import ROUTING_MODE_TOOLS, ToolCallAccumulator
+
+def tool_delta(index, name=None, arguments=None):
+    return ChoiceDeltaToolCall(index=index, function=ChoiceDeltaToolCallFunction(name=name, arguments=arguments))
+
+def test_call_completes_once_split_arguments_parse():
+    accumulator = ToolCallAccumulator()
+
+    assert accumulator.feed(tool_delta(0, "send_funds", '{"amount": "10", ')) is None
+    assert accumulator.feed(tool_delta(0, None, '"address": "0x')) is None
+    assert accumulator.feed(tool_delta(0, None, '123"}')) == ("send_funds", {"amount": "10", "address": "0x123"})
+    assert accumulator.finish() == []
+
+def test_closing_brace_inside_a_string_value_does_not_complete_the_call():
+    accumulator = ToolCallAccumulator()
+
+    assert accumulator.feed(tool_delta(0, "note", '{"text": "a}')) is None
+    assert accumulator.feed(tool_delta(0, None, ' b}"}')) == ("note", {"text": "a} b}"})
+
+def test_calls_without_arguments_complete_when_the_stream_ends():
+    accumulator = ToolCallAccumulator()
+
+    assert accumulator.feed(tool_delta(0, "list_wallets")) is None
+    assert accumulator.feed(tool_delta(1, "send_funds", '{"amount": 5}')) == ("send_funds", {"amount": "5"})
+    assert accumulator.finish() == [("list_wallets", {})]
+
+async def run_turn(agent, user_input):
+    return "".join([chunk async for chunk in agent.process_input(user_input)])
+
+def test_tool_calls_with_wrong_arguments_never_reach_the_handler(add_send_funds, make_agent):
+    calls = []
+
+    async def send_funds(amount: str, address: str) -> str:
+        calls.append((amount, address))
+        return f"Sent {amount} to {address}"
+
+    add_send_funds(send_funds, response_mode="raw")
+    agent, _ = make_agent(lambda request: [[
+        tool_delta(0, "send_funds", '{"amount": "10"}'),
+        tool_delta(1, "send_funds", '{"amount": "10", "address": "0x1", "memo": "hi"}'),
+        tool_delta(2, "send_funds", '{"amount": "5", "address": "0x2"}')
+    ]], routing_mode=ROUTING_MODE_TOOLS)
+
+    output = asyncio.run(run_turn(agent, "send some funds"))
+
+    assert calls == [("5", "0x2")]
+    assert "Missing variables for command send_funds: address" in output
+    assert "Unsupported variables for command send_funds: memo" in output
+    assert "Sent 5 to 0x2" in output
+
+def test_tool_calls_to_unregistered_commands_are_reported(add_send_funds, make_agent, caplog):
+    add_send_funds(response_mode="raw")
+    metrics = AgentMetrics()
+    agent, _ = make_agent(lambda request: [[
+        tool_delta(0, "delete_wallet", '{"user_id": "u1"}'),
+        tool_delta(1, "send_funds", '{"amount": "5", "address": "0x2"}')
+    ]], routing_mode=ROUTING_MODE_TOOLS, metrics=metrics)
+
+    with caplog.at_level(logging.WARNING, logger="src.ai_agent.agent"):
+        output = asyncio.run(run_turn(agent, "delete my wallet and send 5 to 0x2"))
+
+    assert output == "No handler registered for command: delete_wallet\n\nSent 5 to 0x2"
+    assert "delete_wallet" in caplog.text
+    assert metrics.get_counter("commands_total", result="miss") == 1
+    assert metrics.get_counter("commands_total", result="hit") == 1
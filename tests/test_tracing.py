@@ -0,0 +1,42 @@
+"""
+Tests for the tracer interface.
+"""
+
+import pytest
+
+from src.ai_agent.tracing import Tracer
+
+class RecordingTracer(Tracer):
+    """Tracer keeping the spans it ended, with their errors."""
+
+    def __init__(self):
+        self.ended = []
+
+    def start_span(self, name, parent=None, attributes=None):
+        return {"name": name, "parent": parent, "attributes": dict(attributes or {})}
+
+    def end_span(self, span, error=None):
+        self.ended.append((span["name"], error))
+
+def test_tracer_is_abstract():
+    class IncompleteTracer(Tracer):
+        def start_span(self, name, parent=None, attributes=None):
+            return None
+
+    with pytest.raises(TypeError):
+        Tracer()
+    with pytest.raises(TypeError):
+        IncompleteTracer()
+
+def test_span_ends_with_the_error_that_escaped_the_block():
+    tracer = RecordingTracer()
+
+    with tracer.span("aigent.llm", attributes={"stage": "routing"}) as span:
+        assert span["attributes"] == {"stage": "routing"}
+    with pytest.raises(RuntimeError):
+        with tracer.span("aigent.execute_command"):
+            raise RuntimeError("handler failed")
+
+    assert tracer.ended[0] == ("aigent.llm", None)
+    assert tracer.ended[1][0] == "aigent.execute_command"
+    assert isinstance(tracer.ended[1][1], RuntimeError)